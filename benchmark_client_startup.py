@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+YouTube客户端启动耗时基准测试
+
+对比以下几种构建客户端的方式：
+1. 在线discovery（每次从Google下载discovery文档）
+2. 客户端库默认方式（每次读取并解析库内置的静态文档）
+3. youtube_client.build_youtube_service（静态文档进程内只解析一次，之后复用）
+
+冷启动在独立子进程中测量（包含import耗时），热启动在同一进程内重复构建。
+
+使用方法：
+    python benchmark_client_startup.py [重复次数]
+"""
+
+import sys
+import time
+import subprocess
+
+COLD_SNIPPETS = {
+    '在线discovery': (
+        "import googleapiclient.discovery\n"
+        "googleapiclient.discovery.build('youtube', 'v3', developerKey='bench', static_discovery=False)"
+    ),
+    '库内置静态文档': (
+        "import googleapiclient.discovery\n"
+        "googleapiclient.discovery.build('youtube', 'v3', developerKey='bench')"
+    ),
+    'youtube_client': (
+        "from youtube_client import build_youtube_service\n"
+        "build_youtube_service('bench')"
+    ),
+}
+
+
+def measure_cold(snippet, repeats):
+    """在子进程中测量冷启动耗时，返回毫秒列表；失败时返回None"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, '-c', snippet],
+            capture_output=True,
+            timeout=60
+        )
+        elapsed = (time.perf_counter() - start) * 1000
+        if result.returncode != 0:
+            return None
+        timings.append(elapsed)
+    return timings
+
+
+def measure_warm(repeats):
+    """在当前进程内测量重复构建耗时（毫秒）"""
+    import googleapiclient.discovery
+    from youtube_client import build_youtube_service
+
+    results = {}
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        googleapiclient.discovery.build('youtube', 'v3', developerKey='bench')
+    results['库内置静态文档'] = (time.perf_counter() - start) * 1000 / repeats
+
+    build_youtube_service('bench')
+    start = time.perf_counter()
+    for _ in range(repeats):
+        build_youtube_service('bench')
+    results['youtube_client'] = (time.perf_counter() - start) * 1000 / repeats
+
+    return results
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    print("⏱️ YouTube客户端启动基准测试")
+    print("=" * 60)
+    print(f"🔁 重复次数: {repeats}")
+
+    print("\n🧊 冷启动（独立进程，含import）:")
+    for name, snippet in COLD_SNIPPETS.items():
+        timings = measure_cold(snippet, repeats)
+        if timings is None:
+            print(f"   {name:<12} 失败（可能无法访问网络）")
+            continue
+        timings.sort()
+        median = timings[len(timings) // 2]
+        print(f"   {name:<12} 中位数 {median:8.1f} ms | 最快 {timings[0]:8.1f} ms")
+
+    print("\n🔥 热启动（同一进程重复构建）:")
+    for name, avg in measure_warm(max(repeats, 20)).items():
+        print(f"   {name:<12} 平均 {avg:8.2f} ms")
+
+    print("\n✨ 基准测试完成！")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fields= 部分响应基准测试
+
+对比每批50个视频/频道的详情响应在以下三种情况下的大小、JSON解析耗时和内存占用：
+1. 不带fields（原来的part列表）
+2. full字段配置
+3. lite字段配置
+
+默认使用本地构造的50条完整响应，并按字段掩码在本地裁剪来模拟服务端部分响应；
+设置 YOUTUBE_API_KEY 和 BENCH_VIDEO_IDS（逗号分隔，最多50个）时改为请求真实API。
+
+使用方法：
+    python benchmark_field_masks.py
+    YOUTUBE_API_KEY=xxx BENCH_VIDEO_IDS=id1,id2 python benchmark_field_masks.py
+"""
+
+import os
+import json
+import time
+import tracemalloc
+
+from youtube_fields import request_params
+
+# 原来请求的part
+ORIGINAL_PARTS = {
+    'search.videos': 'snippet,statistics,contentDetails,status,recordingDetails,topicDetails',
+    'search.channels': 'snippet,statistics,brandingSettings,status,topicDetails,localizations',
+}
+
+
+def parse_fields(mask):
+    """解析fields参数为嵌套字典 {字段: 子字段字典或None}"""
+    def parse_list(text, pos):
+        result = {}
+        while pos < len(text) and text[pos] != ')':
+            start = pos
+            while pos < len(text) and text[pos] not in ',()':
+                pos += 1
+            path = text[start:pos].split('/')
+            children = None
+            if pos < len(text) and text[pos] == '(':
+                children, pos = parse_list(text, pos + 1)
+                pos += 1  # 跳过 ')'
+            node = result
+            for key in path[:-1]:
+                node = node.setdefault(key, {})
+            node[path[-1]] = children
+            if pos < len(text) and text[pos] == ',':
+                pos += 1
+        return result, pos
+
+    return parse_list(mask, 0)[0]
+
+
+def apply_fields(data, selector):
+    """按解析后的字段选择器裁剪数据（模拟服务端的部分响应）"""
+    if selector is None:
+        return data
+    if isinstance(data, list):
+        return [apply_fields(item, selector) for item in data]
+    if not isinstance(data, dict):
+        return data
+    return {key: apply_fields(data[key], sub) for key, sub in selector.items() if key in data}
+
+
+def build_sample_video(index):
+    """构造一条字段完整的videos().list结果"""
+    thumbnails = {
+        size: {'url': f'https://i.ytimg.com/vi/video{index}/{size}.jpg', 'width': 480, 'height': 360}
+        for size in ('default', 'medium', 'high', 'standard', 'maxres')
+    }
+    description = ('这是一段很长的视频描述，包含链接、时间轴和赞助信息。' * 40)
+    return {
+        'kind': 'youtube#video',
+        'etag': f'etag_{index}',
+        'id': f'video{index}',
+        'snippet': {
+            'publishedAt': '2024-05-20T10:00:00Z', 'channelId': f'UCchannel{index % 20}',
+            'title': f'HONOR 400 评测 {index}', 'description': description, 'thumbnails': thumbnails,
+            'channelTitle': f'频道 {index % 20}', 'tags': [f'标签{i}' for i in range(30)],
+            'categoryId': '28', 'liveBroadcastContent': 'none', 'defaultLanguage': 'zh-Hans',
+            'localized': {'title': f'HONOR 400 评测 {index}', 'description': description},
+            'defaultAudioLanguage': 'zh-Hans'
+        },
+        'contentDetails': {
+            'duration': 'PT12M3S', 'dimension': '2d', 'definition': 'hd', 'caption': 'true',
+            'licensedContent': True, 'contentRating': {}, 'projection': 'rectangular',
+            'regionRestriction': {'blocked': ['XX', 'YY']}
+        },
+        'status': {
+            'uploadStatus': 'processed', 'privacyStatus': 'public', 'license': 'youtube', 'embeddable': True,
+            'publicStatsViewable': True, 'madeForKids': False
+        },
+        'statistics': {'viewCount': '123456', 'likeCount': '2345', 'favoriteCount': '0', 'commentCount': '345'},
+        'recordingDetails': {'recordingDate': '2024-05-19T00:00:00Z', 'locationDescription': '深圳'},
+        'topicDetails': {
+            'topicIds': ['/m/07c1v'], 'relevantTopicIds': ['/m/07c1v', '/m/019_rr'],
+            'topicCategories': ['https://en.wikipedia.org/wiki/Technology']
+        }
+    }
+
+
+def build_sample_channel(index):
+    """构造一条字段完整的channels().list结果"""
+    description = '频道介绍，包含合作邮箱和社交媒体链接。' * 20
+    return {
+        'kind': 'youtube#channel',
+        'etag': f'etag_c{index}',
+        'id': f'UCchannel{index}',
+        'snippet': {
+            'title': f'频道 {index}', 'description': description, 'customUrl': f'@channel{index}',
+            'publishedAt': '2015-01-01T00:00:00Z', 'country': 'CN', 'defaultLanguage': 'zh-Hans',
+            'localized': {'title': f'频道 {index}', 'description': description},
+            'thumbnails': {size: {'url': f'https://yt3.ggpht.com/c{index}/{size}', 'width': 800, 'height': 800}
+                           for size in ('default', 'medium', 'high')}
+        },
+        'statistics': {'viewCount': '99999999', 'subscriberCount': '123000', 'hiddenSubscriberCount': False,
+                       'videoCount': '812'},
+        'brandingSettings': {
+            'channel': {'title': f'频道 {index}', 'description': description, 'keywords': '手机 评测 数码',
+                        'unsubscribedTrailer': 'trailer', 'country': 'CN'},
+            'image': {'bannerExternalUrl': 'https://yt3.googleusercontent.com/banner' * 3}
+        },
+        'status': {'privacyStatus': 'public', 'isLinked': True, 'longUploadsStatus': 'longUploadsUnspecified',
+                   'madeForKids': False, 'selfDeclaredMadeForKids': False},
+        'topicDetails': {'topicIds': ['/m/07c1v'], 'topicCategories': ['https://en.wikipedia.org/wiki/Technology']},
+        'localizations': {lang: {'title': f'Channel {index}', 'description': description}
+                          for lang in ('en', 'ja', 'ko', 'de', 'fr')}
+    }
+
+
+def sample_payloads(name):
+    """返回 {配置名: 响应JSON字节} （本地模拟）"""
+    builder = build_sample_video if name == 'search.videos' else build_sample_channel
+    full_response = {'kind': 'youtube#listResponse', 'etag': 'etag', 'items': [builder(i) for i in range(50)],
+                     'pageInfo': {'totalResults': 50, 'resultsPerPage': 50}}
+    payloads = {'不带fields': json.dumps(full_response, ensure_ascii=False).encode('utf-8')}
+    for profile in ('full', 'lite'):
+        selector = parse_fields(request_params(name, profile)['fields'])
+        payloads[profile] = json.dumps(apply_fields(full_response, selector), ensure_ascii=False).encode('utf-8')
+    return payloads
+
+
+def live_payloads(name, api_key, ids):
+    """返回 {配置名: 响应JSON字节} （真实API）"""
+    from youtube_client import get_youtube_client, get_http
+
+    client = get_youtube_client(api_key)
+    resource = 'videos' if name == 'search.videos' else 'channels'
+    variants = {'不带fields': {'part': ORIGINAL_PARTS[name]}}
+    for profile in ('full', 'lite'):
+        variants[profile] = request_params(name, profile)
+
+    payloads = {}
+    for label, params in variants.items():
+        request = client.request(resource, id=','.join(ids), **params)
+        resp, content = get_http().request(request.uri, 'GET')
+        payloads[label] = content
+    return payloads
+
+
+def measure(payload, repeats=50):
+    """测量JSON解析耗时（毫秒）和解析后对象的内存占用（KB）"""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        json.loads(payload)
+    parse_ms = (time.perf_counter() - start) * 1000 / repeats
+
+    tracemalloc.start()
+    data = json.loads(payload)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del data
+    return parse_ms, current / 1024
+
+
+def main():
+    api_key = os.getenv('YOUTUBE_API_KEY')
+    video_ids = [v for v in os.getenv('BENCH_VIDEO_IDS', '').split(',') if v][:50]
+
+    print("⏱️ fields= 部分响应基准测试（每批50条）")
+    print("=" * 60)
+
+    for name in ('search.videos', 'search.channels'):
+        if api_key and video_ids and name == 'search.videos':
+            print(f"\n🌐 {name}（真实API，{len(video_ids)} 个ID）")
+            payloads = live_payloads(name, api_key, video_ids)
+        else:
+            print(f"\n🧪 {name}（本地模拟）")
+            payloads = sample_payloads(name)
+
+        baseline = len(payloads['不带fields'])
+        for label, payload in payloads.items():
+            parse_ms, memory_kb = measure(payload)
+            print(f"   {label:<8} {len(payload) / 1024:8.1f} KB ({len(payload) / baseline:6.1%}) | "
+                  f"解析 {parse_ms:6.2f} ms | 内存 {memory_kb:8.1f} KB")
+
+    print("\n✨ 基准测试完成！")
+
+
+if __name__ == "__main__":
+    main()
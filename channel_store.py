@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""
+频道信息本地存储（SQLite）
+
+按频道ID和字段组（part）保存channels().list返回的数据，跨运行复用。每个字段组有自己的新鲜期：
+snippet、brandingSettings等元数据很少变化，保存数天；statistics变化较快，只保存一天。
+搜索模式补充频道信息时，只有本地没有或已过期的字段组才请求API，其余直接本地读取。
+
+字段组以字段掩码为键（如 ``snippet(title,description,...)``），字段配置不同的数据不会混用。
+
+同时保存handle/频道链接到频道ID和上传播放列表ID的解析结果。这两个值几乎不会变化，
+有效期较长；频道模式直接用解析结果请求playlistItems，查询失败时删除解析结果并重新解析。
+
+增量同步时还保存每个频道的同步位置（已交付的最新视频ID和发布时间），
+下次同步遇到该视频（或更早发布的视频）即停止翻页，只输出新上传的视频。
+
+关注列表模式保存每个频道上次抓取时的视频数和上传播放列表ID，用于在抓取前判断频道是否有变化。
+
+配置：
+- YOUTUBE_CHANNEL_STORE: 是否启用（默认true）
+- YOUTUBE_CHANNEL_FRESHNESS: 覆盖新鲜期（秒），如 "statistics=3600,snippet=86400"
+- YOUTUBE_HANDLE_TTL: handle解析结果的有效期（秒，默认30天）
+"""
+
+import os
+import json
+import time
+import threading
+
+import state_store
+from response_cache import parse_ttls
+
+CHANNEL_STORE_ENABLED = os.getenv('YOUTUBE_CHANNEL_STORE', 'true').lower() == 'true'
+
+# 存储文件名（位于状态目录下）
+STORE_FILENAME = 'channel_store.sqlite3'
+
+DAY = 24 * 60 * 60
+
+# 各字段组的新鲜期（秒）
+DEFAULT_FRESHNESS = {
+    'snippet': 7 * DAY,
+    'brandingSettings': 7 * DAY,
+    'status': 7 * DAY,
+    'topicDetails': 7 * DAY,
+    'contentDetails': 30 * DAY,
+    'statistics': 1 * DAY,
+}
+
+CHANNEL_FRESHNESS = {**DEFAULT_FRESHNESS, **parse_ttls(os.getenv('YOUTUBE_CHANNEL_FRESHNESS', ''))}
+
+# handle解析结果的有效期（秒）
+HANDLE_TTL = int(os.getenv('YOUTUBE_HANDLE_TTL', str(30 * DAY)))
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+class ChannelStore:
+    """频道信息存储，记录 (频道ID, 字段组) 的数据和更新时间"""
+
+    def __init__(self, path, freshness=None, handle_ttl=None):
+        self.path = path
+        self.freshness = CHANNEL_FRESHNESS if freshness is None else freshness
+        self.handle_ttl = HANDLE_TTL if handle_ttl is None else handle_ttl
+        self._lock = threading.Lock()
+        self._conn = state_store.connect(path)
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS channel_parts (
+                channel_id TEXT NOT NULL,
+                field_group TEXT NOT NULL,
+                data TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (channel_id, field_group)
+            )
+        ''')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS channel_resolutions (
+                handle TEXT PRIMARY KEY,
+                channel_id TEXT NOT NULL,
+                uploads_playlist_id TEXT NOT NULL,
+                resolved_at REAL NOT NULL
+            )
+        ''')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS channel_watermarks (
+                channel_id TEXT PRIMARY KEY,
+                video_id TEXT NOT NULL,
+                published_at TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        ''')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS channel_snapshots (
+                channel_id TEXT PRIMARY KEY,
+                video_count INTEGER NOT NULL,
+                uploads_playlist_id TEXT NOT NULL,
+                checked_at REAL NOT NULL
+            )
+        ''')
+
+    def lookup(self, channel_ids, groups, now=None):
+        """读取频道数据
+
+        Args:
+            channel_ids: 频道ID列表
+            groups: {part名: 字段组键}，见 youtube_fields.part_masks
+
+        Returns:
+            ({频道ID: 频道资源（含已保存的part）}, {频道ID: 需要刷新的part集合})
+        """
+        now = now or time.time()
+        channel_ids = list(dict.fromkeys(channel_ids))
+        part_by_group = {group: part for part, group in groups.items()}
+        channels = {}
+        stale = {channel_id: set(groups) for channel_id in channel_ids}
+
+        with self._lock:
+            for start in range(0, len(channel_ids), 500):
+                chunk = channel_ids[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT channel_id, field_group, data, updated_at FROM channel_parts "
+                    f"WHERE channel_id IN ({','.join('?' * len(chunk))}) "
+                    f"AND field_group IN ({','.join('?' * len(part_by_group))})",
+                    (*chunk, *part_by_group)
+                ).fetchall()
+                for channel_id, group, data, updated_at in rows:
+                    part = part_by_group[group]
+                    channels.setdefault(channel_id, {'id': channel_id})[part] = json.loads(data)
+                    if now - updated_at < self.freshness.get(part, 0):
+                        stale[channel_id].discard(part)
+
+        return channels, {channel_id: parts for channel_id, parts in stale.items() if parts}
+
+    def save(self, items, groups, now=None):
+        """保存channels().list返回的频道资源中groups列出的part（缺失的part保存为空字典）"""
+        now = now or time.time()
+        rows = [
+            (item['id'], group, json.dumps(item.get(part, {}), ensure_ascii=False), now)
+            for item in items if item.get('id')
+            for part, group in groups.items()
+        ]
+        if not rows:
+            return
+        with self._lock, state_store.transaction(self._conn):
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO channel_parts (channel_id, field_group, data, updated_at) VALUES (?, ?, ?, ?)',
+                rows
+            )
+
+    def resolve(self, handle, now=None):
+        """读取有效期内的解析结果，返回 (频道ID, 上传播放列表ID)，没有时返回None"""
+        now = now or time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT channel_id, uploads_playlist_id FROM channel_resolutions WHERE handle = ? AND resolved_at > ?',
+                (handle, now - self.handle_ttl)
+            ).fetchone()
+        return tuple(row) if row else None
+
+    def remember(self, handle, channel_id, uploads_playlist_id, now=None):
+        """保存handle的解析结果"""
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO channel_resolutions (handle, channel_id, uploads_playlist_id, resolved_at) '
+                'VALUES (?, ?, ?, ?)',
+                (handle, channel_id, uploads_playlist_id, now or time.time())
+            )
+
+    def forget(self, handle):
+        """删除handle的解析结果（查询失败时调用，下次重新解析）"""
+        with self._lock:
+            self._conn.execute('DELETE FROM channel_resolutions WHERE handle = ?', (handle,))
+
+    def watermark(self, channel_id):
+        """读取频道的同步位置，返回 (视频ID, 发布时间)，没有时返回None"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT video_id, published_at FROM channel_watermarks WHERE channel_id = ?', (channel_id,)
+            ).fetchone()
+        return tuple(row) if row else None
+
+    def set_watermark(self, channel_id, video_id, published_at, now=None):
+        """保存频道的同步位置（已交付的最新视频）"""
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO channel_watermarks (channel_id, video_id, published_at, updated_at) '
+                'VALUES (?, ?, ?, ?)',
+                (channel_id, video_id, published_at or '', now or time.time())
+            )
+
+    def snapshots(self, channel_ids):
+        """读取频道上次抓取时的状态 {频道ID: (视频数, 上传播放列表ID)}"""
+        channel_ids = list(dict.fromkeys(channel_ids))
+        snapshots = {}
+        with self._lock:
+            for start in range(0, len(channel_ids), 500):
+                chunk = channel_ids[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT channel_id, video_count, uploads_playlist_id FROM channel_snapshots "
+                    f"WHERE channel_id IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall()
+                snapshots.update({channel_id: (video_count, uploads) for channel_id, video_count, uploads in rows})
+        return snapshots
+
+    def save_snapshot(self, channel_id, video_count, uploads_playlist_id, now=None):
+        """保存频道抓取后的状态"""
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO channel_snapshots (channel_id, video_count, uploads_playlist_id, checked_at) '
+                'VALUES (?, ?, ?, ?)',
+                (channel_id, video_count, uploads_playlist_id, now or time.time())
+            )
+
+
+def get_channel_store():
+    """获取进程内共享的频道信息存储，未启用时返回None"""
+    if not CHANNEL_STORE_ENABLED:
+        return None
+    path = state_store.state_path(STORE_FILENAME)
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = ChannelStore(path)
+            _stores[path] = store
+    return store
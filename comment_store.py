@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+评论同步状态本地存储（SQLite）
+
+评论增量同步时按视频保存同步位置（已交付的最新评论ID和发布时间）。
+增量同步按发布时间倒序（order=time）获取评论，遇到该评论（或更早发布的评论）即停止翻页，
+没有新评论的视频只需要一页请求。
+
+同时保存已交付的顶层评论及其点赞数。已知评论的点赞数不随增量同步更新，
+而是在新评论交付后单独刷新：只刷新点赞数最高的若干条，且每条在刷新间隔内只刷新一次
+（comments().list(id=...) 每50条评论一个请求）。
+
+配置：
+- YOUTUBE_COMMENT_STORE: 是否启用（默认true）
+- YOUTUBE_COMMENT_LIKE_REFRESH: 已知评论点赞数的刷新间隔（秒，默认1天）
+- YOUTUBE_COMMENT_LIKE_TOP: 每个视频刷新点赞数的评论数（默认50，即一个请求）
+"""
+
+import os
+import time
+import threading
+
+import state_store
+
+COMMENT_STORE_ENABLED = os.getenv('YOUTUBE_COMMENT_STORE', 'true').lower() == 'true'
+
+# 存储文件名（位于状态目录下）
+STORE_FILENAME = 'comment_store.sqlite3'
+
+DAY = 24 * 60 * 60
+
+# 已知评论点赞数的刷新间隔（秒）
+LIKE_REFRESH_INTERVAL = int(os.getenv('YOUTUBE_COMMENT_LIKE_REFRESH', str(DAY)))
+
+# 每个视频刷新点赞数的评论数（按点赞数从高到低）
+LIKE_REFRESH_TOP = int(os.getenv('YOUTUBE_COMMENT_LIKE_TOP', '50'))
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+class CommentStore:
+    """评论同步状态存储，记录每个视频的同步位置和已交付评论的点赞数"""
+
+    def __init__(self, path, refresh_interval=None):
+        self.path = path
+        self.refresh_interval = LIKE_REFRESH_INTERVAL if refresh_interval is None else refresh_interval
+        self._lock = threading.Lock()
+        self._conn = state_store.connect(path)
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS comment_watermarks (
+                video_id TEXT PRIMARY KEY,
+                comment_id TEXT NOT NULL,
+                published_at TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        ''')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS known_comments (
+                video_id TEXT NOT NULL,
+                comment_id TEXT NOT NULL,
+                like_count INTEGER NOT NULL,
+                refreshed_at REAL NOT NULL,
+                PRIMARY KEY (video_id, comment_id)
+            )
+        ''')
+
+    def watermark(self, video_id):
+        """读取视频的同步位置，返回 (评论ID, 发布时间)，没有时返回None"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT comment_id, published_at FROM comment_watermarks WHERE video_id = ?', (video_id,)
+            ).fetchone()
+        return tuple(row) if row else None
+
+    def set_watermark(self, video_id, comment_id, published_at, now=None):
+        """保存视频的同步位置（已交付的最新评论）"""
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO comment_watermarks (video_id, comment_id, published_at, updated_at) '
+                'VALUES (?, ?, ?, ?)',
+                (video_id, comment_id, published_at or '', now or time.time())
+            )
+
+    def remember(self, video_id, comments, now=None):
+        """保存已交付的评论 [(评论ID, 点赞数)]，每个视频只保留点赞数最高的LIKE_REFRESH_TOP条"""
+        now = now or time.time()
+        rows = [(video_id, comment_id, like_count, now) for comment_id, like_count in comments if comment_id]
+        if not rows:
+            return
+        with self._lock, state_store.transaction(self._conn):
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO known_comments (video_id, comment_id, like_count, refreshed_at) '
+                'VALUES (?, ?, ?, ?)',
+                rows
+            )
+            # 只刷新点赞数最高的评论（见stale_top_comments），其余评论不再保留
+            self._conn.execute(
+                'DELETE FROM known_comments WHERE video_id = ? AND comment_id NOT IN ('
+                'SELECT comment_id FROM known_comments WHERE video_id = ? '
+                'ORDER BY like_count DESC, comment_id LIMIT ?)',
+                (video_id, video_id, LIKE_REFRESH_TOP)
+            )
+
+    def stale_top_comments(self, video_id, limit=None, now=None):
+        """点赞数最高的limit条已知评论中超过刷新间隔的评论，返回 {评论ID: 已保存的点赞数}"""
+        now = now or time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT comment_id, like_count, refreshed_at FROM known_comments WHERE video_id = ? '
+                'ORDER BY like_count DESC, comment_id LIMIT ?',
+                (video_id, LIKE_REFRESH_TOP if limit is None else limit)
+            ).fetchall()
+        return {
+            comment_id: like_count for comment_id, like_count, refreshed_at in rows
+            if now - refreshed_at >= self.refresh_interval
+        }
+
+    def update_likes(self, video_id, like_counts, removed=(), now=None):
+        """保存刷新后的点赞数，删除已不存在的评论"""
+        now = now or time.time()
+        with self._lock, state_store.transaction(self._conn):
+            self._conn.executemany(
+                'UPDATE known_comments SET like_count = ?, refreshed_at = ? WHERE video_id = ? AND comment_id = ?',
+                [(like_count, now, video_id, comment_id) for comment_id, like_count in like_counts.items()]
+            )
+            self._conn.executemany(
+                'DELETE FROM known_comments WHERE video_id = ? AND comment_id = ?',
+                [(video_id, comment_id) for comment_id in removed]
+            )
+
+
+def get_comment_store():
+    """获取进程内共享的评论同步状态存储，未启用时返回None"""
+    if not COMMENT_STORE_ENABLED:
+        return None
+    path = state_store.state_path(STORE_FILENAME)
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = CommentStore(path)
+            _stores[path] = store
+    return store
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+pytest共用fixture
+
+测试不访问网络，也不写入真实的本地状态目录：
+- state_dir: 本地状态（响应缓存、配额账本、同步位置等）写入本测试的临时目录
+- use_fake_client: 让youtube_search_webhook使用模拟的YouTube客户端
+- webhook_sent: 替换send_to_webhook，记录发送的数据
+"""
+
+import pytest
+
+import state_store
+import youtube_search_webhook
+
+
+@pytest.fixture
+def state_dir(monkeypatch, tmp_path):
+    """state_store.STATE_DIR指向本测试的临时目录，返回该目录"""
+    monkeypatch.setattr(state_store, 'STATE_DIR', str(tmp_path))
+    return str(tmp_path)
+
+
+@pytest.fixture
+def use_fake_client(monkeypatch, state_dir):
+    """返回 use(fake)：之后youtube_search_webhook获取的YouTube客户端都是fake"""
+    def use(fake):
+        monkeypatch.setattr(youtube_search_webhook, 'get_youtube_client', lambda api_key: fake)
+        return fake
+    return use
+
+
+@pytest.fixture
+def webhook_sent(monkeypatch):
+    """send_to_webhook只记录数据并返回成功，返回记录的数据列表"""
+    sent = []
+    monkeypatch.setattr(youtube_search_webhook, 'send_to_webhook', lambda data, url: sent.append(data) or True)
+    return sent
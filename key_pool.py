@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+多API密钥池
+
+配置多个密钥（YOUTUBE_API_KEYS 或 YOUTUBE_API_KEY 中用逗号分隔）时，每次请求都路由到
+今日剩余配额最多的密钥。返回quotaExceeded的密钥暂停使用至下一次配额重置（太平洋时间午夜），
+暂停记录保存在配额账本中，多个进程共享。
+
+关闭配额账本（YOUTUBE_QUOTA_LEDGER=false）时无法得知各密钥的用量，改为按顺序轮流使用密钥，
+暂停记录只保存在本进程内，不写入账本文件。
+"""
+
+import threading
+from datetime import datetime, timezone
+
+from quota_ledger import (QUOTA_LEDGER_ENABLED, QuotaBudgetExceeded, get_quota_ledger, key_id, next_reset,
+                          quota_day, request_cost)
+
+# 表示密钥当日配额已用尽的错误原因
+QUOTA_EXHAUSTED_REASONS = {'quotaExceeded', 'dailyLimitExceeded'}
+
+
+def split_api_keys(api_key):
+    """将逗号分隔的密钥字符串（或密钥列表）拆分为去重后的密钥列表"""
+    if isinstance(api_key, str):
+        api_key = api_key.split(',')
+    keys = []
+    for key in api_key or []:
+        key = key.strip()
+        if key and key not in keys:
+            keys.append(key)
+    return keys
+
+
+class KeyPool:
+    """按剩余配额选择密钥，并记录配额已用尽的密钥
+
+    Args:
+        api_keys: 逗号分隔的密钥字符串或密钥列表
+        ledger: 配额账本（默认使用进程内共享的账本）
+        use_ledger: 是否使用配额账本（默认传入ledger时使用，否则按YOUTUBE_QUOTA_LEDGER），
+            为False时轮流使用密钥，暂停记录只保存在内存中
+    """
+
+    def __init__(self, api_keys, ledger=None, use_ledger=None):
+        self.api_keys = split_api_keys(api_keys)
+        if not self.api_keys:
+            raise ValueError("密钥池至少需要一个API密钥")
+        self._ledger = ledger
+        if use_ledger is None:
+            use_ledger = ledger is not None or QUOTA_LEDGER_ENABLED
+        self.use_ledger = use_ledger
+        self._excluded = {}
+        self._next = 0
+        self._lock = threading.Lock()
+
+    @property
+    def ledger(self):
+        return self._ledger or get_quota_ledger()
+
+    def available_keys(self):
+        """当前未被暂停的密钥"""
+        if not self.use_ledger:
+            now = datetime.now(timezone.utc)
+            with self._lock:
+                return [api_key for api_key in self.api_keys
+                        if api_key not in self._excluded or self._excluded[api_key] <= now]
+        ledger = self.ledger
+        return [api_key for api_key in self.api_keys if ledger.excluded_until(api_key) is None]
+
+    def remaining(self):
+        """所有可用密钥今日剩余配额之和（不使用账本时无法得知，返回None）"""
+        if not self.use_ledger:
+            return None
+        ledger = self.ledger
+        return sum(ledger.remaining(api_key) for api_key in self.available_keys())
+
+    def choose(self, resources, skip=()):
+        """为一组请求选择剩余配额最多的密钥
+
+        Args:
+            resources: 请求的接口名列表
+            skip: 本次请求已尝试过的密钥
+
+        Raises:
+            QuotaBudgetExceeded: 没有任何可用密钥的剩余配额足够本次请求
+        """
+        needed = sum(request_cost(resource) for resource in resources)
+        if not self.use_ledger:
+            return self._next_key(needed, skip)
+        ledger = self.ledger
+        candidates = [
+            (ledger.remaining(api_key), api_key)
+            for api_key in self.available_keys() if api_key not in skip
+        ]
+        if not candidates:
+            raise QuotaBudgetExceeded('所有密钥', needed, 0, quota_day())
+
+        remaining, api_key = max(candidates, key=lambda candidate: candidate[0])
+        if remaining < needed:
+            raise QuotaBudgetExceeded(key_id(api_key), needed, remaining, quota_day())
+        return api_key
+
+    def _next_key(self, needed, skip):
+        """不使用账本时按顺序轮流选择下一个可用密钥"""
+        available = [api_key for api_key in self.available_keys() if api_key not in skip]
+        if not available:
+            raise QuotaBudgetExceeded('所有密钥', needed, 0, quota_day())
+        with self._lock:
+            for offset in range(len(self.api_keys)):
+                index = (self._next + offset) % len(self.api_keys)
+                if self.api_keys[index] in available:
+                    self._next = index + 1
+                    return self.api_keys[index]
+
+    def mark_exhausted(self, api_key):
+        """密钥返回quotaExceeded，暂停使用至下一次配额重置"""
+        until = next_reset()
+        if self.use_ledger:
+            self.ledger.exclude(api_key, until)
+        else:
+            with self._lock:
+                self._excluded[api_key] = until
+        print(f"🔒 密钥 {key_id(api_key)} 配额已用尽，暂停使用至 {until.strftime('%Y-%m-%d %H:%M %Z')}")
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+失败结果缓存（SQLite）
+
+记录确定会失败的请求目标，例如评论已关闭的视频、不存在的视频和解析不到频道的handle，
+有效期内再次遇到时直接跳过，不发出API请求。各模式共用同一份记录。
+
+有效期按失败原因配置：视频被删除后很少恢复，保存较久；评论可能重新开放、handle可能被注册，保存较短。
+
+配置：
+- YOUTUBE_NEGATIVE_CACHE: 是否启用（默认true）
+- YOUTUBE_NEGATIVE_TTLS: 覆盖有效期（秒），如 "commentsDisabled=3600,videoNotFound=86400"
+"""
+
+import os
+import time
+import threading
+
+import state_store
+from response_cache import parse_ttls
+from retry import http_error_reasons
+
+NEGATIVE_CACHE_ENABLED = os.getenv('YOUTUBE_NEGATIVE_CACHE', 'true').lower() == 'true'
+
+# 缓存文件名（位于状态目录下）
+NEGATIVE_CACHE_FILENAME = 'negative_cache.sqlite3'
+
+DAY = 24 * 60 * 60
+
+# 各失败原因的有效期（秒），只有这里列出的原因会被记录
+DEFAULT_NEGATIVE_TTLS = {
+    'commentsDisabled': 3 * DAY,
+    'videoNotFound': 7 * DAY,
+    'channelNotFound': 1 * DAY,
+}
+
+NEGATIVE_TTLS = {**DEFAULT_NEGATIVE_TTLS, **parse_ttls(os.getenv('YOUTUBE_NEGATIVE_TTLS', ''))}
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def negative_reason(error):
+    """从HttpError中取出需要记录的失败原因，不需要记录时返回None"""
+    for reason in http_error_reasons(error):
+        if reason in NEGATIVE_TTLS:
+            return reason
+    return None
+
+
+class NegativeCache:
+    """失败结果缓存，记录 (类型, 目标) 的失败原因和记录时间"""
+
+    def __init__(self, path, ttls=None):
+        self.path = path
+        self.ttls = NEGATIVE_TTLS if ttls is None else ttls
+        self.skipped = {}
+        self._lock = threading.Lock()
+        self._conn = state_store.connect(path)
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS negative_results (
+                kind TEXT NOT NULL,
+                target TEXT NOT NULL,
+                reason TEXT NOT NULL,
+                stored_at REAL NOT NULL,
+                PRIMARY KEY (kind, target)
+            )
+        ''')
+
+    def get(self, kind, target, now=None):
+        """读取有效期内的失败原因，没有记录或已过期时返回None（命中时计入跳过统计）"""
+        now = now or time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT reason, stored_at FROM negative_results WHERE kind = ? AND target = ?', (kind, target)
+            ).fetchone()
+            if not row or now - row[1] >= self.ttls.get(row[0], 0):
+                return None
+            self.skipped[row[0]] = self.skipped.get(row[0], 0) + 1
+        return row[0]
+
+    def put(self, kind, target, reason, now=None):
+        """记录失败原因（未配置有效期的原因不记录）"""
+        if self.ttls.get(reason, 0) <= 0:
+            return
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO negative_results (kind, target, reason, stored_at) VALUES (?, ?, ?, ?)',
+                (kind, target, reason, now or time.time())
+            )
+
+    def clear(self, kind, target):
+        """删除记录（目标已恢复可用时调用）"""
+        with self._lock:
+            self._conn.execute('DELETE FROM negative_results WHERE kind = ? AND target = ?', (kind, target))
+
+
+def get_negative_cache():
+    """获取进程内共享的失败结果缓存，未启用时返回None"""
+    if not NEGATIVE_CACHE_ENABLED:
+        return None
+    path = state_store.state_path(NEGATIVE_CACHE_FILENAME)
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = NegativeCache(path)
+            _caches[path] = cache
+    return cache
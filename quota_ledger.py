@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+YouTube API配额账本
+
+按API密钥和配额日记录每次请求消耗的配额单位，保存在本地SQLite文件中，
+多个工作进程可以安全共享同一个账本。配额日与YouTube一致，按太平洋时间午夜重置。
+
+请求发出前先在账本中预留配额：预留后超出每日预算（YOUTUBE_QUOTA_BUDGET，默认10000）
+时直接抛出QuotaBudgetExceeded，不会发出请求。YouTube对失败的请求同样计费，因此预留不退回。
+
+返回quotaExceeded的密钥会记录暂停截止时间（下一次配额重置），所有进程在此之前都不再使用它。
+
+API密钥只以SHA-256摘要的形式保存。
+
+查看今日用量：
+    python quota_ledger.py status
+"""
+
+import os
+import sys
+import hashlib
+import threading
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import state_store
+
+# 各接口单次请求的配额消耗（未列出的按1单位计算）
+QUOTA_COSTS = {
+    'search': 100,
+    'videos': 1,
+    'channels': 1,
+    'playlistItems': 1,
+    'commentThreads': 1,
+    'comments': 1,
+}
+
+# 每个密钥每天的配额预算
+DAILY_BUDGET = int(os.getenv('YOUTUBE_QUOTA_BUDGET', '10000'))
+
+# 是否启用配额账本
+QUOTA_LEDGER_ENABLED = os.getenv('YOUTUBE_QUOTA_LEDGER', 'true').lower() == 'true'
+
+# 账本文件名（位于状态目录下）
+LEDGER_FILENAME = 'quota_ledger.sqlite3'
+
+# YouTube配额按太平洋时间午夜重置
+PACIFIC_TZ = ZoneInfo('America/Los_Angeles')
+
+_ledgers = {}
+_ledgers_lock = threading.Lock()
+
+
+class QuotaBudgetExceeded(Exception):
+    """本次请求会超出每日配额预算"""
+
+    def __init__(self, key_id, needed, remaining, day):
+        self.key_id = key_id
+        self.needed = needed
+        self.remaining = remaining
+        self.day = day
+        super().__init__(
+            f"配额预算不足: 密钥 {key_id} 在 {day}（太平洋时间）剩余 {remaining} 单位，本次需要 {needed} 单位"
+        )
+
+
+def quota_day(now=None):
+    """返回当前配额日（太平洋时间日期，YYYY-MM-DD）"""
+    now = now or datetime.now(PACIFIC_TZ)
+    return now.astimezone(PACIFIC_TZ).strftime('%Y-%m-%d')
+
+
+def next_reset(now=None):
+    """返回下一次配额重置时间（太平洋时间午夜，带时区）"""
+    now = (now or datetime.now(PACIFIC_TZ)).astimezone(PACIFIC_TZ)
+    tomorrow = now.date() + timedelta(days=1)
+    return datetime(tomorrow.year, tomorrow.month, tomorrow.day, tzinfo=PACIFIC_TZ)
+
+
+def key_id(api_key):
+    """API密钥的摘要标识（账本和日志中不保存明文密钥）"""
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]
+
+
+def request_cost(resource):
+    """单次请求的配额消耗"""
+    return QUOTA_COSTS.get(resource, 1)
+
+
+class QuotaLedger:
+    """配额账本，记录 (密钥, 配额日, 接口) 的请求次数和消耗单位"""
+
+    def __init__(self, path, budget=None):
+        self.path = path
+        self.budget = DAILY_BUDGET if budget is None else budget
+        self._lock = threading.Lock()
+        self._conn = state_store.connect(path)
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS quota_usage (
+                key_id TEXT NOT NULL,
+                day TEXT NOT NULL,
+                resource TEXT NOT NULL,
+                calls INTEGER NOT NULL DEFAULT 0,
+                units INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (key_id, day, resource)
+            )
+        ''')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS quota_exclusions (
+                key_id TEXT PRIMARY KEY,
+                until TEXT NOT NULL
+            )
+        ''')
+
+    def _used(self, kid, day):
+        row = self._conn.execute(
+            'SELECT COALESCE(SUM(units), 0) FROM quota_usage WHERE key_id = ? AND day = ?', (kid, day)
+        ).fetchone()
+        return row[0]
+
+    def reserve(self, api_key, resources):
+        """为即将发出的请求预留配额
+
+        Args:
+            api_key: API密钥
+            resources: 请求的接口名列表，如 ['search'] 或批量请求中的 ['videos', 'channels']
+
+        Raises:
+            QuotaBudgetExceeded: 预留后会超出每日预算（此时不记录任何消耗）
+        """
+        resources = list(resources)
+        needed = sum(request_cost(resource) for resource in resources)
+        kid = key_id(api_key)
+        day = quota_day()
+
+        with self._lock, state_store.transaction(self._conn):
+            remaining = self.budget - self._used(kid, day)
+            if needed > remaining:
+                raise QuotaBudgetExceeded(kid, needed, max(remaining, 0), day)
+            for resource in resources:
+                self._conn.execute('''
+                    INSERT INTO quota_usage (key_id, day, resource, calls, units) VALUES (?, ?, ?, 1, ?)
+                    ON CONFLICT (key_id, day, resource)
+                    DO UPDATE SET calls = calls + 1, units = units + excluded.units
+                ''', (kid, day, resource, request_cost(resource)))
+        return remaining - needed
+
+    def used(self, api_key, day=None):
+        """指定配额日（默认今天）已消耗的单位"""
+        with self._lock:
+            return self._used(key_id(api_key), day or quota_day())
+
+    def remaining(self, api_key):
+        """今天剩余的预算单位"""
+        return max(self.budget - self.used(api_key), 0)
+
+    def exclude(self, api_key, until):
+        """暂停使用密钥直到指定时间（带时区的datetime）"""
+        with self._lock, state_store.transaction(self._conn):
+            self._conn.execute(
+                'INSERT OR REPLACE INTO quota_exclusions (key_id, until) VALUES (?, ?)',
+                (key_id(api_key), until.astimezone(timezone.utc).isoformat())
+            )
+
+    def excluded_until(self, api_key, now=None):
+        """密钥暂停使用的截止时间，未暂停或已过期时返回None"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT until FROM quota_exclusions WHERE key_id = ?', (key_id(api_key),)
+            ).fetchone()
+        if not row:
+            return None
+        until = datetime.fromisoformat(row[0])
+        return until if until > (now or datetime.now(timezone.utc)) else None
+
+    def usage(self, day=None):
+        """指定配额日各密钥、各接口的用量 [(key_id, resource, calls, units)]"""
+        with self._lock:
+            return self._conn.execute(
+                'SELECT key_id, resource, calls, units FROM quota_usage WHERE day = ? ORDER BY key_id, resource',
+                (day or quota_day(),)
+            ).fetchall()
+
+
+def get_quota_ledger():
+    """获取进程内共享的配额账本（同一文件只打开一次）"""
+    path = state_store.state_path(LEDGER_FILENAME)
+    with _ledgers_lock:
+        ledger = _ledgers.get(path)
+        if ledger is None:
+            ledger = QuotaLedger(path)
+            _ledgers[path] = ledger
+    return ledger
+
+
+def print_status():
+    """打印今日各密钥的配额用量"""
+    ledger = get_quota_ledger()
+    day = quota_day()
+    print(f"📒 配额账本: {ledger.path}")
+    print(f"📅 配额日: {day}（太平洋时间，下次重置 {next_reset().strftime('%Y-%m-%d %H:%M %Z')}）")
+    print(f"💰 每日预算: {ledger.budget} 单位/密钥")
+
+    rows = ledger.usage(day)
+    if not rows:
+        print("ℹ️ 今日暂无用量记录")
+        return
+
+    totals = {}
+    for kid, resource, calls, units in rows:
+        print(f"   🔑 {kid} | {resource:<15} {calls:>6} 次请求 {units:>7} 单位")
+        totals[kid] = totals.get(kid, 0) + units
+    for kid, units in totals.items():
+        print(f"📊 密钥 {kid}: 已用 {units} / {ledger.budget} 单位")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'status':
+        print_status()
+    else:
+        print("用法: python quota_ledger.py status")
+        sys.exit(1)
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+令牌桶限速器
+
+按目标（YouTube API、每个webhook主机）分别限速，同一进程内所有线程共享同一个桶。
+桶内有令牌时请求立即发出，只有超出速率时才等待到下一个令牌可用，
+取代原来每次请求后固定的 time.sleep。
+
+配置（每秒请求数，可带突发容量，如 "5/10"）：
+- YOUTUBE_RATE_LIMIT: YouTube API（默认10）
+- WEBHOOK_RATE_LIMIT: 每个webhook主机的默认速率（默认5）
+- RATE_LIMITS: 按目标单独配置，如 "open.feishu.cn=2,hooks.example.com=20/40"
+"""
+
+import os
+import time
+import threading
+from urllib.parse import urlparse
+
+# YouTube API限速目标名
+YOUTUBE_DESTINATION = 'youtube'
+
+
+def parse_rate(value):
+    """解析 "速率" 或 "速率/突发容量"，返回 (rate, burst)"""
+    rate, _, burst = str(value).partition('/')
+    rate = float(rate)
+    return rate, float(burst) if burst else max(1.0, rate)
+
+
+def parse_rate_limits(value):
+    """解析 "目标=速率[/突发容量],..." 为 {目标: (rate, burst)}"""
+    limits = {}
+    for entry in (value or '').split(','):
+        destination, _, rate = entry.partition('=')
+        if destination.strip() and rate.strip():
+            limits[destination.strip()] = parse_rate(rate.strip())
+    return limits
+
+
+YOUTUBE_RATE_LIMIT = parse_rate(os.getenv('YOUTUBE_RATE_LIMIT', '10'))
+WEBHOOK_RATE_LIMIT = parse_rate(os.getenv('WEBHOOK_RATE_LIMIT', '5'))
+RATE_LIMITS = parse_rate_limits(os.getenv('RATE_LIMITS', ''))
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+class TokenBucket:
+    """线程安全的令牌桶
+
+    Args:
+        rate: 每秒补充的令牌数（<=0 表示不限速）
+        burst: 桶容量，即允许的最大突发请求数
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.waited = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens):
+        """预留令牌，返回需要等待的秒数（令牌不足时预支，保证先到先得）"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= tokens
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            self.waited += wait
+            return wait
+
+    def acquire(self, tokens=1):
+        """获取令牌，超出速率时阻塞等待，返回实际等待的秒数"""
+        if self.rate <= 0:
+            return 0.0
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+def destination_for(url):
+    """webhook URL对应的限速目标（主机名）"""
+    return urlparse(url).netloc or url
+
+
+def get_rate_limiter(destination):
+    """获取目标的共享令牌桶（YOUTUBE_DESTINATION 或webhook URL/主机名）"""
+    if destination != YOUTUBE_DESTINATION:
+        destination = destination_for(destination)
+    with _limiters_lock:
+        limiter = _limiters.get(destination)
+        if limiter is None:
+            default = YOUTUBE_RATE_LIMIT if destination == YOUTUBE_DESTINATION else WEBHOOK_RATE_LIMIT
+            limiter = TokenBucket(*RATE_LIMITS.get(destination, default))
+            _limiters[destination] = limiter
+    return limiter
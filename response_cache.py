@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""
+YouTube API响应缓存（SQLite）
+
+以规范化后的请求参数为键，把 ``<resource>().list`` 的响应保存在状态目录下，
+重复运行时在有效期内直接复用，命中缓存的请求不发出、不计入配额。
+
+有效期按接口和part分别配置，取请求涉及的最短值，例如频道元数据（snippet等）缓存数小时，
+statistics只缓存几分钟。缓存总大小超过上限时按最近最少使用（LRU）淘汰。
+
+响应的etag与响应一起保存。缓存过期后刷新时带上 If-None-Match，服务端返回304表示内容未变，
+直接复用缓存的响应体并重新计算有效期，省去下载和解析。
+
+配置：
+- YOUTUBE_RESPONSE_CACHE: 是否启用（默认true）
+- YOUTUBE_CACHE_TTLS: 覆盖有效期（秒），如 "channels=86400,statistics=300"
+- YOUTUBE_CACHE_MAX_MB: 缓存总大小上限（默认100MB）
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+
+from googleapiclient.errors import HttpError
+
+import state_store
+
+RESPONSE_CACHE_ENABLED = os.getenv('YOUTUBE_RESPONSE_CACHE', 'true').lower() == 'true'
+
+# 缓存文件名（位于状态目录下）
+CACHE_FILENAME = 'response_cache.sqlite3'
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+
+# 有效期（秒）：按接口名和part名配置，请求的有效期取其中涉及到的最小值
+DEFAULT_TTLS = {
+    # 接口
+    'search': 1 * HOUR,
+    'playlistItems': 30 * MINUTE,
+    'commentThreads': 30 * MINUTE,
+    'comments': 30 * MINUTE,
+    'videos': 6 * HOUR,
+    'channels': 12 * HOUR,
+    # part
+    'statistics': 10 * MINUTE,
+    'snippet': 6 * HOUR,
+    'status': 6 * HOUR,
+    'contentDetails': 12 * HOUR,
+    'brandingSettings': 24 * HOUR,
+    'topicDetails': 24 * HOUR,
+    'recordingDetails': 24 * HOUR,
+}
+
+# 请求参数中不参与缓存键的字段（API密钥不同不影响响应内容）
+IGNORED_PARAMS = {'key'}
+
+
+def parse_ttls(value):
+    """解析 "名称=秒数,..." 为 {名称: 秒数}"""
+    ttls = {}
+    for entry in (value or '').split(','):
+        name, _, seconds = entry.partition('=')
+        if name.strip() and seconds.strip():
+            ttls[name.strip()] = int(seconds)
+    return ttls
+
+
+CACHE_TTLS = {**DEFAULT_TTLS, **parse_ttls(os.getenv('YOUTUBE_CACHE_TTLS', ''))}
+CACHE_MAX_BYTES = int(float(os.getenv('YOUTUBE_CACHE_MAX_MB', '100')) * 1024 * 1024)
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def normalize_params(params):
+    """规范化请求参数：去掉None和忽略字段，逗号列表去空格，按键排序
+
+    id列表保持原顺序（响应中items的顺序与之对应）。
+    """
+    normalized = {}
+    for name, value in params.items():
+        if value is None or name in IGNORED_PARAMS:
+            continue
+        if isinstance(value, str) and ',' in value:
+            value = ','.join(item.strip() for item in value.split(','))
+        normalized[name] = str(value) if not isinstance(value, str) else value
+    return dict(sorted(normalized.items()))
+
+
+def cache_key(resource, params):
+    """请求的缓存键"""
+    payload = json.dumps([resource, normalize_params(params)], ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def request_ttl(resource, params):
+    """请求的有效期（秒）：接口和各part有效期中的最小值"""
+    names = [resource] + [part.strip() for part in str(params.get('part') or '').split(',') if part.strip()]
+    ttls = [CACHE_TTLS[name] for name in names if name in CACHE_TTLS]
+    return min(ttls) if ttls else 0
+
+
+class ResponseCache:
+    """响应缓存，记录每个接口的命中统计"""
+
+    def __init__(self, path, max_bytes=None):
+        self.path = path
+        self.max_bytes = CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.stats = {}
+        self.revalidated = {}
+        self._lock = threading.Lock()
+        self._conn = state_store.connect(path)
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS responses (
+                cache_key TEXT PRIMARY KEY,
+                resource TEXT NOT NULL,
+                response TEXT NOT NULL,
+                etag TEXT,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)')
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(responses)')}
+        if 'etag' not in columns:
+            # 兼容没有etag列的旧缓存文件
+            self._conn.execute('ALTER TABLE responses ADD COLUMN etag TEXT')
+
+    def _count(self, resource, hit):
+        counts = self.stats.setdefault(resource, [0, 0])
+        counts[0 if hit else 1] += 1
+
+    def get(self, resource, params):
+        """读取有效期内的缓存响应，未命中返回None"""
+        ttl = request_ttl(resource, params)
+        key = cache_key(resource, params)
+        now = time.time()
+        with self._lock:
+            row = None
+            if ttl > 0:
+                row = self._conn.execute(
+                    'SELECT response FROM responses WHERE cache_key = ? AND stored_at > ?', (key, now - ttl)
+                ).fetchone()
+                if row:
+                    self._conn.execute('UPDATE responses SET accessed_at = ? WHERE cache_key = ?', (now, key))
+            self._count(resource, row is not None)
+        return json.loads(row[0]) if row else None
+
+    def get_stale(self, resource, params):
+        """读取缓存响应及其etag（不论是否过期），没有缓存时返回 (None, None)"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT response, etag FROM responses WHERE cache_key = ?', (cache_key(resource, params),)
+            ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else (None, None)
+
+    def refresh(self, resource, params):
+        """服务端确认内容未变（304），重新计算有效期"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'UPDATE responses SET stored_at = ?, accessed_at = ? WHERE cache_key = ?',
+                (now, now, cache_key(resource, params))
+            )
+            self.revalidated[resource] = self.revalidated.get(resource, 0) + 1
+
+    def put(self, resource, params, response):
+        """保存响应，超出大小上限时淘汰最久未使用的条目"""
+        if request_ttl(resource, params) <= 0:
+            return
+        payload = json.dumps(response, ensure_ascii=False, separators=(',', ':'))
+        now = time.time()
+        with self._lock, state_store.transaction(self._conn):
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses (cache_key, resource, response, etag, size, stored_at, accessed_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (cache_key(resource, params), resource, payload, response.get('etag'),
+                 len(payload.encode('utf-8')), now, now)
+            )
+            self._evict()
+
+    def _evict(self):
+        """按LRU淘汰，直到总大小不超过上限的90%"""
+        total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = self.max_bytes * 0.9
+        for key, size in self._conn.execute(
+            'SELECT cache_key, size FROM responses ORDER BY accessed_at'
+        ).fetchall():
+            if total <= target:
+                break
+            self._conn.execute('DELETE FROM responses WHERE cache_key = ?', (key,))
+            total -= size
+
+    def hit_rates(self):
+        """各接口的命中统计 {resource: (命中数, 总请求数)}"""
+        with self._lock:
+            return {resource: (hits, hits + misses) for resource, (hits, misses) in self.stats.items()}
+
+
+def get_response_cache():
+    """获取进程内共享的响应缓存，未启用时返回None"""
+    if not RESPONSE_CACHE_ENABLED:
+        return None
+    path = state_store.state_path(CACHE_FILENAME)
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = ResponseCache(path)
+            _caches[path] = cache
+    return cache
+
+
+def is_not_modified(error):
+    """条件请求返回304（内容未变）"""
+    return isinstance(error, HttpError) and error.resp.status == 304
+
+
+def cached_list(resource, params, fetch):
+    """先查缓存，未命中时调用fetch(etag)获取响应并写入缓存
+
+    缓存已过期但有etag时，fetch会带上If-None-Match；返回304时复用缓存的响应体。
+    """
+    cache = get_response_cache()
+    if cache is None:
+        return fetch(None)
+    response = cache.get(resource, params)
+    if response is not None:
+        return response
+
+    stale, etag = cache.get_stale(resource, params)
+    try:
+        response = fetch(etag)
+    except HttpError as e:
+        if stale is None or not is_not_modified(e):
+            raise
+        cache.refresh(resource, params)
+        return stale
+    cache.put(resource, params, response)
+    return response
+
+
+def cached_batch(requests, fetch_many):
+    """批量版cached_list：只对未命中的 ``(resource, params)`` 调用fetch_many(requests, etags)，按原顺序返回
+
+    fetch_many返回的结果中的异常不写入缓存，304结果替换为缓存的响应体。
+    """
+    cache = get_response_cache()
+    if cache is None:
+        return fetch_many(requests, [None] * len(requests))
+    results = [cache.get(resource, params) for resource, params in requests]
+    missing = [index for index, result in enumerate(results) if result is None]
+    if missing:
+        stale = [cache.get_stale(*requests[index]) for index in missing]
+        fetched = fetch_many([requests[index] for index in missing], [etag for _, etag in stale])
+        for index, (stale_response, _), response in zip(missing, stale, fetched):
+            if stale_response is not None and is_not_modified(response):
+                cache.refresh(*requests[index])
+                response = stale_response
+            elif not isinstance(response, Exception):
+                cache.put(*requests[index], response)
+            results[index] = response
+    return results
+
+
+def print_cache_summary():
+    """打印本次运行的缓存命中率"""
+    cache = get_response_cache()
+    if cache is None:
+        return
+    rates = cache.hit_rates()
+    if not rates:
+        return
+    total_hits = sum(hits for hits, _ in rates.values())
+    total = sum(count for _, count in rates.values())
+    print(f"🗄️ 响应缓存命中率: {total_hits}/{total} ({total_hits / total:.0%})")
+    for resource, (hits, count) in sorted(rates.items()):
+        revalidated = cache.revalidated.get(resource, 0)
+        note = f"，304未变化 {revalidated}" if revalidated else ""
+        print(f"   {resource}: {hits}/{count} ({hits / count:.0%}{note})")
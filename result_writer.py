@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+流式写入JSON结果文件
+
+结果中的大列表（如评论）逐批追加写入文件，内存中不保留全部数据。
+写出的文件与一次性 ``json.dump(result)`` 的结构相同：
+
+    {"video_info": {...}, "comments": [...], "total_comments_fetched": N, ...}
+"""
+
+import json
+
+
+class StreamingJsonWriter:
+    """以JSON对象写入文件，其中一个列表字段逐条追加
+
+    Args:
+        path: 输出文件路径
+        header: 列表字段之前的字段
+        list_field: 逐条追加的列表字段名
+    """
+
+    def __init__(self, path, header, list_field):
+        self.path = path
+        self.count = 0
+        self._file = open(path, 'w', encoding='utf-8')
+        self._file.write('{\n')
+        for key, value in header.items():
+            self._file.write(f"  {json.dumps(key)}: {json.dumps(value, ensure_ascii=False)},\n")
+        self._file.write(f"  {json.dumps(list_field)}: [")
+
+    def write(self, items):
+        """追加一批列表元素"""
+        for item in items:
+            self._file.write(',\n    ' if self.count else '\n    ')
+            self._file.write(json.dumps(item, ensure_ascii=False))
+            self.count += 1
+        self._file.flush()
+
+    def close(self, footer=None):
+        """写入列表字段之后的字段并关闭文件"""
+        self._file.write('\n  ]' if self.count else ']')
+        for key, value in (footer or {}).items():
+            self._file.write(f",\n  {json.dumps(key)}: {json.dumps(value, ensure_ascii=False)}")
+        self._file.write('\n}\n')
+        self._file.close()
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+请求重试
+
+对YouTube API调用和webhook发送统一重试：
+- 按错误类型分类：5xx、429、rateLimitExceeded、backendError、网络错误可重试；
+  quotaExceeded、commentsDisabled等其他4xx错误不重试
+- 指数退避（上限 RETRY_MAX_DELAY 秒）加随机抖动，避免多个工作进程同时重试
+- 服务端返回 Retry-After 时至少等待其指定的时间
+
+配置：
+- RETRY_MAX_ATTEMPTS: 最多尝试次数（默认5，含首次）
+- RETRY_BASE_DELAY: 首次重试的退避基数（秒，默认1）
+- RETRY_MAX_DELAY: 单次退避上限（秒，默认32）
+"""
+
+import os
+import json
+import time
+import random
+import socket
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import httplib2
+import requests
+from googleapiclient.errors import HttpError
+
+from key_pool import QUOTA_EXHAUSTED_REASONS
+
+RETRY_MAX_ATTEMPTS = int(os.getenv('RETRY_MAX_ATTEMPTS', '5'))
+RETRY_BASE_DELAY = float(os.getenv('RETRY_BASE_DELAY', '1'))
+RETRY_MAX_DELAY = float(os.getenv('RETRY_MAX_DELAY', '32'))
+
+# 可重试的HTTP状态码
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# 可重试的YouTube错误原因（即使状态码是403）
+RETRYABLE_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded', 'backendError', 'internalError'}
+
+# 不可重试的YouTube错误原因
+PERMANENT_REASONS = QUOTA_EXHAUSTED_REASONS | {
+    'commentsDisabled', 'forbidden', 'videoNotFound', 'channelNotFound', 'playlistNotFound',
+    'keyInvalid', 'badRequest', 'invalidParameter', 'processingFailure'
+}
+
+# 可重试的网络异常
+RETRYABLE_EXCEPTIONS = (
+    socket.timeout, TimeoutError, ConnectionError, httplib2.HttpLib2Error,
+    requests.exceptions.ConnectionError, requests.exceptions.Timeout
+)
+
+
+class TransientResponseError(Exception):
+    """webhook返回可重试的HTTP状态码"""
+
+    def __init__(self, response):
+        self.response = response
+        self.status = response.status_code
+        super().__init__(f"HTTP {response.status_code}: {response.text[:200]}")
+
+
+def http_error_reasons(error):
+    """解析HttpError响应体中的错误原因，如 {'quotaExceeded'}"""
+    try:
+        payload = json.loads(error.content.decode('utf-8'))
+    except (ValueError, AttributeError):
+        return set()
+    details = payload.get('error', {}) if isinstance(payload, dict) else {}
+    return {item.get('reason') for item in details.get('errors', []) if item.get('reason')}
+
+
+def is_retryable(error):
+    """判断错误是否值得重试"""
+    if isinstance(error, HttpError):
+        reasons = http_error_reasons(error)
+        if reasons & PERMANENT_REASONS:
+            return False
+        return bool(reasons & RETRYABLE_REASONS) or error.resp.status in RETRYABLE_STATUS
+    if isinstance(error, TransientResponseError):
+        return True
+    return isinstance(error, RETRYABLE_EXCEPTIONS)
+
+
+def retry_after(error):
+    """读取错误响应中的Retry-After（秒），没有时返回None"""
+    if isinstance(error, HttpError):
+        value = error.resp.get('retry-after')
+    elif isinstance(error, TransientResponseError):
+        value = error.response.headers.get('Retry-After')
+    else:
+        return None
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def backoff_delay(attempt, error=None):
+    """第attempt次重试（从1开始）前的等待时间：带抖动的指数退避，且不少于Retry-After"""
+    ceiling = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** (attempt - 1)))
+    delay = random.uniform(ceiling / 2, ceiling)
+    server_delay = retry_after(error) if error is not None else None
+    if server_delay is not None:
+        delay = max(delay, server_delay)
+    return delay
+
+
+def describe_error(error):
+    """错误的简短描述，用于重试日志"""
+    if isinstance(error, HttpError):
+        reasons = ','.join(sorted(http_error_reasons(error))) or 'unknown'
+        return f"HTTP {error.resp.status} {reasons}"
+    return f"{type(error).__name__}: {error}"
+
+
+def call_with_retry(func, description='请求', max_attempts=None, retryable=None):
+    """执行func，遇到可重试错误时退避后重试，不可重试或次数用尽时抛出最后一个错误
+
+    retryable为判断错误是否可重试的函数，默认is_retryable
+    """
+    max_attempts = max_attempts or RETRY_MAX_ATTEMPTS
+    retryable = retryable or is_retryable
+    attempt = 1
+    while True:
+        try:
+            return func()
+        except Exception as e:
+            if attempt >= max_attempts or not retryable(e):
+                raise
+            delay = backoff_delay(attempt, e)
+            print(f"🔁 {description}失败（{describe_error(e)}），{delay:.1f}s 后第 {attempt}/{max_attempts - 1} 次重试")
+            time.sleep(delay)
+            attempt += 1
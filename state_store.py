@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+本地状态存储（SQLite）
+
+配额账本等需要跨运行保存的状态统一放在状态目录下（默认 .youtube_cache，
+可通过环境变量 YOUTUBE_STATE_DIR 覆盖）。数据库使用WAL模式和busy_timeout，
+多个工作进程可以同时读写同一个文件。
+"""
+
+import os
+import sqlite3
+from contextlib import contextmanager
+
+# 状态目录
+STATE_DIR = os.getenv('YOUTUBE_STATE_DIR', '.youtube_cache')
+
+# 其他进程持有写锁时的最长等待时间（毫秒）
+BUSY_TIMEOUT_MS = 30000
+
+
+def state_path(filename):
+    """返回状态目录下的文件路径（目录不存在时自动创建）"""
+    os.makedirs(STATE_DIR, exist_ok=True)
+    return os.path.join(STATE_DIR, filename)
+
+
+def connect(path):
+    """打开SQLite数据库（自动提交模式，事务通过transaction显式开启）"""
+    conn = sqlite3.connect(
+        path,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        isolation_level=None,
+        check_same_thread=False
+    )
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+@contextmanager
+def transaction(conn):
+    """写事务：BEGIN IMMEDIATE立即获取写锁，保证"读取-检查-写入"在多进程间原子执行"""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield conn
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    conn.execute('COMMIT')
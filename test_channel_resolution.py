@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试频道handle解析结果的本地保存
+验证频道链接解析、重复运行时不再请求forHandle直接获取playlistItems，以及播放列表失效时重新解析
+"""
+
+import sys
+import json
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from youtube_search_webhook import parse_channel_handle, get_channel_videos
+
+
+class FakeChannelClient:
+    """模拟频道模式用到的channels/playlistItems/videos请求"""
+
+    def __init__(self, uploads='UUabc'):
+        self.uploads = uploads
+        self.calls = []
+
+    def fetch(self, resource, if_none_match=None, **params):
+        self.calls.append((resource, params))
+        if resource == 'channels':
+            return {'items': [{
+                'id': 'UCabc',
+                'snippet': {'title': 'Demo'},
+                'statistics': {'subscriberCount': '1', 'videoCount': '1', 'viewCount': '1'},
+                'contentDetails': {'relatedPlaylists': {'uploads': self.uploads}},
+            }]}
+        if resource == 'playlistItems':
+            if params['playlistId'] != self.uploads:
+                content = json.dumps({'error': {'code': 404, 'errors': [{'reason': 'playlistNotFound'}]}})
+                raise HttpError(httplib2.Response({'status': 404}), content.encode('utf-8'))
+            return {'items': [{'contentDetails': {'videoId': 'v1'}}]}
+        if resource == 'videos':
+            return {'items': [{'id': 'v1', 'snippet': {'title': 'video', 'publishedAt': '2024-05-01T00:00:00Z'},
+                               'statistics': {'viewCount': '10'}}]}
+        raise ValueError(f"未模拟的资源: {resource}")
+
+    def list(self, resource, **params):
+        return self.fetch(resource, **params)
+
+
+def run_channel(handle='@Demo'):
+    """获取频道视频（客户端由fixture替换）"""
+    return get_channel_videos('test-key', handle, max_results=1)
+
+
+def test_parse_channel_handle():
+    """支持@handle、裸handle、handle链接和频道ID链接"""
+    assert parse_channel_handle('@Demo') == ('forHandle', '@Demo')
+    assert parse_channel_handle('Demo') == ('forHandle', '@Demo')
+    assert parse_channel_handle('https://www.youtube.com/@Demo/videos') == ('forHandle', '@Demo')
+    assert parse_channel_handle('youtube.com/channel/UCabc') == ('id', 'UCabc')
+    print("✅ 频道标识解析正确")
+
+
+def test_second_run_skips_handle_lookup(use_fake_client):
+    """第二次运行使用本地解析结果，直接请求playlistItems"""
+    first = use_fake_client(FakeChannelClient())
+    run_channel()
+    second = use_fake_client(FakeChannelClient())
+    result = run_channel(handle='https://www.youtube.com/@demo')
+
+    assert [resource for resource, _ in first.calls][:2] == ['channels', 'playlistItems']
+    assert 'forHandle' in first.calls[0][1]
+    assert second.calls[0][0] == 'playlistItems'
+    assert not any(resource == 'channels' for resource, _ in second.calls)
+    assert result['channel_info']['channel_id'] == 'UCabc' and result['total_videos_fetched'] == 1
+    print("✅ 重复运行不再请求forHandle")
+
+
+def test_stale_resolution_is_refreshed(use_fake_client):
+    """上传播放列表不存在时重新解析并从新的播放列表获取"""
+    use_fake_client(FakeChannelClient(uploads='UUold'))
+    run_channel()
+    fake = use_fake_client(FakeChannelClient(uploads='UUnew'))
+    result = run_channel()
+    third = use_fake_client(FakeChannelClient(uploads='UUnew'))
+    run_channel()
+
+    assert [resource for resource, _ in fake.calls][:3] == ['playlistItems', 'channels', 'playlistItems']
+    assert fake.calls[2][1]['playlistId'] == 'UUnew'
+    assert result['total_videos_fetched'] == 1
+    assert third.calls[0][0] == 'playlistItems' and third.calls[0][1]['playlistId'] == 'UUnew'
+    print("✅ 播放列表失效时重新解析")
+
+
+def main():
+    """主函数（测试使用conftest.py中的fixture，通过pytest运行）"""
+    print("🧪 频道解析结果本地保存测试")
+    print("=" * 60)
+    return pytest.main([__file__, '-q', '-s'])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试频道增量同步
+模拟一个5000个视频的频道，验证首次同步后保存同步位置，再次同步只请求一页并只输出新上传的视频，
+以及按发布时间范围在获取详情前筛选、早于下限即停止翻页
+"""
+
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from channel_store import get_channel_store
+from youtube_search_webhook import get_channel_videos
+
+START = datetime(2025, 6, 1, tzinfo=timezone.utc)
+
+
+class FakeUploadsClient:
+    """模拟上传播放列表按发布时间倒序分页"""
+
+    def __init__(self, total=5000, page_size=50):
+        self.videos = [self._video(index) for index in range(total)]
+        self.page_size = page_size
+        self.calls = []
+
+    @staticmethod
+    def _video(index):
+        published_at = (START - timedelta(hours=index)).strftime('%Y-%m-%dT%H:%M:%SZ')
+        return f'v{index}', published_at
+
+    def upload(self, count):
+        """在播放列表开头加入新上传的视频"""
+        new = [(f'new{i}', (START + timedelta(minutes=count - i)).strftime('%Y-%m-%dT%H:%M:%SZ'))
+               for i in range(count)]
+        self.videos = new + self.videos
+
+    def list(self, resource, **params):
+        self.calls.append(resource)
+        if resource == 'channels':
+            return {'items': [{
+                'id': 'UCsync',
+                'snippet': {'title': 'Sync'},
+                'statistics': {'subscriberCount': '1', 'videoCount': str(len(self.videos)), 'viewCount': '1'},
+                'contentDetails': {'relatedPlaylists': {'uploads': 'UUsync'}},
+            }]}
+        if resource == 'playlistItems':
+            offset = int(params.get('pageToken') or 0)
+            page = self.videos[offset:offset + min(params['maxResults'], self.page_size)]
+            response = {'items': [{'contentDetails': {'videoId': video_id, 'videoPublishedAt': published_at}}
+                                  for video_id, published_at in page]}
+            if offset + len(page) < len(self.videos):
+                response['nextPageToken'] = str(offset + len(page))
+            return response
+        if resource == 'videos':
+            published = dict(self.videos)
+            return {'items': [{'id': video_id, 'snippet': {'title': video_id, 'publishedAt': published[video_id]},
+                               'statistics': {'viewCount': '1'}}
+                              for video_id in params['id'].split(',')]}
+        raise ValueError(f"未模拟的资源: {resource}")
+
+    def fetch(self, resource, if_none_match=None, **params):
+        return self.list(resource, **params)
+
+
+def run_sync(max_results, incremental=True, **kwargs):
+    """获取频道视频（默认增量，客户端由fixture替换）"""
+    return get_channel_videos('test-key', '@sync', max_results=max_results, incremental=incremental, **kwargs)
+
+
+def test_incremental_sync_stops_at_watermark(use_fake_client):
+    """再次同步只请求一页，只输出新上传的视频"""
+    fake = use_fake_client(FakeUploadsClient())
+    first = run_sync(max_results=100)
+    first_watermark = get_channel_store().watermark('UCsync')
+
+    fake.upload(3)
+    fake.calls = []
+    second = run_sync(max_results=5000)
+    second_watermark = get_channel_store().watermark('UCsync')
+
+    fake.calls = []
+    third = run_sync(max_results=5000)
+
+    assert first['total_videos_fetched'] == 100
+    assert first_watermark == FakeUploadsClient._video(0)
+    assert fake.calls == ['playlistItems']
+    assert sorted(video['video_id'] for video in second['videos']) == ['new0', 'new1', 'new2']
+    assert second_watermark[0] == 'new0'
+    assert third['total_videos_fetched'] == 0
+    print("✅ 增量同步到达同步位置即停止")
+
+
+def test_capped_sync_does_not_skip_uploads(use_fake_client):
+    """新视频多于数量上限时分多次交付，每个新视频恰好交付一次"""
+    fake = use_fake_client(FakeUploadsClient())
+    run_sync(max_results=50)
+    fake.upload(120)
+    delivered = []
+    for _ in range(4):
+        delivered.append([video['video_id'] for video in run_sync(max_results=50)['videos']])
+
+    assert [len(videos) for videos in delivered] == [50, 50, 20, 0]
+    assert sorted(video_id for videos in delivered for video_id in videos) == sorted(f'new{i}' for i in range(120))
+    assert set(delivered[0]) == {f'new{i}' for i in range(70, 120)}
+    print("✅ 超过数量上限的新视频分多次交付，不会被跳过")
+
+
+def test_date_window_stops_paging(use_fake_client):
+    """早于published_after即停止翻页，晚于published_before的视频不获取详情"""
+    fake = use_fake_client(FakeUploadsClient())
+    result = run_sync(max_results=5000, incremental=False,
+                      published_after='2025-05-31', published_before='2025-05-31T12:00:00Z')
+
+    assert fake.calls == ['channels', 'playlistItems', 'videos']
+    assert sorted(video['video_id'] for video in result['videos']) == sorted(f'v{i}' for i in range(12, 25))
+    print("✅ 按发布时间范围筛选并提前停止翻页")
+
+
+def main():
+    """主函数（测试使用conftest.py中的fixture，通过pytest运行）"""
+    print("🧪 频道增量同步测试")
+    print("=" * 60)
+    return pytest.main([__file__, '-q', '-s'])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
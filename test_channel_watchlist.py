@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试关注列表模式的变化检测
+模拟120个关注频道，验证每50个频道一个检测请求，第二次运行只抓取视频数有变化的频道
+"""
+
+import os
+import sys
+import threading
+
+import pytest
+
+from youtube_search_webhook import parse_watchlist, watch_channels
+
+
+class FakeWatchlistClient:
+    """模拟channels/playlistItems/videos请求，每个频道有video_counts[频道ID]个视频"""
+
+    def __init__(self, channels=120):
+        self.video_counts = {f'UCch{i}': 1 for i in range(channels)}
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def _channel(self, channel_id):
+        return {
+            'id': channel_id,
+            'snippet': {'title': channel_id},
+            'statistics': {'subscriberCount': '1', 'videoCount': str(self.video_counts[channel_id]), 'viewCount': '1'},
+            'contentDetails': {'relatedPlaylists': {'uploads': 'UU' + channel_id[2:]}},
+        }
+
+    def list(self, resource, **params):
+        with self.lock:
+            self.calls.append((resource, params))
+        if resource == 'channels':
+            ids = ['UC' + params['forHandle'][1:]] if 'forHandle' in params else params['id'].split(',')
+            return {'items': [self._channel(channel_id) for channel_id in ids if channel_id in self.video_counts]}
+        if resource == 'playlistItems':
+            channel_id = 'UC' + params['playlistId'][2:]
+            return {'items': [
+                {'contentDetails': {'videoId': f'{channel_id}-v{i}', 'videoPublishedAt': f'2025-01-{i + 1:02d}T00:00:00Z'}}
+                for i in range(self.video_counts[channel_id])
+            ]}
+        if resource == 'videos':
+            return {'items': [{'id': video_id, 'snippet': {'title': video_id}, 'statistics': {'viewCount': '1'}}
+                              for video_id in params['id'].split(',')]}
+        raise ValueError(f"未模拟的资源: {resource}")
+
+    def fetch(self, resource, if_none_match=None, **params):
+        return self.list(resource, **params)
+
+
+def run_watchlist(handles):
+    """执行关注列表模式（客户端由fixture替换）"""
+    return watch_channels('test-key', handles, max_results=50, concurrency=4)
+
+
+def test_parse_watchlist(tmp_path):
+    """支持逗号/换行分隔和列表文件，去重并忽略注释"""
+    assert parse_watchlist('@a, @b,\n@a\n# 注释') == ['@a', '@b']
+    path = os.path.join(tmp_path, 'watchlist.txt')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('# 关注列表\n@a\nhttps://www.youtube.com/@b\n')
+    assert parse_watchlist(path) == ['@a', 'https://www.youtube.com/@b']
+    print("✅ 关注列表解析正确")
+
+
+def test_only_changed_channels_are_crawled(use_fake_client):
+    """第二次运行只用3个检测请求，并只抓取视频数变化的频道"""
+    handles = [f'@ch{i}' for i in range(120)]
+    fake = use_fake_client(FakeWatchlistClient())
+    first = run_watchlist(handles)
+
+    fake.video_counts['UCch7'] = 2
+    fake.calls = []
+    second = run_watchlist(handles)
+
+    assert first['checked'] == 120 and first['changed'] == 120 and first['check_requests'] == 3
+    assert second['changed'] == 1 and list(second['results']) == ['@ch7']
+    assert second['results']['@ch7']['total_videos_fetched'] == 2
+    check_calls = [params for resource, params in fake.calls
+                   if resource == 'channels' and params['part'] == 'statistics,contentDetails']
+    assert len(check_calls) == 3 and all(len(params['id'].split(',')) <= 50 for params in check_calls)
+    assert [resource for resource, _ in fake.calls].count('playlistItems') == 1
+    print("✅ 只抓取有变化的频道")
+
+
+def main():
+    """主函数（测试使用conftest.py中的fixture，通过pytest运行）"""
+    print("🧪 关注列表变化检测测试")
+    print("=" * 60)
+    return pytest.main([__file__, '-q', '-s'])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试评论回复展开
+验证回复数多于内嵌回复的线程通过comments().list(parentId)分页获取完整回复，且不同线程并发执行
+"""
+
+import time
+import threading
+
+from youtube_search_webhook import iter_video_comments
+
+LATENCY = 0.1  # 模拟每次API请求的往返延迟（秒）
+
+
+class FakeRepliesClient:
+    """模拟commentThreads（内嵌最多5条回复）和comments(parentId)请求"""
+
+    def __init__(self, reply_counts):
+        self.reply_counts = reply_counts
+        self.calls = []
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _reply(parent_id, index):
+        return {'snippet': {'textDisplay': f'{parent_id} reply {index}', 'likeCount': index}}
+
+    def list(self, resource, **params):
+        with self.lock:
+            self.calls.append((resource, params))
+        time.sleep(LATENCY)
+        if resource == 'commentThreads':
+            return {'items': [
+                {'id': f't{i}',
+                 'snippet': {'totalReplyCount': count, 'topLevelComment': {'snippet': {'textDisplay': f'thread {i}'}}},
+                 'replies': {'comments': [self._reply(f't{i}', j) for j in range(min(count, 5))]}}
+                for i, count in enumerate(self.reply_counts)
+            ]}
+        if resource == 'comments':
+            parent_id = params['parentId']
+            total = self.reply_counts[int(parent_id[1:])]
+            offset = int(params.get('pageToken') or 0)
+            count = min(params['maxResults'], total - offset)
+            response = {'items': [self._reply(parent_id, offset + j) for j in range(count)]}
+            if offset + count < total:
+                response['nextPageToken'] = str(offset + count)
+            return response
+        raise ValueError(f"未模拟的资源: {resource}")
+
+
+def test_replies_expanded_concurrently():
+    """10个线程各250条回复（3页），并发展开的耗时接近单个线程的耗时"""
+    fake = FakeRepliesClient([250] * 10 + [3, 0])
+    started = time.perf_counter()
+    comments = list(iter_video_comments(fake, 'v1', include_replies=True, reply_concurrency=10))
+    elapsed = time.perf_counter() - started
+
+    assert [len(comment['replies']) for comment in comments] == [250] * 10 + [3, 0]
+    assert comments[0]['replies'][249]['text'] == 't0 reply 249'
+    reply_calls = [params for resource, params in fake.calls if resource == 'comments']
+    assert len(reply_calls) == 30
+    assert fake.calls[0][1]['part'] == 'snippet,replies'
+    serial = (1 + len(reply_calls)) * LATENCY
+    assert elapsed < serial / 2, f"回复展开没有并发: {elapsed:.2f}s"
+    print(f"✅ 回复并发展开: {elapsed:.2f}s (串行约 {serial:.1f}s)")
+
+
+def test_replies_off_by_default():
+    """默认不请求replies也不展开"""
+    fake = FakeRepliesClient([250])
+    comments = list(iter_video_comments(fake, 'v1'))
+    assert 'replies' not in comments[0]
+    assert [resource for resource, _ in fake.calls] == ['commentThreads']
+    assert fake.calls[0][1]['part'] == 'snippet'
+    print("✅ 默认不展开回复")
+
+
+def main():
+    """主函数"""
+    print("🧪 评论回复展开测试")
+    print("=" * 60)
+    test_replies_expanded_concurrently()
+    test_replies_off_by_default()
+    print("\n✨ 测试完成！")
+
+
+if __name__ == "__main__":
+    main()
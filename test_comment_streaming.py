@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试评论分页获取和流式输出
+验证跟随nextPageToken获取超过100条评论，超过分批大小时分批发送webhook并逐批写入结果文件
+"""
+
+import os
+import sys
+import json
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from youtube_search_webhook import iter_video_comments, get_video_comments
+
+
+class FakeCommentsClient:
+    """模拟videos和commentThreads请求，评论按pageToken偏移分页"""
+
+    def __init__(self, total_comments, fail_at=None):
+        self.total_comments = total_comments
+        self.fail_at = fail_at
+        self.calls = []
+
+    def list(self, resource, **params):
+        self.calls.append((resource, params))
+        if resource == 'videos':
+            return {'items': [{'id': params['id'], 'snippet': {'title': 'video'}, 'statistics': {}}]}
+        if resource == 'commentThreads':
+            offset = int(params.get('pageToken') or 0)
+            if self.fail_at is not None and offset >= self.fail_at:
+                raise HttpError(httplib2.Response({'status': 500}),
+                                b'{"error": {"errors": [{"reason": "backendError"}]}}')
+            count = min(params['maxResults'], self.total_comments - offset)
+            response = {'items': [
+                {'snippet': {'totalReplyCount': 0, 'topLevelComment': {'snippet': {
+                    'textDisplay': f'comment {offset + i}', 'likeCount': offset + i}}}}
+                for i in range(count)
+            ]}
+            if offset + count < self.total_comments:
+                response['nextPageToken'] = str(offset + count)
+            return response
+        raise ValueError(f"未模拟的资源: {resource}")
+
+
+def test_pagination_beyond_100():
+    """max_comments超过100时跟随nextPageToken翻页"""
+    fake = FakeCommentsClient(350)
+    comments = list(iter_video_comments(fake, 'v1', max_comments=250))
+    assert len(comments) == 250
+    assert [params['maxResults'] for _, params in fake.calls] == [100, 100, 50]
+
+    fake = FakeCommentsClient(350)
+    assert len(list(iter_video_comments(fake, 'v1'))) == 350
+    print("✅ 评论分页获取正确")
+
+
+def test_small_result_unchanged(use_fake_client, webhook_sent):
+    """不超过分批大小时按点赞数排序，一次性发送"""
+    use_fake_client(FakeCommentsClient(30))
+    result = get_video_comments('test-key', 'v1', max_comments=50, webhook_url='https://hooks.example.com/c')
+    assert result['total_comments_fetched'] == 30
+    assert result['comments'][0]['like_count'] == 29
+    assert len(webhook_sent) == 1 and 'batch_info' not in webhook_sent[0]
+    print("✅ 少量评论一次性发送")
+
+
+def test_streamed_in_chunks(use_fake_client, webhook_sent, tmp_path):
+    """超过分批大小时分批发送，结果文件逐批写入且是完整的JSON"""
+    use_fake_client(FakeCommentsClient(1050))
+    output_file = os.path.join(tmp_path, 'comments.json')
+    result = get_video_comments('test-key', 'v1', max_comments=0, chunk_size=400,
+                                webhook_url='https://hooks.example.com/c', output_file=output_file)
+    with open(output_file, encoding='utf-8') as f:
+        saved = json.load(f)
+
+    assert [len(batch['comments']) for batch in webhook_sent] == [400, 400, 250]
+    assert [batch['batch_info']['is_final_batch'] for batch in webhook_sent] == [False, False, True]
+    assert result['comments'] == [] and result['total_comments_fetched'] == 1050
+    assert result['streamed_batches'] == 3
+    assert len(saved['comments']) == 1050 and saved['total_comments_fetched'] == 1050
+    assert saved['video_info']['video_id'] == 'v1'
+    print("✅ 评论分批流式输出")
+
+
+def test_error_keeps_partial_file(use_fake_client, tmp_path):
+    """流式写入后出现API错误时，错误结果带output_file，已写入的评论保留在完整的JSON文件中"""
+    use_fake_client(FakeCommentsClient(1050, fail_at=500))
+    output_file = os.path.join(tmp_path, 'comments.json')
+    result = get_video_comments('test-key', 'v1', max_comments=0, chunk_size=200, output_file=output_file)
+    with open(output_file, encoding='utf-8') as f:
+        saved = json.load(f)
+
+    assert result['video_info']['error'] == 'API错误: backendError' and result['output_file'] == output_file
+    assert len(saved['comments']) == 400
+
+    use_fake_client(FakeCommentsClient(1050, fail_at=0))
+    result = get_video_comments('test-key', 'v1', max_comments=0, output_file=output_file)
+    assert 'error' in result and 'output_file' not in result
+    print("✅ 出错时保留已写入的结果文件")
+
+
+def main():
+    """主函数（测试使用conftest.py中的fixture，通过pytest运行）"""
+    print("🧪 评论分页和流式输出测试")
+    print("=" * 60)
+    return pytest.main([__file__, '-q', '-s'])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
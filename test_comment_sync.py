@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试评论增量同步
+模拟按发布时间倒序分页的评论，验证第二次同步只请求一页并只输出新评论，
+有数量上限时分多次补齐全部新评论（只为交付的评论展开回复），
+以及已知热门评论的点赞数在刷新间隔后单独刷新（只保存发送成功的热门评论）
+"""
+
+import sys
+
+import pytest
+
+import comment_store
+import youtube_search_webhook
+from youtube_search_webhook import get_video_comments
+
+
+class FakeCommentsClient:
+    """模拟videos/commentThreads/comments请求，评论c{n}的发布时间随n递增，按时间倒序分页"""
+
+    def __init__(self, total_comments):
+        self.total_comments = total_comments
+        self.likes = {}
+        self.reply_count = 0
+        self.calls = []
+
+    def _snippet(self, index):
+        return {'textDisplay': f'comment {index}', 'likeCount': self.likes.get(f'c{index}', index),
+                'publishedAt': f'2025-01-01T00:{index // 60:02d}:{index % 60:02d}Z'}
+
+    def list(self, resource, **params):
+        self.calls.append((resource, params))
+        if resource == 'videos':
+            return {'items': [{'id': params['id'], 'snippet': {'title': 'video'}, 'statistics': {}}]}
+        if resource == 'commentThreads':
+            assert params['order'] == 'time'
+            offset = int(params.get('pageToken') or 0)
+            indexes = list(range(self.total_comments - 1, -1, -1))[offset:offset + params['maxResults']]
+            response = {'items': [{'id': f'c{i}', 'snippet': {'totalReplyCount': self.reply_count, 'topLevelComment': {
+                'snippet': self._snippet(i)}}} for i in indexes]}
+            if offset + len(indexes) < self.total_comments:
+                response['nextPageToken'] = str(offset + len(indexes))
+            return response
+        if resource == 'comments' and 'parentId' in params:
+            return {'items': [{'snippet': {'textDisplay': f"{params['parentId']} reply {j}"}}
+                              for j in range(self.reply_count)]}
+        if resource == 'comments':
+            return {'items': [{'id': comment_id, 'snippet': self._snippet(int(comment_id[1:]))}
+                              for comment_id in params['id'].split(',') if int(comment_id[1:]) < self.total_comments]}
+        raise ValueError(f"未模拟的资源: {resource}")
+
+
+def run_sync(max_comments=0, **kwargs):
+    """增量获取评论（客户端和webhook发送由fixture替换）"""
+    return get_video_comments('test-key', 'v1', max_comments=max_comments, webhook_url='https://hooks.example.com/c',
+                              incremental=True, **kwargs)
+
+
+def known_comments():
+    """已保存的已知评论 {评论ID: 点赞数}"""
+    return comment_store.get_comment_store().stale_top_comments('v1', limit=1000, now=float('inf'))
+
+
+def test_second_sync_fetches_only_new_comments(use_fake_client, webhook_sent):
+    """第一次同步获取全部评论，之后每次只请求一页评论，只输出新评论，没有新评论时不发送"""
+    fake = use_fake_client(FakeCommentsClient(250))
+    first = run_sync()
+    assert first['total_comments_fetched'] == 250
+    assert [resource for resource, _ in fake.calls].count('commentThreads') == 3
+
+    fake.total_comments = 253
+    fake.calls = []
+    webhook_sent.clear()
+    second = run_sync()
+    assert [resource for resource, _ in fake.calls] == ['videos', 'commentThreads']
+    assert sorted(comment['comment_id'] for comment in second['comments']) == ['c250', 'c251', 'c252']
+    assert len(webhook_sent) == 1 and len(webhook_sent[0]['comments']) == 3
+    assert second['like_updates'] == []
+
+    fake.calls = []
+    webhook_sent.clear()
+    third = run_sync()
+    assert [resource for resource, _ in fake.calls] == ['videos', 'commentThreads']
+    assert third['total_comments_fetched'] == 0 and webhook_sent == []
+    print("✅ 第二次同步只获取新评论")
+
+
+def test_capped_sync_does_not_skip_comments(use_fake_client, webhook_sent):
+    """200条新评论、每次最多50条时分4次从最早的新评论开始交付，不跳过任何评论"""
+    fake = use_fake_client(FakeCommentsClient(10))
+    run_sync(max_comments=50)
+
+    fake.total_comments = 210
+    deliveries = []
+    for _ in range(5):
+        webhook_sent.clear()
+        result = run_sync(max_comments=50)
+        deliveries.append(sorted(int(comment['comment_id'][1:]) for data in webhook_sent
+                                 for comment in data.get('comments', [])))
+        assert result['total_comments_fetched'] == len(deliveries[-1])
+
+    assert [len(delivered) for delivered in deliveries] == [50, 50, 50, 50, 0]
+    assert [index for delivered in deliveries for index in delivered] == list(range(10, 210))
+    print("✅ 有数量上限时分多次补齐新评论")
+
+
+def test_capped_sync_expands_only_delivered_replies(use_fake_client, webhook_sent):
+    """有数量上限时只为交付的最早一段新评论获取回复，被丢弃的评论不请求回复"""
+    fake = use_fake_client(FakeCommentsClient(10))
+    run_sync(max_comments=50)
+
+    fake.total_comments = 210
+    fake.reply_count = 3
+    fake.calls = []
+    result = run_sync(max_comments=50, include_replies=True)
+
+    reply_parents = sorted(int(params['parentId'][1:]) for resource, params in fake.calls
+                           if resource == 'comments' and 'parentId' in params)
+    assert reply_parents == list(range(10, 60))
+    assert all(len(comment['replies']) == 3 for comment in result['comments'])
+    print("✅ 只为交付的评论展开回复")
+
+
+def test_known_comments_bounded_to_sent_top(use_fake_client, webhook_sent, monkeypatch):
+    """只保存发送成功的评论，且每个视频只保留点赞数最高的LIKE_REFRESH_TOP条"""
+    fake = use_fake_client(FakeCommentsClient(120))
+    monkeypatch.setattr(youtube_search_webhook, 'send_to_webhook', lambda data, url: False)
+    run_sync()
+    assert known_comments() == {}
+
+    monkeypatch.setattr(youtube_search_webhook, 'send_to_webhook', lambda data, url: webhook_sent.append(data) or True)
+    run_sync()
+    assert known_comments() == {f'c{i}': i for i in range(120 - comment_store.LIKE_REFRESH_TOP, 120)}
+
+    fake.total_comments = 200
+    run_sync()
+    assert known_comments() == {f'c{i}': i for i in range(200 - comment_store.LIKE_REFRESH_TOP, 200)}
+    print("✅ 已知评论只保留发送成功的热门评论")
+
+
+def test_known_comment_likes_refreshed(use_fake_client, webhook_sent, monkeypatch):
+    """刷新间隔后只刷新点赞数最高的已知评论，有变化时单独发送"""
+    monkeypatch.setattr(comment_store, 'LIKE_REFRESH_INTERVAL', 0)
+    fake = use_fake_client(FakeCommentsClient(120))
+    run_sync()
+
+    fake.likes = {'c119': 500, 'c10': 900}
+    fake.calls = []
+    result = run_sync()
+
+    like_calls = [params for resource, params in fake.calls if resource == 'comments']
+    assert len(like_calls) == 1 and len(like_calls[0]['id'].split(',')) == comment_store.LIKE_REFRESH_TOP
+    assert 'c119' in like_calls[0]['id'].split(',') and 'c10' not in like_calls[0]['id'].split(',')
+    assert result['like_updates'] == [{'comment_id': 'c119', 'like_count': 500, 'previous_like_count': 119}]
+    assert webhook_sent[-1]['like_updates'] == result['like_updates']
+    print("✅ 已知热门评论点赞数单独刷新")
+
+
+def main():
+    """主函数（测试使用conftest.py中的fixture，通过pytest运行）"""
+    print("🧪 评论增量同步测试")
+    print("=" * 60)
+    return pytest.main([__file__, '-q', '-s'])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试字段掩码与API结构一致
+按本地discovery文档中各list方法的响应结构逐个检查FIELD_PROFILES生成的fields参数，
+掩码中包含资源上不存在的字段时，真实API会返回400 Invalid field selection
+"""
+
+from youtube_client import load_discovery_document
+from youtube_fields import FIELD_PROFILES, request_params
+
+
+def parse_mask(mask):
+    """把fields参数解析为 [(路径, 子选择)]，如 'a/b(c,d),e' -> [(['a','b'], [(['c'],[]), (['d'],[])]), (['e'], [])]"""
+    selections, position = _parse_selections(mask, 0)
+    assert position == len(mask), f"掩码括号不匹配: {mask}"
+    return selections
+
+
+def _parse_selections(mask, position):
+    selections = []
+    while position < len(mask):
+        end = position
+        while end < len(mask) and mask[end] not in ',()':
+            end += 1
+        path, children = mask[position:end].split('/'), []
+        position = end
+        if position < len(mask) and mask[position] == '(':
+            children, position = _parse_selections(mask, position + 1)
+            assert mask[position] == ')'
+            position += 1
+        selections.append((path, children))
+        if position < len(mask) and mask[position] == ',':
+            position += 1
+        elif position < len(mask) and mask[position] == ')':
+            break
+    return selections, position
+
+
+def resolve(schemas, schema):
+    """展开$ref，数组取元素结构"""
+    while True:
+        if '$ref' in schema:
+            schema = schemas[schema['$ref']]
+        elif schema.get('type') == 'array':
+            schema = schema['items']
+        else:
+            return schema
+
+
+def invalid_fields(schemas, schema, selections, prefix=''):
+    """返回掩码中在schema上不存在的字段路径"""
+    invalid = []
+    for path, children in selections:
+        current = resolve(schemas, schema)
+        for index, name in enumerate(path):
+            properties = current.get('properties', {})
+            if name in properties:
+                current = resolve(schemas, properties[name])
+            elif 'additionalProperties' in current:
+                current = resolve(schemas, current['additionalProperties'])
+            else:
+                invalid.append(prefix + '/'.join(path[:index + 1]))
+                break
+        else:
+            invalid.extend(invalid_fields(schemas, current, children, prefix + '/'.join(path) + '/'))
+    return invalid
+
+
+def test_masks_match_discovery_schemas():
+    """每个字段配置中每个请求的fields都只选择响应结构中存在的字段"""
+    document = load_discovery_document()
+    schemas = document['schemas']
+    checked = 0
+    for profile, specs in FIELD_PROFILES.items():
+        for name in specs:
+            resource = name.split('.')[1]
+            response = document['resources'][resource]['methods']['list']['response']
+            fields = request_params(name, profile)['fields']
+            invalid = invalid_fields(schemas, response, parse_mask(fields))
+            assert not invalid, f"{profile} {name} 包含不存在的字段: {invalid}"
+            checked += 1
+    print(f"✅ {checked} 个字段掩码均与discovery文档一致")
+
+
+def test_invalid_field_detected():
+    """videos资源上不存在的字段能被检查出来"""
+    document = load_discovery_document()
+    response = document['resources']['videos']['methods']['list']['response']
+    invalid = invalid_fields(document['schemas'], response, parse_mask('items(id,snippet(title,publishTime))'))
+    assert invalid == ['items/snippet/publishTime']
+    print("✅ 不存在的字段能被检查出来")
+
+
+def main():
+    """主函数"""
+    print("🧪 字段掩码结构测试")
+    print("=" * 60)
+    test_masks_match_discovery_schemas()
+    test_invalid_field_detected()
+    print("\n✨ 测试完成！")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试多API密钥池
+验证按剩余配额选择密钥，quotaExceeded后暂停密钥并在另一个密钥上继续同一页请求，
+以及关闭配额账本时轮流使用密钥、暂停记录不写入账本
+"""
+
+import os
+import sys
+import json
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+import key_pool
+import youtube_client
+from quota_ledger import QuotaLedger
+from key_pool import KeyPool, split_api_keys
+from youtube_client import PooledYouTubeClient, YouTubeClient
+
+
+def quota_exceeded_error():
+    """构造YouTube返回的quotaExceeded错误"""
+    content = json.dumps({'error': {'code': 403, 'errors': [{'reason': 'quotaExceeded'}]}}).encode('utf-8')
+    return HttpError(httplib2.Response({'status': 403}), content)
+
+
+def test_choose_key_with_most_remaining(tmp_path):
+    """请求路由到剩余配额最多的可用密钥"""
+    ledger = QuotaLedger(f'{tmp_path}/ledger.sqlite3', budget=1000)
+    pool = KeyPool('key-a, key-b,key-c,key-a', ledger)
+    assert pool.api_keys == ['key-a', 'key-b', 'key-c']
+
+    ledger.reserve('key-a', ['search'])
+    ledger.reserve('key-b', ['search'] * 2)
+    assert pool.choose(['search']) == 'key-c'
+
+    pool.mark_exhausted('key-c')
+    assert pool.choose(['search']) == 'key-a'
+    assert pool.choose(['search'], skip={'key-a'}) == 'key-b'
+    assert pool.remaining() == 900 + 800
+    assert split_api_keys(['x', ' y ', '']) == ['x', 'y']
+    print("✅ 按剩余配额选择密钥")
+
+
+def test_quota_exceeded_continues_on_next_key(state_dir, monkeypatch):
+    """密钥返回quotaExceeded后，同一页请求（含pageToken）在另一个密钥上继续"""
+    executed = []
+
+    def fake_execute(client, request):
+        executed.append((client.api_key, request.uri))
+        if client.api_key == 'key-a':
+            raise quota_exceeded_error()
+        return {'items': [], 'key': client.api_key}
+
+    monkeypatch.setattr(YouTubeClient, 'execute', fake_execute)
+    client = PooledYouTubeClient('key-a,key-b')
+    response = client.list('search', part='snippet', q='HONOR 400', pageToken='PAGE7')
+    second = client.list('search', part='snippet', q='HONOR 400', pageToken='PAGE8')
+
+    assert response['key'] == 'key-b' and second['key'] == 'key-b'
+    assert [key for key, _ in executed] == ['key-a', 'key-b', 'key-b']
+    assert all('pageToken=PAGE7' in uri for _, uri in executed[:2])
+    assert client.pool.available_keys() == ['key-b']
+    print("✅ 配额用尽的密钥暂停使用，分页在另一个密钥上继续")
+
+
+def test_round_robin_without_ledger(state_dir, monkeypatch):
+    """关闭配额账本时轮流使用密钥，配额用尽的密钥只在本进程内暂停，不写入账本文件"""
+    monkeypatch.setattr(key_pool, 'QUOTA_LEDGER_ENABLED', False)
+    monkeypatch.setattr(youtube_client, 'QUOTA_LEDGER_ENABLED', False)
+    executed = []
+
+    def fake_execute(client, request):
+        executed.append(client.api_key)
+        if client.api_key == 'key-b':
+            raise quota_exceeded_error()
+        return {'items': [], 'key': client.api_key}
+
+    monkeypatch.setattr(YouTubeClient, 'execute', fake_execute)
+    pool = KeyPool('key-a,key-b,key-c')
+    assert [pool.choose(['search']) for _ in range(4)] == ['key-a', 'key-b', 'key-c', 'key-a']
+    assert pool.choose(['search'], skip={'key-b'}) == 'key-c'
+    assert pool.remaining() is None
+
+    client = PooledYouTubeClient('key-a,key-b,key-c')
+    keys = [client.fetch('search', part='snippet', q=f'q{index}')['key'] for index in range(4)]
+
+    assert keys == ['key-a', 'key-c', 'key-a', 'key-c']
+    assert executed == ['key-a', 'key-b', 'key-c', 'key-a', 'key-c']
+    assert client.pool.available_keys() == ['key-a', 'key-c']
+    assert not any(name.startswith('quota_ledger') for name in os.listdir(state_dir))
+    print("✅ 关闭配额账本时轮流使用密钥")
+
+
+def main():
+    """主函数（测试使用conftest.py中的fixture，通过pytest运行）"""
+    print("🧪 多API密钥池测试")
+    print("=" * 60)
+    return pytest.main([__file__, '-q', '-s'])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试多视频评论模式
+使用模拟的YouTube客户端（每次请求固定延迟），验证多个视频并发获取评论、每个视频完成后立即发送，
+以及视频链接解析和按搜索结果取视频
+"""
+
+import sys
+import time
+import threading
+
+import pytest
+
+import youtube_search_webhook
+from youtube_search_webhook import parse_video_id, search_top_video_ids, get_comments_for_videos
+
+LATENCY = 0.1  # 模拟每次API请求的往返延迟（秒）
+
+
+class FakeVideosClient:
+    """模拟videos/commentThreads/search请求"""
+
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def list(self, resource, **params):
+        with self.lock:
+            self.calls.append((resource, params))
+        time.sleep(LATENCY)
+        if resource == 'videos':
+            if params['id'] == 'missing':
+                return {'items': []}
+            return {'items': [{'id': params['id'], 'snippet': {'title': params['id']}, 'statistics': {}}]}
+        if resource == 'commentThreads':
+            return {'items': [
+                {'snippet': {'totalReplyCount': 0, 'topLevelComment': {'snippet': {'textDisplay': 'hi', 'likeCount': i}}}}
+                for i in range(3)
+            ]}
+        if resource == 'search':
+            offset = int(params.get('pageToken') or 0)
+            return {'items': [{'id': {'kind': 'youtube#video', 'videoId': f's{offset + i}'}}
+                              for i in range(params['maxResults'])],
+                    'nextPageToken': str(offset + params['maxResults'])}
+        raise ValueError(f"未模拟的资源: {resource}")
+
+
+def test_parse_video_id():
+    """支持视频ID、watch链接、短链接和shorts链接"""
+    assert parse_video_id('dQw4w9WgXcQ') == 'dQw4w9WgXcQ'
+    assert parse_video_id('https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=1') == 'dQw4w9WgXcQ'
+    assert parse_video_id('https://youtu.be/dQw4w9WgXcQ') == 'dQw4w9WgXcQ'
+    assert parse_video_id('https://www.youtube.com/shorts/dQw4w9WgXcQ') == 'dQw4w9WgXcQ'
+    print("✅ 视频链接解析正确")
+
+
+def test_search_top_video_ids():
+    """按搜索结果分页取前N个视频"""
+    fake = FakeVideosClient()
+    assert search_top_video_ids(fake, 'query', 70) == [f's{i}' for i in range(70)]
+    assert [params['maxResults'] for _, params in fake.calls] == [50, 20]
+    print("✅ 按搜索结果取视频")
+
+
+def test_videos_processed_concurrently(use_fake_client, webhook_sent, monkeypatch):
+    """20个视频并发获取评论，每个视频完成后各发送一次webhook，缓存统计只在最后打印一次"""
+    fake = use_fake_client(FakeVideosClient())
+    summaries = []
+    monkeypatch.setattr(youtube_search_webhook, 'print_cache_summary', lambda: summaries.append(True))
+    video_ids = [f'v{i}' for i in range(19)] + ['missing']
+    started = time.perf_counter()
+    results = get_comments_for_videos('test-key', video_ids, max_comments=10,
+                                      webhook_url='https://hooks.example.com/c', concurrency=10)
+    elapsed = time.perf_counter() - started
+
+    assert results['total_videos'] == 20 and results['succeeded'] == 19 and results['failed'] == 1
+    assert results['total_comments_fetched'] == 19 * 3
+    assert sorted(data['video_info']['video_id'] for data in webhook_sent) == sorted(video_ids[:-1])
+    assert all('comments' not in summary for summary in results['videos'])
+    assert len(summaries) == 1
+    serial = len(fake.calls) * LATENCY
+    assert elapsed < serial / 2, f"视频没有并发处理: {elapsed:.2f}s"
+    print(f"✅ 多视频并发获取评论: {elapsed:.2f}s (串行约 {serial:.1f}s)")
+
+
+def main():
+    """主函数（测试使用conftest.py中的fixture，通过pytest运行）"""
+    print("🧪 多视频评论模式测试")
+    print("=" * 60)
+    return pytest.main([__file__, '-q', '-s'])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
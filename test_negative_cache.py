@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试失败结果缓存
+验证按失败原因的有效期，以及评论已关闭的视频、不存在的视频和handle在有效期内不再发出请求
+"""
+
+import os
+import sys
+import json
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from negative_cache import NegativeCache, negative_reason, NEGATIVE_TTLS
+from youtube_search_webhook import get_video_comments, get_channel_videos
+
+
+def http_error(status, reason):
+    """构造YouTube API返回的HttpError"""
+    content = json.dumps({'error': {'code': status, 'errors': [{'reason': reason}]}}).encode('utf-8')
+    return HttpError(httplib2.Response({'status': status}), content)
+
+
+class FakeClient:
+    """模拟YouTubeClient：commentThreads返回commentsDisabled，channels和未知视频返回空结果"""
+
+    def __init__(self):
+        self.calls = []
+
+    def list(self, resource, **params):
+        self.calls.append(resource)
+        if resource == 'videos' and params['id'] == 'disabled':
+            return {'items': [{'id': 'disabled', 'snippet': {'title': 'video'}, 'statistics': {}}]}
+        if resource == 'commentThreads':
+            raise http_error(403, 'commentsDisabled')
+        return {'items': []}
+
+
+def test_ttl_per_reason(tmp_path):
+    """有效期按失败原因计算，未配置的原因不记录"""
+    assert negative_reason(http_error(403, 'commentsDisabled')) == 'commentsDisabled'
+    assert negative_reason(http_error(403, 'quotaExceeded')) is None
+
+    cache = NegativeCache(os.path.join(tmp_path, 'negative.sqlite3'))
+    cache.put('video', 'v1', 'commentsDisabled', now=1000)
+    cache.put('video', 'v2', 'quotaExceeded', now=1000)
+    assert cache.get('video', 'v1', now=1000 + NEGATIVE_TTLS['commentsDisabled'] - 1) == 'commentsDisabled'
+    assert cache.get('video', 'v1', now=1000 + NEGATIVE_TTLS['commentsDisabled']) is None
+    assert cache.get('video', 'v2', now=1001) is None
+    cache.clear('video', 'v1')
+    assert cache.get('video', 'v1', now=1001) is None
+    print("✅ 有效期按失败原因计算")
+
+
+def test_dead_ends_skipped_without_requests(use_fake_client):
+    """第二次运行时评论已关闭的视频、不存在的视频和handle都不再请求"""
+    first = use_fake_client(FakeClient())
+    first_disabled = get_video_comments('test-key', 'disabled')
+    get_video_comments('test-key', 'missing')
+    get_channel_videos('test-key', '@nobody')
+
+    second = use_fake_client(FakeClient())
+    second_disabled = get_video_comments('test-key', 'disabled')
+    missing = get_video_comments('test-key', 'missing')
+    channel = get_channel_videos('test-key', 'https://www.youtube.com/@NoBody')
+
+    assert first.calls == ['videos', 'commentThreads', 'videos', 'channels']
+    assert second.calls == []
+    assert first_disabled['video_info']['error'] == second_disabled['video_info']['error'] == 'API错误: commentsDisabled'
+    assert missing is None and channel is None
+    print("✅ 已知失败的目标不再发出请求")
+
+
+def main():
+    """主函数（测试使用conftest.py中的fixture，通过pytest运行）"""
+    print("🧪 失败结果缓存测试")
+    print("=" * 60)
+    return pytest.main([__file__, '-q', '-s'])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试配额账本
+验证预算拒绝、太平洋时间配额日、多进程共享账本时不超出预算，以及搜索目标数按预算降级
+"""
+
+import os
+import tempfile
+import multiprocessing
+from datetime import datetime, timezone
+
+from quota_ledger import QuotaLedger, QuotaBudgetExceeded, quota_day, key_id
+
+
+def charge_searches(path, count):
+    """工作进程：反复预留search请求配额，返回成功次数"""
+    ledger = QuotaLedger(path, budget=10000)
+    succeeded = 0
+    for _ in range(count):
+        try:
+            ledger.reserve('shared-key', ['search'])
+            succeeded += 1
+        except QuotaBudgetExceeded:
+            pass
+    return succeeded
+
+
+def test_budget_refuses_over_limit():
+    """超出预算的请求被拒绝且不记录消耗"""
+    with tempfile.TemporaryDirectory() as state_dir:
+        ledger = QuotaLedger(os.path.join(state_dir, 'ledger.sqlite3'), budget=250)
+        ledger.reserve('key-a', ['search', 'videos'])
+        ledger.reserve('key-a', ['search'])
+
+        try:
+            ledger.reserve('key-a', ['search'])
+            assert False, "超出预算的请求应被拒绝"
+        except QuotaBudgetExceeded as e:
+            assert e.remaining == 49 and e.needed == 100
+
+        assert ledger.used('key-a') == 201
+        assert ledger.remaining('key-b') == 250
+        assert all(row[0] == key_id('key-a') for row in ledger.usage())
+        print("✅ 超出预算的请求被拒绝")
+
+
+def test_quota_day_uses_pacific_time():
+    """配额日按太平洋时间午夜切换"""
+    assert quota_day(datetime(2024, 7, 1, 6, 59, tzinfo=timezone.utc)) == '2024-06-30'
+    assert quota_day(datetime(2024, 7, 1, 7, 0, tzinfo=timezone.utc)) == '2024-07-01'
+    assert quota_day(datetime(2024, 1, 15, 7, 59, tzinfo=timezone.utc)) == '2024-01-14'
+    assert quota_day(datetime(2024, 1, 15, 8, 0, tzinfo=timezone.utc)) == '2024-01-15'
+    print("✅ 配额日按太平洋时间切换")
+
+
+def test_processes_share_budget():
+    """4个进程同时预留配额，总消耗恰好等于预算"""
+    with tempfile.TemporaryDirectory() as state_dir:
+        path = os.path.join(state_dir, 'ledger.sqlite3')
+        QuotaLedger(path)
+        with multiprocessing.Pool(4) as pool:
+            succeeded = sum(pool.starmap(charge_searches, [(path, 40)] * 4))
+
+        assert succeeded == 100
+        assert QuotaLedger(path).used('shared-key') == 10000
+        print(f"✅ 多进程共享账本，共成功预留 {succeeded} 次搜索请求")
+
+
+def test_search_downgrades_to_budget():
+    """剩余预算不足时搜索目标数降到预算能覆盖的页数"""
+    import youtube_search_webhook
+
+    with tempfile.TemporaryDirectory() as state_dir:
+        ledger = QuotaLedger(os.path.join(state_dir, 'ledger.sqlite3'), budget=350)
+        original = youtube_search_webhook.get_quota_ledger
+        youtube_search_webhook.get_quota_ledger = lambda: ledger
+        try:
+            assert youtube_search_webhook.plan_search_budget('key', 200) == 150
+            assert youtube_search_webhook.plan_search_budget('key', 100) == 100
+            ledger.reserve('key', ['search'] * 3)
+            try:
+                youtube_search_webhook.plan_search_budget('key', 25)
+                assert False, "预算不足一页时应拒绝"
+            except QuotaBudgetExceeded:
+                pass
+        finally:
+            youtube_search_webhook.get_quota_ledger = original
+        print("✅ 搜索目标数按剩余预算降级")
+
+
+def main():
+    """主函数"""
+    print("🧪 配额账本测试")
+    print("=" * 60)
+    test_budget_refuses_over_limit()
+    test_quota_day_uses_pacific_time()
+    test_processes_share_budget()
+    test_search_downgrades_to_budget()
+    print("\n✨ 测试完成！")
+
+
+if __name__ == "__main__":
+    main()
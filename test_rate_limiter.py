@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试令牌桶限速器
+验证突发容量内不等待、超出速率后按速率放行、多线程共享同一个桶，以及按目标区分限速
+"""
+
+import time
+import threading
+
+from rate_limiter import TokenBucket, get_rate_limiter, parse_rate_limits, YOUTUBE_DESTINATION
+
+
+def test_burst_then_paced():
+    """突发容量内立即放行，之后按速率等待"""
+    bucket = TokenBucket(rate=20, burst=5)
+
+    start = time.perf_counter()
+    for _ in range(5):
+        bucket.acquire()
+    burst_elapsed = time.perf_counter() - start
+    for _ in range(10):
+        bucket.acquire()
+    total_elapsed = time.perf_counter() - start
+
+    assert burst_elapsed < 0.05, f"突发请求不应等待，实际 {burst_elapsed:.2f}s"
+    assert 0.4 < total_elapsed < 0.8, f"10个超出请求应约0.5s，实际 {total_elapsed:.2f}s"
+    print(f"✅ 突发容量内不等待，之后按速率放行 ({total_elapsed:.2f}s)")
+
+
+def test_threads_share_bucket():
+    """多个线程共享同一个桶，总速率不超过配置"""
+    bucket = TokenBucket(rate=50, burst=1)
+
+    def worker():
+        for _ in range(5):
+            bucket.acquire()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    assert elapsed >= 19 / 50 * 0.9, f"20个请求不应快于速率限制，实际 {elapsed:.2f}s"
+    print(f"✅ 多线程共享令牌桶 ({elapsed:.2f}s)")
+
+
+def test_limiters_per_destination():
+    """同一webhook主机共享一个桶，不同主机、YouTube API各自独立"""
+    first = get_rate_limiter('https://hooks.example.com/a')
+    assert get_rate_limiter('https://hooks.example.com/b?x=1') is first
+    assert get_rate_limiter('https://other.example.com/a') is not first
+    assert get_rate_limiter(YOUTUBE_DESTINATION) is not first
+    assert parse_rate_limits('open.feishu.cn=2, youtube=20/40,bad') == {
+        'open.feishu.cn': (2.0, 2.0), 'youtube': (20.0, 40.0)
+    }
+    print("✅ 按目标区分限速")
+
+
+def main():
+    """主函数"""
+    print("🧪 令牌桶限速器测试")
+    print("=" * 60)
+    test_burst_then_paced()
+    test_threads_share_bucket()
+    test_limiters_per_destination()
+    print("\n✨ 测试完成！")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试API响应缓存
+验证参数规范化、按接口/part的有效期、LRU淘汰、命中缓存的请求不发出也不计入配额，以及etag条件请求
+"""
+
+import os
+import sys
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from quota_ledger import get_quota_ledger
+from response_cache import ResponseCache, cache_key, request_ttl, get_response_cache, CACHE_TTLS
+from youtube_client import YouTubeClient
+
+
+def test_cache_key_normalization():
+    """None参数、API密钥、参数顺序和逗号后空格不影响缓存键，id顺序影响"""
+    base = cache_key('videos', {'part': 'snippet,statistics', 'id': 'a,b'})
+    assert cache_key('videos', {'id': 'a, b', 'key': 'k', 'pageToken': None, 'part': 'snippet, statistics'}) == base
+    assert cache_key('videos', {'part': 'snippet,statistics', 'id': 'b,a'}) != base
+    assert cache_key('channels', {'part': 'snippet,statistics', 'id': 'a,b'}) != base
+    print("✅ 缓存键规范化正确")
+
+
+def test_ttl_per_endpoint_and_part(tmp_path):
+    """频道元数据缓存数小时，带statistics的请求只缓存几分钟"""
+    assert request_ttl('channels', {'part': 'snippet,contentDetails'}) == CACHE_TTLS['snippet']
+    assert request_ttl('channels', {'part': 'snippet,statistics'}) == CACHE_TTLS['statistics']
+
+    cache = ResponseCache(os.path.join(tmp_path, 'cache.sqlite3'))
+    params = {'part': 'snippet,statistics', 'id': 'UC1'}
+    cache.put('channels', params, {'items': [{'id': 'UC1'}]})
+    assert cache.get('channels', params) == {'items': [{'id': 'UC1'}]}
+
+    # 模拟写入时间早于statistics有效期
+    cache._conn.execute('UPDATE responses SET stored_at = stored_at - ?', (CACHE_TTLS['statistics'] + 1,))
+    assert cache.get('channels', params) is None
+    assert cache.hit_rates() == {'channels': (1, 2)}
+    print("✅ 有效期按接口和part计算")
+
+
+def test_lru_eviction(tmp_path):
+    """超出大小上限时淘汰最久未使用的条目"""
+    cache = ResponseCache(os.path.join(tmp_path, 'cache.sqlite3'), max_bytes=2500)
+    payload = {'items': ['x' * 1000]}
+    cache.put('videos', {'id': 'first'}, payload)
+    cache.put('videos', {'id': 'second'}, payload)
+    cache._conn.execute("UPDATE responses SET accessed_at = accessed_at - 10")
+    assert cache.get('videos', {'id': 'first'}) == payload
+    cache.put('videos', {'id': 'third'}, payload)
+
+    assert cache.get('videos', {'id': 'first'}) == payload
+    assert cache.get('videos', {'id': 'second'}) is None
+    assert cache.get('videos', {'id': 'third'}) == payload
+    print("✅ LRU淘汰最久未使用的条目")
+
+
+def test_cache_hits_skip_request_and_quota(state_dir, monkeypatch):
+    """命中缓存的请求不发出、不计入配额；批量请求只发出未命中的子请求"""
+    executed = []
+    monkeypatch.setattr(YouTubeClient, 'execute',
+                        lambda client, request: executed.append(request.uri) or {'items': ['fresh']})
+    monkeypatch.setattr(YouTubeClient, '_batch_attempt', lambda client, requests, etags: (
+        executed.append(len(requests)) or [{'items': [params['id']]} for _, params in requests]
+    ))
+    client = YouTubeClient('cache-test-key')
+    first = client.list('videos', part='snippet', id='v1')
+    second = client.list('videos', part='snippet', id='v1')
+    batch = client.batch_list([('videos', {'part': 'snippet', 'id': 'v1'}),
+                               ('videos', {'part': 'snippet', 'id': 'v2'})])
+    used = get_quota_ledger().used('cache-test-key')
+    rates = get_response_cache().hit_rates()
+
+    assert first == second == {'items': ['fresh']}
+    assert batch == [{'items': ['fresh']}, {'items': ['v2']}]
+    assert len(executed) == 2 and executed[1] == 1
+    assert used == 1
+    assert rates == {'videos': (2, 4)}
+    print("✅ 命中缓存不发出请求、不计入配额")
+
+
+def test_etag_revalidation(state_dir, monkeypatch):
+    """缓存过期后带If-None-Match刷新，304时复用缓存的响应体"""
+    sent_etags = []
+
+    def fake_execute(client, request):
+        etag = request.headers.get('If-None-Match')
+        sent_etags.append(etag)
+        if etag == '"E1"':
+            raise HttpError(httplib2.Response({'status': 304}), b'')
+        return {'etag': '"E1"', 'items': [{'id': 'UC1'}]}
+
+    def fake_batch_attempt(client, requests, etags):
+        sent_etags.extend(etags)
+        return [HttpError(httplib2.Response({'status': 304}), b'') for _ in requests]
+
+    monkeypatch.setattr(YouTubeClient, 'execute', fake_execute)
+    monkeypatch.setattr(YouTubeClient, '_batch_attempt', fake_batch_attempt)
+    client = YouTubeClient('etag-test-key')
+    params = {'part': 'snippet,statistics', 'id': 'UC1'}
+    first = client.list('channels', **params)
+    cache = get_response_cache()
+    cache._conn.execute('UPDATE responses SET stored_at = 0')
+    revalidated = client.list('channels', **params)
+    fresh_hit = client.list('channels', **params)
+    cache._conn.execute('UPDATE responses SET stored_at = 0')
+    batch = client.batch_list([('channels', params)])
+    revalidated_count = cache.revalidated.get('channels')
+
+    assert first == revalidated == fresh_hit == batch[0]
+    assert sent_etags == [None, '"E1"', '"E1"']
+    assert revalidated_count == 2
+    print("✅ 304时复用缓存的响应体")
+
+
+def main():
+    """主函数（测试使用conftest.py中的fixture，通过pytest运行）"""
+    print("🧪 API响应缓存测试")
+    print("=" * 60)
+    return pytest.main([__file__, '-q', '-s'])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试请求重试
+验证错误分类、带抖动的指数退避上限、Retry-After，以及webhook发送遇到503后重试成功，
+遇到500或读超时时不重试（避免重复写入）
+"""
+
+import json
+
+import httplib2
+import requests
+from googleapiclient.errors import HttpError
+
+import retry
+import youtube_search_webhook
+from retry import is_retryable, backoff_delay, call_with_retry
+from webhook_client import get_webhook_client
+
+
+def http_error(status, reason=None, headers=None):
+    """构造YouTube API返回的HttpError"""
+    errors = [{'reason': reason}] if reason else []
+    content = json.dumps({'error': {'code': status, 'errors': errors}}).encode('utf-8')
+    return HttpError(httplib2.Response({'status': status, **(headers or {})}), content)
+
+
+class FakeResponse:
+    """模拟requests.Response"""
+
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.text = '' if status_code == 200 else 'Service Unavailable'
+
+
+def record_sleeps():
+    """替换retry模块的sleep，记录等待时间而不实际等待"""
+    delays = []
+    original = retry.time.sleep
+    retry.time.sleep = delays.append
+    return delays, original
+
+
+def test_error_classification():
+    """5xx/429/rateLimitExceeded/backendError可重试，quotaExceeded/commentsDisabled不重试"""
+    assert is_retryable(http_error(503))
+    assert is_retryable(http_error(429))
+    assert is_retryable(http_error(403, 'rateLimitExceeded'))
+    assert is_retryable(http_error(500, 'backendError'))
+    assert is_retryable(requests.exceptions.ConnectionError())
+    assert not is_retryable(http_error(403, 'quotaExceeded'))
+    assert not is_retryable(http_error(403, 'commentsDisabled'))
+    assert not is_retryable(http_error(404, 'videoNotFound'))
+    assert not is_retryable(ValueError('bad data'))
+    print("✅ 错误分类正确")
+
+
+def test_backoff_capped_and_honors_retry_after():
+    """退避时间指数增长且不超过上限，Retry-After优先"""
+    for attempt in range(1, 10):
+        ceiling = min(retry.RETRY_MAX_DELAY, retry.RETRY_BASE_DELAY * 2 ** (attempt - 1))
+        assert ceiling / 2 <= backoff_delay(attempt) <= ceiling
+    assert backoff_delay(1, http_error(503, headers={'retry-after': '7'})) >= 7
+    print("✅ 退避时间带抖动且有上限，遵守Retry-After")
+
+
+def test_transient_errors_are_retried():
+    """临时错误重试后成功，永久错误立即抛出"""
+    delays, original = record_sleeps()
+    outcomes = [http_error(503), http_error(403, 'rateLimitExceeded'), {'items': ['ok']}]
+
+    def flaky():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    try:
+        assert call_with_retry(flaky) == {'items': ['ok']}
+        assert len(delays) == 2
+
+        calls = []
+
+        def quota_exceeded():
+            calls.append(1)
+            raise http_error(403, 'quotaExceeded')
+
+        try:
+            call_with_retry(quota_exceeded)
+            assert False, "quotaExceeded不应重试"
+        except HttpError:
+            pass
+        assert len(calls) == 1
+    finally:
+        retry.time.sleep = original
+    print("✅ 临时错误重试成功，永久错误不重试")
+
+
+def test_webhook_retries_503():
+    """webhook返回503时按Retry-After重试，最终发送成功"""
+    delays, original_sleep = record_sleeps()
+    responses = [FakeResponse(503, {'Retry-After': '3'}), FakeResponse(200)]
+    session = get_webhook_client().session
+    original_post = session.post
+    session.post = lambda *args, **kwargs: responses.pop(0)
+    try:
+        assert youtube_search_webhook.send_to_webhook({'video': 1}, 'https://hooks.example.com/retry')
+    finally:
+        session.post = original_post
+        retry.time.sleep = original_sleep
+
+    assert not responses
+    assert len(delays) == 1 and delays[0] >= 3
+    print("✅ webhook遇到503后重试成功")
+
+
+def test_webhook_post_not_retried_when_maybe_processed():
+    """webhook返回500或读超时时服务端可能已处理，不重试；连接失败时重试"""
+    _, original_sleep = record_sleeps()
+    session = get_webhook_client().session
+    original_post = session.post
+    try:
+        for outcome in (FakeResponse(500), requests.exceptions.ReadTimeout()):
+            calls = []
+
+            def post(*args, outcome=outcome, **kwargs):
+                calls.append(1)
+                if isinstance(outcome, Exception):
+                    raise outcome
+                return outcome
+
+            session.post = post
+            assert not youtube_search_webhook.send_to_webhook({'video': 1}, 'https://hooks.example.com/retry')
+            assert len(calls) == 1
+
+        outcomes = [requests.exceptions.ConnectionError(), FakeResponse(200)]
+
+        def flaky_post(*args, **kwargs):
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        session.post = flaky_post
+        assert youtube_search_webhook.send_to_webhook({'video': 1}, 'https://hooks.example.com/retry')
+        assert not outcomes
+    finally:
+        session.post = original_post
+        retry.time.sleep = original_sleep
+    print("✅ webhook遇到500或读超时时不重试")
+
+
+def main():
+    """主函数"""
+    print("🧪 请求重试测试")
+    print("=" * 60)
+    test_error_classification()
+    test_backoff_capped_and_honors_retry_after()
+    test_transient_errors_are_retried()
+    test_webhook_retries_503()
+    test_webhook_post_not_retried_when_maybe_processed()
+    print("\n✨ 测试完成！")
+
+
+if __name__ == "__main__":
+    main()
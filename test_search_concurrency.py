@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试搜索模式的并发详情获取
+使用模拟的YouTube客户端（每次请求固定延迟），验证videos/channels批次并发执行且结果顺序不变
+"""
+
+import os
+import sys
+import time
+import asyncio
+import threading
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+import state_store
+import channel_store
+import youtube_fields
+import youtube_search_webhook
+from youtube_fields import request_params
+from youtube_async import execute_requests
+from youtube_search_webhook import search_youtube_videos, video_detail_requests
+
+LATENCY = 0.2  # 模拟每次API请求的往返延迟（秒）
+
+
+class FakeYouTubeClient:
+    """模拟YouTubeClient.list，记录请求并返回构造的数据"""
+
+    def __init__(self, total_videos=500, channels=120, page_size=50):
+        self.total_videos = total_videos
+        self.channels = channels
+        self.page_size = page_size
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def list(self, resource, **params):
+        with self.lock:
+            self.calls.append((resource, params, time.perf_counter()))
+        time.sleep(LATENCY)
+        return self._respond(resource, params)
+
+    def _respond(self, resource, params):
+        if resource == 'search':
+            offset = int(params.get('pageToken') or 0)
+            count = min(params['maxResults'], self.page_size, self.total_videos - offset)
+            response = {
+                'items': [
+                    {'kind': 'youtube#searchResult', 'etag': f'etag_{offset + i}',
+                     'id': {'kind': 'youtube#video', 'videoId': f'v{offset + i}'}}
+                    for i in range(count)
+                ]
+            }
+            if offset + count < self.total_videos:
+                response['nextPageToken'] = str(offset + count)
+            return response
+
+        if resource == 'videos':
+            return {'items': [
+                {'id': video_id,
+                 'snippet': {'title': f'title {video_id}', 'channelId': f'c{int(video_id[1:]) % self.channels}'},
+                 'statistics': {'viewCount': '100', 'likeCount': '10', 'commentCount': '1'}}
+                for video_id in params['id'].split(',')
+            ]}
+
+        if resource == 'channels':
+            return {'items': [
+                {'id': channel_id, 'snippet': {'title': f'channel {channel_id}'},
+                 'statistics': {'subscriberCount': '5', 'videoCount': '3', 'viewCount': '9'}}
+                for channel_id in params['id'].split(',')
+            ]}
+
+        raise ValueError(f"未模拟的资源: {resource}")
+
+    def batch_list(self, requests):
+        """模拟multipart批量请求：一次往返返回所有子请求结果"""
+        with self.lock:
+            self.calls.append(('batch', {'size': len(requests)}, time.perf_counter()))
+        time.sleep(LATENCY)
+        return [self._respond(resource, params) for resource, params in requests]
+
+
+def search(**kwargs):
+    """执行搜索（客户端和本地状态目录由fixture替换）"""
+    return search_youtube_videos(api_key='fake', search_query='HONOR 400', **kwargs)
+
+
+def test_video_batches_run_concurrently():
+    """10个视频批次并发执行，总耗时约等于一次往返"""
+    fake = FakeYouTubeClient()
+    video_ids = [f'v{i}' for i in range(500)]
+
+    start = time.perf_counter()
+    responses = asyncio.run(execute_requests(fake, video_detail_requests(video_ids), concurrency=16))
+    elapsed = time.perf_counter() - start
+    items = [item for response in responses for item in response['items']]
+
+    assert len(responses) == 10
+    assert [item['id'] for item in items] == video_ids
+    assert elapsed < LATENCY * 3, f"耗时 {elapsed:.2f}s，批次未并发执行"
+    print(f"✅ 10个视频批次并发完成，耗时 {elapsed:.2f}s")
+
+
+def test_batch_mode_single_round_trip():
+    """批量请求模式下10个视频批次合并为一次HTTP往返，结果不变"""
+    fake = FakeYouTubeClient()
+    video_ids = [f'v{i}' for i in range(500)]
+
+    responses = asyncio.run(execute_requests(fake, video_detail_requests(video_ids), use_batch=True))
+    items = [item for response in responses for item in response['items']]
+
+    assert len(responses) == 10
+    assert [item['id'] for item in items] == video_ids
+    assert [call[0] for call in fake.calls] == ['batch']
+    print("✅ 批量请求模式一次往返完成")
+
+
+def test_search_results_keep_order(use_fake_client):
+    """完整搜索流程结果数量和顺序正确"""
+    use_fake_client(FakeYouTubeClient(total_videos=120, channels=60))
+    results = search(max_results=120, concurrency=8)
+
+    assert len(results) == 120
+    assert [video['basic_info']['video_id'] for video in results] == [f'v{i}' for i in range(120)]
+    assert results[0]['channel_info']['title'] == 'channel c0'
+    print(f"✅ 搜索结果数量和顺序正确 ({len(results)} 个视频)")
+
+
+def test_pipeline_sends_before_last_page(use_fake_client, monkeypatch):
+    """第1页的结果无需等待全部搜索页和详情获取完成即发送到webhook
+
+    串行执行时首个结果最早在 最后一页搜索开始 + 3个往返（搜索、视频、频道）后发送，
+    流水线执行时第1页的详情获取与后续分页重叠，应明显更早。
+    """
+    fake = use_fake_client(FakeYouTubeClient(total_videos=6, channels=3, page_size=2))
+    sent = []
+    monkeypatch.setattr(youtube_search_webhook, 'send_to_webhook',
+                        lambda data, url: sent.append((data, time.perf_counter())) or True)
+    results = search(max_results=6, webhook_url='http://mock-webhook', concurrency=4)
+
+    search_calls = [call for call in fake.calls if call[0] == 'search']
+    assert len(search_calls) == 3
+    assert len(sent) == len(results) == 6
+    assert [data['search_metadata']['result_index'] for data, _ in sent] == [1, 2, 3, 4, 5, 6]
+    assert sent[0][1] < search_calls[-1][2] + 2 * LATENCY, "第1页结果应在全部分页完成前开始发送"
+    print("✅ 搜索分页与详情获取流水线执行")
+
+
+class FailingYouTubeClient(FakeYouTubeClient):
+    """指定资源的请求较慢并返回HttpError 400（出错时搜索页面已填满队列）"""
+
+    def __init__(self, failing_resource, **kwargs):
+        super().__init__(**kwargs)
+        self.failing_resource = failing_resource
+
+    def _respond(self, resource, params):
+        if resource == self.failing_resource:
+            time.sleep(LATENCY * 5)
+            raise HttpError(httplib2.Response({'status': 400}), b'{"error": {"errors": [{"reason": "badRequest"}]}}')
+        return super()._respond(resource, params)
+
+
+@pytest.mark.parametrize('failing_resource', ['videos', 'search'])
+def test_pipeline_error_propagates(use_fake_client, failing_resource):
+    """详情或搜索请求出错时搜索抛出错误，不会在生产者和已满的页面队列上死锁"""
+    use_fake_client(FailingYouTubeClient(failing_resource, total_videos=500, channels=50))
+    outcome = {}
+
+    def run():
+        try:
+            search(max_results=500)
+        except Exception as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout=10)
+
+    assert not thread.is_alive(), "搜索流水线在出错后没有结束"
+    assert 'YouTube API错误 400' in str(outcome['error'])
+    print(f"✅ {failing_resource}请求出错时流水线结束并抛出错误")
+
+
+def test_search_requests_use_field_masks(use_fake_client, state_dir, monkeypatch):
+    """搜索流程的每个请求都带fields参数，lite配置下输出结构不变"""
+    use_fake_client(FakeYouTubeClient(total_videos=10, channels=5))
+    full_results = search(max_results=10)
+
+    # lite配置使用单独的本地状态目录，避免命中full配置时保存的频道信息
+    monkeypatch.setattr(state_store, 'STATE_DIR', os.path.join(state_dir, 'lite'))
+    monkeypatch.setattr(youtube_fields, 'DEFAULT_PROFILE', 'lite')
+    fake = use_fake_client(FakeYouTubeClient(total_videos=10, channels=5))
+    lite_results = search(max_results=10)
+
+    for resource, params, _ in fake.calls:
+        assert params['fields'] == request_params(f'search.{resource}', 'lite')['fields']
+    assert lite_results[0].keys() == full_results[0].keys()
+    assert lite_results[0]['basic_info'].keys() == full_results[0]['basic_info'].keys()
+    print("✅ 搜索请求均使用字段掩码，lite配置输出结构不变")
+
+
+def test_channels_hydrated_from_store(use_fake_client, monkeypatch):
+    """再次搜索时频道信息从本地存储读取，statistics过期后只刷新statistics"""
+    first = use_fake_client(FakeYouTubeClient(total_videos=60, channels=30))
+    search(max_results=60)
+    second = use_fake_client(FakeYouTubeClient(total_videos=60, channels=30))
+    results = search(max_results=60)
+
+    monkeypatch.setitem(channel_store.CHANNEL_FRESHNESS, 'statistics', 0)
+    third = use_fake_client(FakeYouTubeClient(total_videos=60, channels=30))
+    search(max_results=60)
+
+    channel_calls = lambda fake: [params for resource, params, _ in fake.calls if resource == 'channels']
+    assert len(channel_calls(first)) == 1
+    assert channel_calls(second) == []
+    assert results[0]['channel_info']['title'] == 'channel c0'
+    assert [params['part'] for params in channel_calls(third)] == ['statistics']
+    print("✅ 频道信息优先从本地存储读取，只刷新过期的字段组")
+
+
+def main():
+    """主函数（测试使用conftest.py中的fixture，通过pytest运行）"""
+    print("🧪 搜索模式并发详情获取测试")
+    print("=" * 60)
+    return pytest.main([__file__, '-q', '-s'])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
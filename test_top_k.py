@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试流式Top-K评论选择
+验证堆选择与稳定排序取前k条结果一致，以及获取评论时只保留点赞数最高的k条
+"""
+
+import sys
+import random
+
+import pytest
+
+from top_k import TopK
+from youtube_search_webhook import get_video_comments
+
+
+class FakeCommentsClient:
+    """模拟videos和commentThreads请求，第n条评论的点赞数为 n % 97（大量并列）"""
+
+    def __init__(self, total_comments):
+        self.total_comments = total_comments
+
+    def list(self, resource, **params):
+        if resource == 'videos':
+            return {'items': [{'id': params['id'], 'snippet': {'title': 'video'}, 'statistics': {}}]}
+        if resource == 'commentThreads':
+            offset = int(params.get('pageToken') or 0)
+            count = min(params['maxResults'], self.total_comments - offset)
+            response = {'items': [
+                {'id': f'c{offset + i}', 'snippet': {'totalReplyCount': 0, 'topLevelComment': {'snippet': {
+                    'textDisplay': f'comment {offset + i}', 'likeCount': (offset + i) % 97}}}}
+                for i in range(count)
+            ]}
+            if offset + count < self.total_comments:
+                response['nextPageToken'] = str(offset + count)
+            return response
+        raise ValueError(f"未模拟的资源: {resource}")
+
+
+def test_matches_stable_sort():
+    """与稳定排序后取前k条的结果相同，并列时先到的在前，最多保留k条"""
+    rng = random.Random(7)
+    items = [{'index': i, 'like_count': rng.randint(0, 20)} for i in range(5000)]
+    selector = TopK(50, key=lambda item: item['like_count'])
+    for item in items:
+        selector.push(item)
+        assert len(selector) <= 50
+    expected = sorted(items, key=lambda item: item['like_count'], reverse=True)[:50]
+    assert selector.items() == expected
+
+    small = TopK(10, key=lambda item: item['like_count'])
+    small.extend(items[:3])
+    assert small.items() == sorted(items[:3], key=lambda item: item['like_count'], reverse=True)
+    print("✅ 堆选择结果与稳定排序一致")
+
+
+def test_top_comments_selected_while_streaming(use_fake_client, webhook_sent):
+    """扫描全部评论，只保留并发送点赞数最高的k条"""
+    use_fake_client(FakeCommentsClient(1200))
+    result = get_video_comments('test-key', 'v1', max_comments=0, chunk_size=400, top_k=30,
+                                webhook_url='https://hooks.example.com/c')
+
+    assert result['total_comments_scanned'] == 1200 and result['total_comments_fetched'] == 30
+    assert [comment['like_count'] for comment in result['comments'][:13]] == [96] * 12 + [95]
+    assert [comment['comment_id'] for comment in result['comments'][:2]] == ['c96', 'c193']
+    assert len(webhook_sent) == 1 and 'batch_info' not in webhook_sent[0]
+    print("✅ 流式选出点赞数最高的评论")
+
+
+def main():
+    """主函数（测试使用conftest.py中的fixture，通过pytest运行）"""
+    print("🧪 流式Top-K评论选择测试")
+    print("=" * 60)
+    return pytest.main([__file__, '-q', '-s'])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试webhook分批发送
+验证WebhookBatcher按条数、字节数和等待时间分批，定时器已发送全部数据时close仍发送空的最后一批，
+发送期间加入数据不阻塞，以及搜索模式500个结果分5批发送
+"""
+
+import sys
+import json
+import time
+import threading
+
+import pytest
+
+from webhook_client import WebhookBatcher
+from test_search_concurrency import FakeYouTubeClient, search
+
+
+def make_batcher(sent, **kwargs):
+    """记录发送内容的WebhookBatcher"""
+    return WebhookBatcher(lambda payload, url: sent.append(payload) or True, 'https://hooks.example.com/b',
+                          'videos', envelope={'search_query': 'q'}, **kwargs)
+
+
+def test_flush_on_count():
+    """每批最多max_items条，最后一批带is_final_batch"""
+    sent = []
+    batcher = make_batcher(sent, max_items=4, max_wait=60)
+    for index in range(10):
+        batcher.add({'index': index})
+    batcher.close()
+
+    assert [len(payload['videos']) for payload in sent] == [4, 4, 2]
+    assert [payload['batch_info']['batch_number'] for payload in sent] == [1, 2, 'final']
+    assert [payload['batch_info']['is_final_batch'] for payload in sent] == [False, False, True]
+    assert all(payload['search_query'] == 'q' for payload in sent)
+    assert [item['index'] for payload in sent for item in payload['videos']] == list(range(10))
+    print("✅ 按条数分批")
+
+
+def test_flush_on_size_and_time():
+    """请求体不超过max_bytes；等待超过max_wait的批次不等下一条到达即由定时器发送"""
+    sent = []
+    batcher = make_batcher(sent, max_items=100, max_bytes=600, max_wait=60)
+    for index in range(10):
+        batcher.add({'index': index, 'text': 'x' * 100})
+    batcher.close()
+    assert len(sent) > 1 and sum(len(payload['videos']) for payload in sent) == 10
+    assert all(len(json.dumps(payload, ensure_ascii=False).encode('utf-8')) <= 600 for payload in sent)
+
+    sent = []
+    batcher = make_batcher(sent, max_items=100, max_wait=0.2)
+    batcher.add({'index': 0})
+    batcher.add({'index': 1})
+    time.sleep(0.6)
+    assert [len(payload['videos']) for payload in sent] == [2]
+    assert sent[0]['batch_info'] == {'batch_number': 1, 'batch_size': 2, 'is_final_batch': False}
+    batcher.add({'index': 2})
+    batcher.close()
+    time.sleep(0.3)
+    assert [len(payload['videos']) for payload in sent] == [2, 1]
+    assert sent[-1]['batch_info']['is_final_batch']
+    print("✅ 按字节数和等待时间分批")
+
+
+def test_close_after_timer_sends_empty_final():
+    """定时器已发送全部数据时，close发送一个空的最后一批；从未发送过数据时不发送"""
+    sent = []
+    batcher = make_batcher(sent, max_items=100, max_wait=0.1)
+    batcher.add({'index': 0})
+    time.sleep(0.4)
+    assert batcher.close()
+    assert [len(payload['videos']) for payload in sent] == [1, 0]
+    assert sent[-1]['batch_info'] == {'batch_number': 'final', 'batch_size': 0, 'is_final_batch': True}
+
+    sent = []
+    assert make_batcher(sent, max_wait=60).close()
+    assert sent == []
+    print("✅ 定时器发送全部数据后仍发送最后一批")
+
+
+def test_add_not_blocked_by_send():
+    """发送期间加入数据不等待发送完成，各批仍按顺序发送"""
+    sent = []
+    release = threading.Event()
+
+    def slow_send(payload, url):
+        release.wait(timeout=10)
+        sent.append(payload)
+        return True
+
+    batcher = WebhookBatcher(slow_send, 'https://hooks.example.com/b', 'videos', max_wait=60)
+    batcher.add({'index': 0})
+    sender = threading.Thread(target=batcher.flush, daemon=True)
+    sender.start()
+    time.sleep(0.1)
+    start = time.time()
+    batcher.add({'index': 1})
+    batcher.add({'index': 2})
+    assert time.time() - start < 1
+    release.set()
+    sender.join(timeout=10)
+    batcher.close()
+    assert [[item['index'] for item in payload['videos']] for payload in sent] == [[0], [1, 2]]
+    print("✅ 发送期间加入数据不阻塞")
+
+
+def test_search_sends_batches(use_fake_client, webhook_sent):
+    """搜索500个结果、每批100个时只发送5个请求"""
+    use_fake_client(FakeYouTubeClient(total_videos=500, channels=50))
+    results = search(max_results=500, webhook_url='http://mock-webhook', concurrency=16, batch_size=100)
+
+    assert len(results) == 500
+    assert len(webhook_sent) == 5
+    assert [data['batch_info']['batch_size'] for data in webhook_sent] == [100] * 5
+    assert webhook_sent[-1]['batch_info']['is_final_batch']
+    assert [video['search_metadata']['result_index'] for data in webhook_sent for video in data['videos']] == \
+        list(range(1, 501))
+    print("✅ 搜索结果分5批发送")
+
+
+def main():
+    """主函数（测试使用conftest.py中的fixture，通过pytest运行）"""
+    print("🧪 webhook分批发送测试")
+    print("=" * 60)
+    return pytest.main([__file__, '-q', '-s'])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试webhook连接复用
+在本地启动一个HTTP/1.1服务器，记录每个请求所在的TCP连接，
+验证连续发送和多线程并发发送都复用连接池中的连接，而不是每次新建连接
+"""
+
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import youtube_search_webhook
+from webhook_client import WebhookClient, get_webhook_client
+
+
+class RecordingHandler(BaseHTTPRequestHandler):
+    """记录每个请求的客户端端口（同一端口即同一连接）"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        with self.server.lock:
+            self.server.requests.append((self.client_address[1], payload))
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server():
+    """启动本地webhook服务器，返回 (服务器, URL)"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), RecordingHandler)
+    server.lock = threading.Lock()
+    server.requests = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}/hook'
+
+
+def test_sequential_posts_reuse_connection():
+    """send_to_webhook连续发送复用同一个连接"""
+    server, url = start_server()
+    try:
+        for index in range(5):
+            assert youtube_search_webhook.send_to_webhook({'index': index}, url)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert [payload['index'] for _, payload in server.requests] == list(range(5))
+    assert len({port for port, _ in server.requests}) == 1
+    assert get_webhook_client() is get_webhook_client()
+    print("✅ 连续发送复用同一个连接")
+
+
+def test_concurrent_posts_bounded_by_pool():
+    """多线程并发发送时连接数不超过连接池大小"""
+    server, url = start_server()
+    client = WebhookClient(pool_size=2)
+    try:
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            responses = list(executor.map(lambda index: client.post(url, {'index': index}), range(5)))
+    finally:
+        client.close()
+        server.shutdown()
+        server.server_close()
+
+    assert all(response.status_code == 200 for response in responses)
+    assert len(server.requests) == 5
+    assert len({port for port, _ in server.requests}) <= 2
+    print("✅ 并发发送复用连接池")
+
+
+def main():
+    """主函数"""
+    print("🧪 webhook连接复用测试")
+    print("=" * 60)
+    test_sequential_posts_reuse_connection()
+    test_concurrent_posts_bounded_by_pool()
+    print("\n✨ 测试完成！")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试共享YouTube客户端工厂
+验证客户端在进程内只构建一次，并且每个线程复用自己的长连接
+"""
+
+import threading
+
+from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpMockSequence
+
+import youtube_client
+from youtube_client import get_youtube_client, get_http, load_discovery_document, batch_execute
+
+
+def test_client_is_shared():
+    """相同密钥多次获取应返回同一个客户端"""
+    first = get_youtube_client('test_key_shared')
+    second = get_youtube_client('test_key_shared')
+    other = get_youtube_client('test_key_other')
+
+    assert first is second
+    assert first is not other
+    print("✅ 客户端复用正确")
+
+
+def test_http_is_pooled_per_thread():
+    """同一线程复用同一个Http，不同线程各自持有一个"""
+    main_http = get_http()
+    assert get_http() is main_http
+
+    seen = []
+    worker = threading.Thread(target=lambda: seen.append(get_http()))
+    worker.start()
+    worker.join()
+
+    assert seen and seen[0] is not main_http
+    print("✅ 线程级长连接复用正确")
+
+
+def test_request_uses_developer_key():
+    """构建的请求应带上API密钥"""
+    client = get_youtube_client('test_key_request')
+    request = client.request('videos', part='snippet', id='abc')
+
+    assert 'key=test_key_request' in request.uri
+    assert '/youtube/v3/videos' in request.uri
+    print("✅ 请求构建正确")
+
+
+def test_discovery_document_is_local():
+    """discovery文档无需网络请求即可读取（默认为客户端库自带的静态文档），并且只解析一次"""
+    document = load_discovery_document()
+
+    assert document is load_discovery_document()
+    assert document.get('name') == 'youtube'
+    assert 'videos' in document.get('resources', {})
+    print(f"✅ discovery文档加载正确 (revision {document.get('revision')})")
+
+
+def build_batch_response(parts):
+    """构造multipart批量响应，parts为 (状态码, JSON字符串) 列表"""
+    body = ''
+    for index, (status, content) in enumerate(parts, 1):
+        body += (
+            '--batch_boundary\r\n'
+            'Content-Type: application/http\r\n'
+            f'Content-ID: <response-base + {index}>\r\n\r\n'
+            f'HTTP/1.1 {status} OK\r\n'
+            'Content-Type: application/json\r\n\r\n'
+            f'{content}\r\n'
+        )
+    return body + '--batch_boundary--'
+
+
+def test_batch_execute_keeps_order():
+    """多个请求合并为一次HTTP往返，结果按原顺序返回，子请求错误单独返回"""
+    client = get_youtube_client('test_key_batch')
+    requests = [
+        client.request('commentThreads', part='snippet', videoId='a'),
+        client.request('commentThreads', part='snippet', videoId='b'),
+        client.request('commentThreads', part='snippet', videoId='c'),
+    ]
+    error_body = '{"error": {"errors": [{"reason": "commentsDisabled"}], "code": 403}}'
+    http = HttpMockSequence([
+        ({'status': '200', 'content-type': 'multipart/mixed; boundary="batch_boundary"'},
+         build_batch_response([(200, '{"items": [1]}'), (403, error_body), (200, '{"items": [3]}')])),
+    ])
+
+    results = batch_execute(client.service, requests, http=http, return_exceptions=True)
+
+    assert results[0] == {'items': [1]}
+    assert isinstance(results[1], HttpError) and results[1].resp.status == 403
+    assert results[2] == {'items': [3]}
+    print("✅ 批量请求结果顺序和错误处理正确")
+
+
+def main():
+    """主函数"""
+    print("🧪 共享YouTube客户端测试")
+    print("=" * 60)
+    test_client_is_shared()
+    test_http_is_pooled_per_thread()
+    test_request_uses_developer_key()
+    test_discovery_document_is_local()
+    test_batch_execute_keeps_order()
+    print(f"\n✨ 测试完成！已缓存客户端数: {len(youtube_client._clients)}")
+
+
+if __name__ == "__main__":
+    main()
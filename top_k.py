@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""
+流式Top-K选择
+
+逐条接收数据，只保留按key最大的k条（大小为k的最小堆），内存O(k)，时间O(n log k)。
+key相同时先到的数据排在前面（稳定），与对全部数据做稳定排序后取前k条的结果相同。
+"""
+
+import heapq
+import itertools
+
+
+class TopK:
+    """保留key最大的k条数据
+
+    Args:
+        k: 保留的条数
+        key: 排序依据，如 ``lambda comment: comment['like_count']``
+    """
+
+    def __init__(self, k, key):
+        self.k = k
+        self.key = key
+        self._heap = []  # (key, -序号, 数据)，堆顶是当前保留数据中最先被淘汰的一条
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, item):
+        """加入一条数据，超过k条时淘汰key最小（相同时最后到达）的一条"""
+        entry = (self.key(item), -next(self._counter), item)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif self._heap and entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+
+    def extend(self, items):
+        """加入多条数据"""
+        for item in items:
+            self.push(item)
+
+    def items(self):
+        """按key从大到小返回保留的数据（key相同时按到达顺序）"""
+        return [item for _, _, item in sorted(self._heap, key=lambda entry: entry[:2], reverse=True)]
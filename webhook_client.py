@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+Webhook客户端
+
+所有模式共用一个 ``requests.Session``：按主机保持keep-alive连接池，
+同一webhook主机的后续请求复用已建立的TCP+TLS连接，每次发送只需一次请求/响应往返。
+
+每次发送前按webhook主机限速（见 rate_limiter.py），失败时自动退避重试（见 retry.py）。
+POST不是幂等的，只重试服务端确定没有处理的失败：连接失败、429和503。
+读超时和其他5xx时服务端可能已经写入数据（如飞书表格新增一行），重试会产生重复数据，因此不重试。
+
+配置：
+- WEBHOOK_POOL_SIZE: 每个主机保持的连接数（默认10，不小于同时发送的线程数即可）
+- WEBHOOK_CONNECT_TIMEOUT: 建立连接超时（秒，默认10）
+- WEBHOOK_READ_TIMEOUT: 等待响应超时（秒，默认30）
+
+WebhookBatcher把多条数据合并为一个请求发送（带batch_info），条数、字节数或等待时间任一达到上限时发送一批：
+- WEBHOOK_BATCH_MAX_BYTES: 单个请求体的最大字节数（默认1000000）
+- WEBHOOK_BATCH_MAX_WAIT: 第一条数据进入当前批次后最长等待时间（秒，默认30），到时由后台定时器发送，
+  不需要等下一条数据到达
+"""
+
+import os
+import json
+import threading
+from datetime import datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from rate_limiter import get_rate_limiter
+from retry import call_with_retry, TransientResponseError
+
+WEBHOOK_POOL_SIZE = int(os.getenv('WEBHOOK_POOL_SIZE', '10'))
+WEBHOOK_CONNECT_TIMEOUT = float(os.getenv('WEBHOOK_CONNECT_TIMEOUT', '10'))
+WEBHOOK_READ_TIMEOUT = float(os.getenv('WEBHOOK_READ_TIMEOUT', '30'))
+
+WEBHOOK_BATCH_MAX_BYTES = int(os.getenv('WEBHOOK_BATCH_MAX_BYTES', '1000000'))
+WEBHOOK_BATCH_MAX_WAIT = float(os.getenv('WEBHOOK_BATCH_MAX_WAIT', '30'))
+
+USER_AGENT = 'YouTube-Search-Bot/2.0'
+
+# webhook可重试的HTTP状态码（请求未被处理）
+WEBHOOK_RETRYABLE_STATUS = {429, 503}
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def is_retryable_post(error):
+    """webhook发送失败是否可以重试：429/503，或连接失败（读超时不重试）"""
+    if isinstance(error, TransientResponseError):
+        return True
+    return isinstance(error, requests.exceptions.ConnectionError)
+
+
+class WebhookClient:
+    """持有连接池的webhook客户端，线程安全
+
+    Args:
+        pool_size: 每个主机保持的连接数
+        connect_timeout: 建立连接超时（秒）
+        read_timeout: 等待响应超时（秒）
+    """
+
+    def __init__(self, pool_size=None, connect_timeout=None, read_timeout=None):
+        pool_size = pool_size or WEBHOOK_POOL_SIZE
+        self.timeout = (connect_timeout or WEBHOOK_CONNECT_TIMEOUT, read_timeout or WEBHOOK_READ_TIMEOUT)
+        self.session = requests.Session()
+        # 重试由call_with_retry统一处理，连接池只负责复用连接
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'Content-Type': 'application/json',
+            'User-Agent': USER_AGENT
+        })
+
+    def post(self, webhook_url, payload):
+        """发送JSON数据，返回最终的响应（重试后仍失败时抛出异常）"""
+        def post():
+            get_rate_limiter(webhook_url).acquire()
+            response = self.session.post(webhook_url, json=payload, timeout=self.timeout)
+            if response.status_code in WEBHOOK_RETRYABLE_STATUS:
+                raise TransientResponseError(response)
+            return response
+
+        return call_with_retry(post, "Webhook发送", retryable=is_retryable_post)
+
+    def close(self):
+        """关闭连接池"""
+        self.session.close()
+
+
+class WebhookBatcher:
+    """分批发送webhook数据
+
+    数据先进入当前批次，加入下一条时若当前批次已达到max_items条或加入后会超过max_bytes字节，则先发送当前批次。
+    第一条数据进入批次时启动max_wait秒的定时器，到时后台线程发送当前批次，数据到达变慢时也不会一直积压。
+    close()取消定时器并发送最后一批（is_final_batch为True；剩余数据已由定时器发送时发送一个空的最后一批）。
+    add/flush/close线程安全：取出批次时持有锁，发送时不持有锁（发送期间add不会阻塞），
+    各批按取出顺序依次发送，同一时刻只有一批在发送。
+
+    每批的请求体为 ``{**envelope, list_field: [...], 'batch_info': {...}, 'fetch_timestamp': ...}``，
+    batch_info与频道模式相同：batch_number（最后一批为'final'）、batch_size、is_final_batch。
+
+    Args:
+        send: 发送函数 send(payload, webhook_url)，成功时返回True（如send_to_webhook）
+        webhook_url: Webhook地址
+        list_field: 数据列表字段名（如'videos'）
+        envelope: 每批都带的其他字段
+        max_items: 每批最多条数
+        max_bytes: 每批请求体最大字节数（单条超过时单独发送）
+        max_wait: 批次最长等待时间（秒）
+    """
+
+    def __init__(self, send, webhook_url, list_field, envelope=None, max_items=100, max_bytes=None, max_wait=None):
+        self.send = send
+        self.webhook_url = webhook_url
+        self.list_field = list_field
+        self.envelope = envelope or {}
+        self.max_items = max(1, max_items)
+        self.max_bytes = max_bytes or WEBHOOK_BATCH_MAX_BYTES
+        self.max_wait = WEBHOOK_BATCH_MAX_WAIT if max_wait is None else max_wait
+        self.batches_sent = 0
+        self.failed_batches = 0
+        self.items_sent = 0
+        self._items = []
+        self._bytes = 0
+        self._timer = None
+        self._lock = threading.Lock()
+        # 已取出的批次数；批次按取出顺序编号，轮到该编号（_next_send）时才发送
+        self._batches_taken = 0
+        self._next_send = 0
+        self._send_turn = threading.Condition()
+        self._overhead = len(json.dumps(self._payload([], 'final', True), ensure_ascii=False).encode('utf-8'))
+
+    def _payload(self, items, batch_number, is_final):
+        return {
+            **self.envelope,
+            self.list_field: items,
+            'batch_info': {
+                'batch_number': batch_number,
+                'batch_size': len(items),
+                'is_final_batch': is_final
+            },
+            'fetch_timestamp': datetime.now().isoformat()
+        }
+
+    def add(self, item):
+        """加入一条数据，达到条数/字节数上限时先发送当前批次"""
+        size = len(json.dumps(item, ensure_ascii=False).encode('utf-8')) + 1
+        batch = None
+        with self._lock:
+            if self._items and (
+                len(self._items) >= self.max_items
+                or self._overhead + self._bytes + size > self.max_bytes
+            ):
+                batch = self._take()
+            if not self._items:
+                self._start_timer()
+            self._items.append(item)
+            self._bytes += size
+        if batch is not None:
+            self._send(*batch)
+
+    def _start_timer(self):
+        timer = threading.Timer(self.max_wait, self._on_timeout)
+        timer.daemon = True
+        self._timer = timer
+        timer.start()
+
+    def _on_timeout(self):
+        """定时器到时：发送仍在等待的批次（该批次已被其他原因发送时跳过）"""
+        with self._lock:
+            if self._timer is not threading.current_thread():
+                return
+            batch = self._take()
+        if batch is not None:
+            self._send(*batch)
+
+    def _take(self, is_final=False):
+        """取出当前批次（调用方持有self._lock），没有需要发送的批次时返回None
+
+        最后一批在当前批次为空时，只要之前发送过批次就仍然取出（空批次），保证接收方收到is_final_batch。
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._items and not (is_final and self._batches_taken):
+            return None
+        items, self._items, self._bytes = self._items, [], 0
+        batch_number = 'final' if is_final else self._batches_taken + 1
+        ticket = self._batches_taken
+        self._batches_taken += 1
+        return ticket, items, batch_number, is_final
+
+    def _send(self, ticket, items, batch_number, is_final):
+        """等前面取出的批次发送完后发送本批次，返回是否发送成功"""
+        with self._send_turn:
+            self._send_turn.wait_for(lambda: self._next_send == ticket)
+        success = False
+        try:
+            print(f"📤 发送第 {batch_number} 批数据到webhook ({len(items)} 条)")
+            success = self.send(self._payload(items, batch_number, is_final), self.webhook_url)
+        finally:
+            with self._send_turn:
+                self.batches_sent += 1
+                if success:
+                    self.items_sent += len(items)
+                else:
+                    self.failed_batches += 1
+                    print(f"❌ 第 {batch_number} 批webhook发送失败")
+                self._next_send += 1
+                self._send_turn.notify_all()
+        return success
+
+    def flush(self, is_final=False):
+        """发送当前批次，返回是否发送成功（没有数据时返回True）"""
+        with self._lock:
+            batch = self._take(is_final)
+        if batch is None:
+            return True
+        return self._send(*batch)
+
+    def close(self):
+        """取消定时器，发送最后一批"""
+        return self.flush(is_final=True)
+
+
+def get_webhook_client():
+    """获取进程内共享的webhook客户端"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = WebhookClient()
+    return _client
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+YouTube API并发执行引擎（asyncio）
+
+googleapiclient本身是阻塞的，这里用asyncio把多个独立请求放到线程中并发执行，
+并通过信号量限制同时在途的请求数。每个工作线程通过youtube_client复用自己的长连接。
+开启批量请求模式时，独立请求改为合并成multipart批量请求，一次HTTP往返完成。
+"""
+
+import os
+import asyncio
+from youtube_client import USE_BATCH_REQUESTS
+
+# 默认并发数（可通过环境变量 YOUTUBE_CONCURRENCY 覆盖）
+DEFAULT_CONCURRENCY = int(os.getenv('YOUTUBE_CONCURRENCY', '8'))
+
+
+async def gather_limited(calls, concurrency=None):
+    """在事件循环中并发执行阻塞调用，最多同时执行concurrency个，按原顺序返回结果"""
+    semaphore = asyncio.Semaphore(max(1, concurrency or DEFAULT_CONCURRENCY))
+
+    async def run(call):
+        async with semaphore:
+            return await asyncio.to_thread(call)
+
+    return await asyncio.gather(*(run(call) for call in calls))
+
+
+def run_concurrently(calls, concurrency=None):
+    """并发执行一组无参阻塞调用（同步入口），按原顺序返回结果"""
+    calls = list(calls)
+    if not calls:
+        return []
+    if len(calls) == 1 or (concurrency or DEFAULT_CONCURRENCY) <= 1:
+        return [call() for call in calls]
+    return asyncio.run(gather_limited(calls, concurrency))
+
+
+async def execute_requests(youtube, requests, concurrency=None, use_batch=None):
+    """执行一组相互独立的 ``(resource, params)`` 请求，按原顺序返回响应
+
+    use_batch为True时合并为multipart批量请求（一次HTTP往返），否则并发逐个执行。
+    """
+    requests = list(requests)
+    if not requests:
+        return []
+    if USE_BATCH_REQUESTS if use_batch is None else use_batch:
+        return await asyncio.to_thread(youtube.batch_list, requests)
+    return await gather_limited(
+        [lambda resource=resource, params=params: youtube.list(resource, **params) for resource, params in requests],
+        concurrency
+    )
+
+
+def run_requests(youtube, requests, concurrency=None, use_batch=None):
+    """execute_requests的同步入口"""
+    requests = list(requests)
+    if not requests:
+        return []
+    return asyncio.run(execute_requests(youtube, requests, concurrency, use_batch))
@@ -0,0 +1,378 @@
+# -*- coding: utf-8 -*-
+"""
+YouTube API客户端工厂
+
+所有模式（搜索、评论、频道）共用同一个客户端：
+- 每个进程、每个API密钥只构建一次discovery资源
+- 代理配置只在这里解析一次（SOCKS_PROXY > HTTPS_PROXY > HTTP_PROXY）
+- 每个线程复用一个httplib2.Http，按主机保持keep-alive长连接，避免重复TLS握手
+- discovery文档使用客户端库自带的静态文档（或刷新后保存的本地文件），进程内只解析一次，构建客户端无需网络请求
+- 每次请求发出前在配额账本中预留配额（见 quota_ledger.py）
+- 配置多个密钥时使用密钥池，按剩余配额路由请求（见 key_pool.py）
+- 所有请求共享YouTube API的令牌桶限速（见 rate_limiter.py）
+- 临时错误（5xx、429、rateLimitExceeded等）自动退避重试（见 retry.py）
+- 有效期内的响应直接从本地缓存返回，不发出请求、不计入配额；过期后带etag发条件请求（见 response_cache.py）
+
+刷新本地discovery文档（写入 discovery/youtube.v3.json，之后优先读取该文件）：
+    python youtube_client.py refresh-discovery
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+import googleapiclient.discovery
+from googleapiclient import discovery_cache
+from googleapiclient.http import build_http
+from googleapiclient.errors import HttpError
+from quota_ledger import QUOTA_LEDGER_ENABLED, QuotaBudgetExceeded, get_quota_ledger
+from key_pool import KeyPool, QUOTA_EXHAUSTED_REASONS, split_api_keys
+from rate_limiter import YOUTUBE_DESTINATION, get_rate_limiter
+from response_cache import cached_list, cached_batch
+from retry import call_with_retry, http_error_reasons, is_retryable, backoff_delay, describe_error, RETRY_MAX_ATTEMPTS
+
+API_SERVICE_NAME = "youtube"
+API_VERSION = "v3"
+
+# 刷新后的本地discovery文档路径（可通过环境变量覆盖，文件不存在时使用客户端库自带的静态文档）
+DISCOVERY_PATH = os.getenv(
+    'YOUTUBE_DISCOVERY_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'discovery', f'{API_SERVICE_NAME}.{API_VERSION}.json')
+)
+DISCOVERY_URL = f"https://youtube.googleapis.com/$discovery/rest?version={API_VERSION}"
+
+# HTTP超时时间（秒）
+HTTP_TIMEOUT = 30
+
+# 是否将相互独立的请求合并为multipart批量请求（可通过环境变量 YOUTUBE_BATCH_REQUESTS 开启）
+USE_BATCH_REQUESTS = os.getenv('YOUTUBE_BATCH_REQUESTS', 'false').lower() == 'true'
+
+# 单个multipart批量请求最多包含的子请求数
+MAX_BATCH_SIZE = 50
+
+_clients = {}
+_clients_lock = threading.Lock()
+_thread_local = threading.local()
+_discovery_doc = None
+_discovery_lock = threading.Lock()
+
+
+def _get_proxy_url():
+    """读取代理配置，GitHub Actions环境下不使用代理"""
+    if os.getenv('GITHUB_ACTIONS') == 'true':
+        return None
+    return os.getenv('SOCKS_PROXY') or os.getenv('HTTPS_PROXY') or os.getenv('HTTP_PROXY')
+
+
+def _new_http():
+    """根据当前代理配置创建一个新的httplib2.Http"""
+    proxy_url = _get_proxy_url()
+    if not proxy_url:
+        return build_http()
+
+    import httplib2
+    import socks
+
+    socks_proxy = os.getenv('SOCKS_PROXY')
+    if socks_proxy:
+        # SOCKS代理
+        proxy_parts = socks_proxy.replace('socks5://', '').replace('socks4://', '').split(':')
+        proxy_host = proxy_parts[0]
+        proxy_port = int(proxy_parts[1]) if len(proxy_parts) > 1 else 1080
+        proxy_type = socks.PROXY_TYPE_SOCKS5 if 'socks5' in socks_proxy else socks.PROXY_TYPE_SOCKS4
+    else:
+        # HTTP/HTTPS代理
+        proxy_parts = proxy_url.replace('http://', '').replace('https://', '').split(':')
+        proxy_host = proxy_parts[0]
+        proxy_port = int(proxy_parts[1]) if len(proxy_parts) > 1 else 8080
+        proxy_type = httplib2.socks.PROXY_TYPE_HTTP
+
+    return httplib2.Http(
+        proxy_info=httplib2.ProxyInfo(
+            proxy_type=proxy_type,
+            proxy_host=proxy_host,
+            proxy_port=proxy_port
+        ),
+        timeout=HTTP_TIMEOUT
+    )
+
+
+def get_http():
+    """获取当前线程的长连接HTTP对象（httplib2.Http非线程安全，每个线程各持有一个）"""
+    http = getattr(_thread_local, 'http', None)
+    if http is None:
+        http = _new_http()
+        _thread_local.http = http
+    return http
+
+
+def load_discovery_document():
+    """读取discovery文档（进程内只解析一次）
+
+    执行过refresh-discovery时使用刷新后的本地文件，否则使用google-api-python-client自带的静态文档。
+    """
+    global _discovery_doc
+    with _discovery_lock:
+        if _discovery_doc is None:
+            if os.path.exists(DISCOVERY_PATH):
+                with open(DISCOVERY_PATH, 'r', encoding='utf-8') as f:
+                    _discovery_doc = json.load(f)
+            else:
+                _discovery_doc = json.loads(discovery_cache.get_static_doc(API_SERVICE_NAME, API_VERSION))
+    return _discovery_doc
+
+
+def refresh_discovery_document():
+    """从Google下载最新的discovery文档并写入本地文件（紧凑格式，不缩进）"""
+    global _discovery_doc
+    print(f"🔄 正在下载discovery文档: {DISCOVERY_URL}")
+    resp, content = get_http().request(DISCOVERY_URL, 'GET')
+    if resp.status != 200:
+        raise Exception(f"下载discovery文档失败: HTTP {resp.status}")
+
+    document = json.loads(content.decode('utf-8'))
+    os.makedirs(os.path.dirname(DISCOVERY_PATH), exist_ok=True)
+    tmp_path = DISCOVERY_PATH + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, DISCOVERY_PATH)
+
+    with _discovery_lock:
+        _discovery_doc = document
+    print(f"✅ discovery文档已更新: {DISCOVERY_PATH} (revision {document.get('revision', 'unknown')})")
+    return document
+
+
+def is_quota_exhausted(error):
+    """错误是否表示密钥当日配额已用尽"""
+    return isinstance(error, HttpError) and bool(http_error_reasons(error) & QUOTA_EXHAUSTED_REASONS)
+
+
+def build_youtube_service(api_key, http=None):
+    """使用本地discovery文档构建YouTube资源对象（无网络请求）"""
+    return googleapiclient.discovery.build_from_document(
+        load_discovery_document(),
+        developerKey=api_key,
+        http=http or get_http()
+    )
+
+
+def batch_execute(service, requests, http=None, return_exceptions=False):
+    """将多个请求对象合并为multipart批量请求执行（每MAX_BATCH_SIZE个一次HTTP往返）
+
+    Args:
+        service: build_youtube_service构建的资源对象
+        requests: HttpRequest列表
+        http: 执行批量请求使用的Http，默认当前线程的长连接
+        return_exceptions: 为True时子请求的HttpError作为结果返回，否则抛出第一个错误
+
+    Returns:
+        与requests顺序一致的响应列表
+    """
+    results = [None] * len(requests)
+    for start in range(0, len(requests), MAX_BATCH_SIZE):
+        batch = service.new_batch_http_request()
+        for index in range(start, min(start + MAX_BATCH_SIZE, len(requests))):
+            def callback(request_id, response, exception, index=index):
+                results[index] = exception if exception is not None else response
+            batch.add(requests[index], callback=callback)
+        batch.execute(http=http or get_http())
+
+    if not return_exceptions:
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+    return results
+
+
+class YouTubeClient:
+    """共享的YouTube API客户端
+
+    通过 ``list(resource, **params)`` 发起请求，例如::
+
+        client.list('videos', part='snippet', id='abc')
+    """
+
+    def __init__(self, api_key):
+        self.api_key = api_key
+        self.service = build_youtube_service(api_key)
+
+    def request(self, resource, if_none_match=None, **params):
+        """构建 ``<resource>().list(**params)`` 请求对象（不执行），if_none_match为缓存的etag"""
+        request = getattr(self.service, resource)().list(**params)
+        if if_none_match:
+            request.headers['If-None-Match'] = if_none_match
+        return request
+
+    def execute(self, request):
+        """使用当前线程的长连接执行请求"""
+        return request.execute(http=get_http())
+
+    def reserve_quota(self, resources):
+        """在配额账本中预留配额，超出每日预算时抛出QuotaBudgetExceeded"""
+        if QUOTA_LEDGER_ENABLED:
+            get_quota_ledger().reserve(self.api_key, resources)
+
+    def fetch(self, resource, if_none_match=None, **params):
+        """构建并执行 ``<resource>().list(**params)`` 请求（不经过缓存），临时错误自动重试（每次尝试都计入配额）
+
+        if_none_match为缓存的etag，内容未变时抛出状态码304的HttpError。
+        """
+        request = self.request(resource, if_none_match, **params)
+
+        def attempt():
+            self.reserve_quota([resource])
+            get_rate_limiter(YOUTUBE_DESTINATION).acquire()
+            return self.execute(request)
+
+        return call_with_retry(attempt, f"{resource}请求")
+
+    def list(self, resource, **params):
+        """执行 ``<resource>().list(**params)`` 请求，有效期内的缓存响应直接返回（不计入配额）"""
+        return cached_list(resource, params, lambda etag: self.fetch(resource, etag, **params))
+
+    def _batch_attempt(self, requests, etags):
+        """执行一次批量请求，子请求错误作为结果返回"""
+        http_requests = [self.request(resource, etag, **params) for (resource, params), etag in zip(requests, etags)]
+        self.reserve_quota([resource for resource, _ in requests])
+        get_rate_limiter(YOUTUBE_DESTINATION).acquire(-(-len(requests) // MAX_BATCH_SIZE))
+        return batch_execute(self.service, http_requests, return_exceptions=True)
+
+    def batch_fetch(self, requests, etags=None):
+        """以multipart批量请求执行多个 ``(resource, params)``（不经过缓存），子请求错误作为结果返回
+
+        整个批量请求失败时整体重试；个别子请求遇到临时错误时只重试这些子请求。
+        etags为各子请求缓存的etag，内容未变的子请求结果为状态码304的HttpError。
+        """
+        requests = list(requests)
+        etags = list(etags or [None] * len(requests))
+        results = call_with_retry(lambda: self._batch_attempt(requests, etags), "批量请求")
+
+        for attempt in range(1, RETRY_MAX_ATTEMPTS):
+            failed = [index for index, result in enumerate(results)
+                      if isinstance(result, Exception) and is_retryable(result)]
+            if not failed:
+                break
+            delay = backoff_delay(attempt, results[failed[0]])
+            print(f"🔁 {len(failed)} 个批量子请求失败（{describe_error(results[failed[0]])}），"
+                  f"{delay:.1f}s 后第 {attempt}/{RETRY_MAX_ATTEMPTS - 1} 次重试")
+            time.sleep(delay)
+            retried = call_with_retry(
+                lambda: self._batch_attempt([requests[index] for index in failed], [etags[index] for index in failed]),
+                "批量请求"
+            )
+            for index, result in zip(failed, retried):
+                results[index] = result
+        return results
+
+    def batch_list(self, requests, return_exceptions=False):
+        """批量执行多个 ``(resource, params)``，按原顺序返回响应，只有未命中缓存的请求会发出"""
+        return _check_results(cached_batch(list(requests), self.batch_fetch), return_exceptions)
+
+
+def _check_results(results, return_exceptions):
+    """return_exceptions为False时抛出结果中的第一个错误"""
+    if not return_exceptions:
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+    return results
+
+
+class PooledYouTubeClient:
+    """多密钥客户端，接口与YouTubeClient相同
+
+    每次请求选择剩余配额最多的密钥；某个密钥返回quotaExceeded（或本地预算不足）时，
+    原样（包括pageToken）换下一个密钥重试，分页可以在不同密钥之间继续。
+    """
+
+    def __init__(self, api_keys):
+        self.pool = KeyPool(api_keys)
+        self.clients = {api_key: YouTubeClient(api_key) for api_key in self.pool.api_keys}
+
+    def _call(self, resources, call):
+        tried = set()
+        while True:
+            api_key = self.pool.choose(resources, skip=tried)
+            tried.add(api_key)
+            try:
+                return call(self.clients[api_key])
+            except QuotaBudgetExceeded:
+                # 其他进程在选择后用掉了这个密钥的预算
+                continue
+            except HttpError as e:
+                if not is_quota_exhausted(e):
+                    raise
+                self.pool.mark_exhausted(api_key)
+
+    def request(self, resource, if_none_match=None, **params):
+        """使用当前剩余配额最多的密钥构建请求对象（不执行）"""
+        return self.clients[self.pool.choose([resource])].request(resource, if_none_match, **params)
+
+    def fetch(self, resource, if_none_match=None, **params):
+        """构建并执行 ``<resource>().list(**params)`` 请求（不经过缓存）"""
+        return self._call([resource], lambda client: client.fetch(resource, if_none_match, **params))
+
+    def list(self, resource, **params):
+        """执行 ``<resource>().list(**params)`` 请求，有效期内的缓存响应直接返回（不计入配额）"""
+        return cached_list(resource, params, lambda etag: self.fetch(resource, etag, **params))
+
+    def batch_fetch(self, requests, etags=None):
+        """以multipart批量请求执行多个 ``(resource, params)``（不经过缓存），子请求错误作为结果返回
+
+        子请求因配额用尽失败时，只把这些子请求换下一个密钥重新执行。
+        """
+        requests = list(requests)
+        etags = list(etags or [None] * len(requests))
+        used = {}
+
+        def call(client):
+            used['api_key'] = client.api_key
+            return client.batch_fetch(requests, etags)
+
+        results = self._call([resource for resource, _ in requests], call)
+        exhausted = [index for index, result in enumerate(results) if is_quota_exhausted(result)]
+        if exhausted:
+            self.pool.mark_exhausted(used['api_key'])
+            retried = self.batch_fetch([requests[index] for index in exhausted], [etags[index] for index in exhausted])
+            for index, result in zip(exhausted, retried):
+                results[index] = result
+        return results
+
+    def batch_list(self, requests, return_exceptions=False):
+        """批量执行多个 ``(resource, params)``，按原顺序返回响应，只有未命中缓存的请求会发出"""
+        return _check_results(cached_batch(list(requests), self.batch_fetch), return_exceptions)
+
+
+def get_youtube_client(api_key):
+    """获取共享的YouTube客户端，同一进程内相同密钥和代理配置只构建一次
+
+    api_key为逗号分隔的多个密钥（或密钥列表）时返回PooledYouTubeClient。
+    """
+    api_keys = split_api_keys(api_key)
+    cache_key = (tuple(api_keys), _get_proxy_url())
+    with _clients_lock:
+        client = _clients.get(cache_key)
+        if client is None:
+            if len(api_keys) > 1:
+                client = PooledYouTubeClient(api_keys)
+                print(f"🔑 密钥池: {len(api_keys)} 个API密钥")
+            else:
+                client = YouTubeClient(api_keys[0])
+            _clients[cache_key] = client
+
+            proxy_url = cache_key[1]
+            if os.getenv('GITHUB_ACTIONS') == 'true':
+                print("🚀 GitHub Actions环境，直接连接YouTube API")
+            elif proxy_url:
+                print(f"🌐 使用代理: {proxy_url}")
+    return client
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'refresh-discovery':
+        refresh_discovery_document()
+    else:
+        print("用法: python youtube_client.py refresh-discovery")
+        sys.exit(1)
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+YouTube API部分响应（fields=）字段掩码
+
+每种请求只声明输出数据结构实际用到的字段，由此同时生成 ``part`` 和 ``fields`` 参数，
+避免下载、解析未使用的数据。
+
+字段配置：
+- full: 输出结构中所有字段都有数据（默认）
+- lite: 去掉描述、标签、录制详情、主题等较重的部分，输出结构不变，缺失字段使用默认值
+
+通过环境变量 YOUTUBE_FIELDS_PROFILE=lite 切换。
+"""
+
+import os
+
+DEFAULT_PROFILE = os.getenv('YOUTUBE_FIELDS_PROFILE', 'full')
+
+
+def _spec(parts, item_fields=('id',), page_fields=()):
+    """构建请求字段声明
+
+    Args:
+        parts: {part名: 子字段列表}，子字段为None表示整个part
+        item_fields: 每个item上除part外需要的字段
+        page_fields: 响应顶层需要的字段（如nextPageToken）
+    """
+    return {'parts': parts, 'item_fields': tuple(item_fields), 'page_fields': tuple(page_fields)}
+
+
+# 搜索模式
+SEARCH_VIDEO_SNIPPET = [
+    'publishedAt', 'channelId', 'title', 'description', 'channelTitle', 'tags', 'categoryId',
+    'liveBroadcastContent', 'defaultLanguage', 'defaultAudioLanguage', 'localized', 'thumbnails'
+]
+SEARCH_CHANNEL_SNIPPET = [
+    'title', 'description', 'customUrl', 'publishedAt', 'country', 'defaultLanguage', 'localized',
+    'thumbnails/high/url'
+]
+
+# 频道模式
+CHANNEL_VIDEO_SNIPPET = [
+    'title', 'description', 'publishedAt', 'thumbnails', 'tags', 'categoryId', 'defaultLanguage',
+    'liveBroadcastContent', 'defaultAudioLanguage'
+]
+CHANNEL_SNIPPET = ['title', 'description', 'customUrl', 'publishedAt', 'country', 'thumbnails/high/url']
+
+# 评论模式
+COMMENT_SNIPPET = ['authorDisplayName', 'authorChannelUrl', 'textDisplay', 'likeCount', 'publishedAt', 'updatedAt']
+COMMENT_THREAD_SNIPPET = ['totalReplyCount', 'topLevelComment/snippet(' + ','.join(COMMENT_SNIPPET) + ')']
+
+FIELD_PROFILES = {
+    'full': {
+        'search.search': _spec({'snippet': []}, item_fields=('kind', 'etag', 'id'), page_fields=('nextPageToken',)),
+        'search.videos': _spec({
+            'snippet': SEARCH_VIDEO_SNIPPET,
+            'statistics': ['viewCount', 'likeCount', 'dislikeCount', 'commentCount', 'favoriteCount'],
+            'contentDetails': [
+                'duration', 'dimension', 'definition', 'caption', 'licensedContent', 'regionRestriction',
+                'contentRating', 'projection', 'hasCustomThumbnail'
+            ],
+            'status': [
+                'uploadStatus', 'failureReason', 'rejectionReason', 'privacyStatus', 'publishAt', 'license',
+                'embeddable', 'publicStatsViewable', 'madeForKids', 'selfDeclaredMadeForKids'
+            ],
+            'recordingDetails': ['locationDescription', 'location', 'recordingDate'],
+            'topicDetails': ['topicIds', 'relevantTopicIds', 'topicCategories'],
+        }),
+        'search.channels': _spec({
+            'snippet': SEARCH_CHANNEL_SNIPPET,
+            'statistics': ['subscriberCount', 'videoCount', 'viewCount', 'hiddenSubscriberCount'],
+            'brandingSettings': ['channel/keywords'],
+            'status': ['privacyStatus', 'isLinked', 'longUploadsStatus', 'madeForKids', 'selfDeclaredMadeForKids'],
+            'topicDetails': ['topicIds', 'topicCategories'],
+        }),
+        'channel.channels': _spec({
+            'snippet': CHANNEL_SNIPPET,
+            'statistics': ['subscriberCount', 'videoCount', 'viewCount'],
+            'contentDetails': ['relatedPlaylists/uploads'],
+        }),
+        'channel.playlistItems': _spec(
+            {'contentDetails': ['videoId', 'videoPublishedAt']}, item_fields=(), page_fields=('nextPageToken',)
+        ),
+        'channel.videos': _spec({
+            'snippet': CHANNEL_VIDEO_SNIPPET,
+            'statistics': ['viewCount', 'likeCount', 'commentCount'],
+            'contentDetails': ['duration', 'definition', 'caption', 'dimension', 'projection', 'hasCustomThumbnail'],
+            'status': ['privacyStatus', 'uploadStatus', 'license', 'embeddable', 'publicStatsViewable', 'madeForKids'],
+            'recordingDetails': ['recordingDate', 'locationDescription', 'location'],
+            'topicDetails': ['topicIds', 'topicCategories'],
+        }),
+        'watch.channels': _spec({'statistics': ['videoCount'], 'contentDetails': ['relatedPlaylists/uploads']}),
+        'comments.videos': _spec({
+            'snippet': ['title', 'channelTitle', 'channelId', 'publishedAt', 'description'],
+            'statistics': ['viewCount', 'likeCount', 'commentCount'],
+        }),
+        'comments.commentThreads': _spec({'snippet': COMMENT_THREAD_SNIPPET}, page_fields=('nextPageToken',)),
+        'comments.commentThreads.replies': _spec(
+            {'snippet': COMMENT_THREAD_SNIPPET, 'replies': [f"comments(snippet({','.join(COMMENT_SNIPPET)}))"]},
+            page_fields=('nextPageToken',)
+        ),
+        'comments.comments': _spec({'snippet': COMMENT_SNIPPET}, page_fields=('nextPageToken',)),
+    },
+    'lite': {
+        'search.search': _spec({'snippet': []}, item_fields=('kind', 'etag', 'id'), page_fields=('nextPageToken',)),
+        'search.videos': _spec({
+            'snippet': ['publishedAt', 'channelId', 'title', 'channelTitle', 'categoryId',
+                        'liveBroadcastContent', 'defaultLanguage', 'thumbnails/high'],
+            'statistics': ['viewCount', 'likeCount', 'commentCount'],
+            'contentDetails': ['duration', 'definition', 'caption'],
+        }),
+        'search.channels': _spec({
+            'snippet': ['title', 'customUrl', 'publishedAt', 'country', 'thumbnails/high/url'],
+            'statistics': ['subscriberCount', 'videoCount', 'viewCount'],
+        }),
+        'channel.channels': _spec({
+            'snippet': ['title', 'customUrl', 'country', 'thumbnails/high/url'],
+            'statistics': ['subscriberCount', 'videoCount', 'viewCount'],
+            'contentDetails': ['relatedPlaylists/uploads'],
+        }),
+        'channel.playlistItems': _spec(
+            {'contentDetails': ['videoId', 'videoPublishedAt']}, item_fields=(), page_fields=('nextPageToken',)
+        ),
+        'channel.videos': _spec({
+            'snippet': ['title', 'publishedAt', 'thumbnails/high', 'categoryId'],
+            'statistics': ['viewCount', 'likeCount', 'commentCount'],
+            'contentDetails': ['duration', 'definition', 'caption'],
+            'status': ['privacyStatus'],
+        }),
+        'watch.channels': _spec({'statistics': ['videoCount'], 'contentDetails': ['relatedPlaylists/uploads']}),
+        'comments.videos': _spec({
+            'snippet': ['title', 'channelTitle', 'channelId', 'publishedAt'],
+            'statistics': ['viewCount', 'likeCount', 'commentCount'],
+        }),
+        'comments.commentThreads': _spec({'snippet': COMMENT_THREAD_SNIPPET}, page_fields=('nextPageToken',)),
+        'comments.commentThreads.replies': _spec(
+            {'snippet': COMMENT_THREAD_SNIPPET, 'replies': [f"comments(snippet({','.join(COMMENT_SNIPPET)}))"]},
+            page_fields=('nextPageToken',)
+        ),
+        'comments.comments': _spec({'snippet': COMMENT_SNIPPET}, page_fields=('nextPageToken',)),
+    },
+}
+
+
+def build_fields_mask(spec):
+    """根据字段声明生成fields参数，例如 ``etag,items(id,snippet(title)),nextPageToken``
+
+    始终包含响应顶层的etag，用于缓存过期后的条件请求（If-None-Match）。
+    """
+    item_fields = list(spec['item_fields'])
+    for part, sub_fields in spec['parts'].items():
+        if sub_fields is None:
+            item_fields.append(part)
+        elif sub_fields:
+            item_fields.append(f"{part}({','.join(sub_fields)})")
+    return ','.join(['etag', f"items({','.join(item_fields)})", *spec['page_fields']])
+
+
+def _get_spec(name, profile=None):
+    profile = profile or DEFAULT_PROFILE
+    if profile not in FIELD_PROFILES:
+        raise ValueError(f"不支持的字段配置: {profile}，请使用 {'/'.join(FIELD_PROFILES)}")
+    return FIELD_PROFILES[profile][name]
+
+
+def request_params(name, profile=None, parts=None):
+    """获取指定请求的 part 和 fields 参数
+
+    Args:
+        name: 请求名称，如 'search.videos'、'channel.playlistItems'
+        profile: 字段配置（full/lite），默认读取环境变量 YOUTUBE_FIELDS_PROFILE
+        parts: 只请求其中的部分part（默认全部）
+    """
+    spec = _get_spec(name, profile)
+    if parts is not None:
+        spec = dict(spec, parts={part: fields for part, fields in spec['parts'].items() if part in parts})
+    return {'part': ','.join(spec['parts']), 'fields': build_fields_mask(spec)}
+
+
+def part_masks(name, profile=None):
+    """每个part对应的字段掩码，如 {'snippet': 'snippet(title,description)'}
+
+    用于判断本地保存的某个part数据是否包含当前配置需要的全部字段。
+    """
+    masks = {}
+    for part, sub_fields in _get_spec(name, profile)['parts'].items():
+        masks[part] = f"{part}({','.join(sub_fields)})" if sub_fields else part
+    return masks
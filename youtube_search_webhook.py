@@ -14,26 +14,44 @@ import os
 import sys
 import json
 import time
-import requests
-import googleapiclient.discovery
+import asyncio
+from collections import deque
 import googleapiclient.errors
 from datetime import datetime, timezone
-from googleapiclient.http import build_http
+from urllib.parse import urlparse, parse_qs
+from youtube_client import get_youtube_client
+from youtube_async import run_requests, execute_requests, run_concurrently
+from youtube_fields import request_params, part_masks, DEFAULT_PROFILE, FIELD_PROFILES
+from quota_ledger import QuotaBudgetExceeded, QUOTA_LEDGER_ENABLED, QUOTA_COSTS, get_quota_ledger, key_id, quota_day
+from key_pool import KeyPool, split_api_keys
+from retry import http_error_reasons
+from response_cache import print_cache_summary
+from channel_store import get_channel_store
+from comment_store import get_comment_store, LIKE_REFRESH_TOP
+from result_writer import StreamingJsonWriter
+from top_k import TopK
+from webhook_client import get_webhook_client, WebhookBatcher
+from negative_cache import get_negative_cache, negative_reason
+
+# 评论超过此数量时分批流式输出（环境变量 COMMENT_CHUNK_SIZE）
+COMMENT_CHUNK_SIZE = int(os.getenv('COMMENT_CHUNK_SIZE', '500'))
+
+# 同时展开回复的评论线程数（环境变量 REPLY_CONCURRENCY，默认与 YOUTUBE_CONCURRENCY 相同）
+REPLY_CONCURRENCY = int(os.getenv('REPLY_CONCURRENCY', os.getenv('YOUTUBE_CONCURRENCY', '8')))
+
+# 多视频评论模式同时处理的视频数（环境变量 COMMENT_CONCURRENCY）
+COMMENT_CONCURRENCY = int(os.getenv('COMMENT_CONCURRENCY', '4'))
+
+# 只保留点赞数最高的评论数（环境变量 COMMENT_TOP_K，0表示不筛选）
+COMMENT_TOP_K = int(os.getenv('COMMENT_TOP_K', '0'))
+
+# 搜索模式每个webhook请求包含的视频数（环境变量 SEARCH_BATCH_SIZE，1表示每个视频单独发送）
+SEARCH_BATCH_SIZE = int(os.getenv('SEARCH_BATCH_SIZE', '1'))
 
 def send_to_webhook(video_data, webhook_url):
-    """发送视频数据到webhook"""
+    """发送视频数据到webhook（共享连接池的WebhookClient，按主机限速，连接失败和429/503自动重试）"""
     try:
-        headers = {
-            'Content-Type': 'application/json',
-            'User-Agent': 'YouTube-Search-Bot/2.0'
-        }
-        
-        response = requests.post(
-            webhook_url, 
-            json=video_data, 
-            headers=headers,
-            timeout=30
-        )
+        response = get_webhook_client().post(webhook_url, video_data)
         
         if response.status_code == 200:
             print(f"✅ Webhook发送成功: {response.status_code}")
@@ -46,148 +64,417 @@ def send_to_webhook(video_data, webhook_url):
         print(f"❌ Webhook发送异常: {e}")
         return False
 
-def get_video_comments(api_key, video_id, max_comments=50, webhook_url=None):
-    """获取YouTube视频的热门评论"""
+def build_comment_data(item):
+    """将commentThreads().list返回的评论线程转换为评论数据字典"""
+    comment = item['snippet']['topLevelComment']['snippet']
+    return {
+        'comment_id': item.get('id', ''),
+        'author_name': comment.get('authorDisplayName', ''),
+        'author_channel_url': comment.get('authorChannelUrl', ''),
+        'text': comment.get('textDisplay', ''),
+        'like_count': int(comment.get('likeCount', 0)),
+        'published_at': comment.get('publishedAt', ''),
+        'updated_at': comment.get('updatedAt', ''),
+        'reply_count': item['snippet'].get('totalReplyCount', 0)
+    }
+
+def build_reply_data(reply):
+    """将comments资源（回复）转换为回复数据字典"""
+    snippet = reply.get('snippet', {})
+    return {
+        'author_name': snippet.get('authorDisplayName', ''),
+        'author_channel_url': snippet.get('authorChannelUrl', ''),
+        'text': snippet.get('textDisplay', ''),
+        'like_count': int(snippet.get('likeCount', 0)),
+        'published_at': snippet.get('publishedAt', ''),
+        'updated_at': snippet.get('updatedAt', '')
+    }
+
+def fetch_replies(youtube, parent_id):
+    """获取一条评论的全部回复（comments().list(parentId=...)，跟随分页）"""
+    replies = []
+    page_token = None
+    while True:
+        response = youtube.list(
+            'comments',
+            parentId=parent_id,
+            maxResults=100,
+            pageToken=page_token,
+            **request_params('comments.comments')
+        )
+        items = response.get('items', [])
+        replies.extend(build_reply_data(item) for item in items)
+        page_token = response.get('nextPageToken')
+        if not page_token or not items:
+            return replies
+
+def expand_replies(youtube, items, comments, concurrency=None):
+    """为评论填充replies字段
     
-    # API配置
-    api_service_name = "youtube"
-    api_version = "v3"
+    commentThreads只内嵌少量回复，totalReplyCount多于内嵌回复的线程用fetch_replies获取完整回复，
+    不同线程并发获取（最多concurrency个同时进行），单个线程获取失败时保留内嵌回复。
+    
+    Returns:
+        展开的线程数
+    """
+    for item, comment in zip(items, comments):
+        comment['replies'] = [build_reply_data(reply) for reply in item.get('replies', {}).get('comments', [])]
+    pending = [(item['id'], comment) for item, comment in zip(items, comments)
+               if comment['reply_count'] > len(comment['replies'])]
+    if not pending:
+        return 0
+    
+    def fetch(parent_id):
+        try:
+            return fetch_replies(youtube, parent_id)
+        except googleapiclient.errors.HttpError as e:
+            print(f"⚠️ 获取评论 {parent_id} 的回复失败，保留内嵌回复: {e}")
+            return None
+    
+    print(f"🧵 并发展开 {len(pending)} 条评论的回复")
+    results = run_concurrently(
+        [lambda parent_id=parent_id: fetch(parent_id) for parent_id, _ in pending],
+        concurrency or REPLY_CONCURRENCY
+    )
+    for (_, comment), replies in zip(pending, results):
+        if replies is not None:
+            comment['replies'] = replies
+    return len(pending)
+
+def reached_comment_watermark(comment, watermark):
+    """评论是否已到达上次同步位置（同一评论，或发布时间早于同步位置）"""
+    comment_id, published_at = watermark
+    if comment['comment_id'] == comment_id:
+        return True
+    return bool(published_at and comment['published_at'] and comment['published_at'] < published_at)
+
+def iter_comment_pages(youtube, video_id, max_comments=None, order="relevance", with_replies=False, until=None):
+    """逐页获取评论线程，每页产出 (原始线程列表, 评论数据列表)，不展开回复
+    
+    跟随nextPageToken翻页（每页最多100条），直到获取max_comments条或全部评论（max_comments为None时）。
+    with_replies=True时请求内嵌回复（见expand_replies）。
+    until为上次同步位置 (评论ID, 发布时间) 时（需配合order="time"），到达该位置即停止翻页，只产出更新的评论。
+    """
+    fetched = 0
+    page_token = None
+    while True:
+        page_size = 100 if max_comments is None else min(100, max_comments - fetched)  # YouTube API最大支持100条
+        response = youtube.list(
+            'commentThreads',
+            videoId=video_id,
+            maxResults=page_size,
+            order=order,
+            pageToken=page_token,
+            **request_params('comments.commentThreads.replies' if with_replies else 'comments.commentThreads')
+        )
+        items = response.get('items', [])
+        if max_comments is not None:
+            items = items[:max_comments - fetched]
+        comments = [build_comment_data(item) for item in items]
+        reached = False
+        if until:
+            for index, comment in enumerate(comments):
+                if reached_comment_watermark(comment, until):
+                    items, comments, reached = items[:index], comments[:index], True
+                    break
+        yield items, comments
+        fetched += len(comments)
+        if reached or (max_comments is not None and fetched >= max_comments):
+            return
+        page_token = response.get('nextPageToken')
+        if not page_token or not items:
+            return
+
+def iter_video_comments(youtube, video_id, max_comments=None, order="relevance", include_replies=False,
+                        reply_concurrency=None, until=None):
+    """逐页获取视频评论并逐条产出
+    
+    每页返回后立即产出，调用方可以边获取边处理，内存中只保留当前页（翻页规则见iter_comment_pages）。
+    include_replies=True时每条评论带replies字段，回复较多的线程并发获取完整回复（见expand_replies）。
+    """
+    for items, comments in iter_comment_pages(youtube, video_id, max_comments, order, include_replies, until):
+        if include_replies:
+            expand_replies(youtube, items, comments, reply_concurrency)
+        yield from comments
+
+def oldest_new_comments(youtube, video_id, limit, watermark, include_replies=False, reply_concurrency=None):
+    """增量同步的补齐：翻页到上次同步位置，只产出最早的limit条新评论（按发布时间倒序）
+    
+    新评论超过limit条时，若只取最新的limit条再推进同步位置，中间的评论将永远不会交付。
+    这里先按时间倒序扫描到同步位置（内存中只保留limit条），再产出其中最早的一段，
+    同步位置只推进到已交付的最新评论，剩余的新评论在后续运行中依次补齐。
+    回复在扫描结束后只为保留下来的评论展开，被丢弃的评论不会发起获取回复的请求。
+    """
+    kept = deque(maxlen=limit)
+    total = 0
+    for items, comments in iter_comment_pages(youtube, video_id, order="time", with_replies=include_replies,
+                                              until=watermark):
+        kept.extend(zip(items, comments))
+        total += len(comments)
+    if total > limit:
+        print(f"⏳ 共有 {total} 条新评论，本次交付最早的 {limit} 条，其余在后续运行中补齐")
+    items = [item for item, _ in kept]
+    comments = [comment for _, comment in kept]
+    if include_replies:
+        expand_replies(youtube, items, comments, reply_concurrency)
+    yield from comments
+
+def refresh_comment_likes(youtube, video_id, store):
+    """刷新已知热门评论的点赞数（comments().list(id=...)，每50条一个请求）
+    
+    只刷新点赞数最高且超过刷新间隔的已知评论（见CommentStore.stale_top_comments），已删除的评论从存储中移除。
+    
+    Returns:
+        点赞数有变化的评论 [{'comment_id', 'like_count', 'previous_like_count'}]
+    """
+    known = store.stale_top_comments(video_id)
+    if not known:
+        return []
+    like_counts = {}
+    for chunk in chunk_list(list(known)):
+        response = youtube.list('comments', id=','.join(chunk), **request_params('comments.comments'))
+        for item in response.get('items', []):
+            like_counts[item['id']] = int(item.get('snippet', {}).get('likeCount', 0))
+    store.update_likes(video_id, like_counts, removed=[comment_id for comment_id in known if comment_id not in like_counts])
+    print(f"👍 刷新 {len(known)} 条已知评论的点赞数")
+    return [
+        {'comment_id': comment_id, 'like_count': like_count, 'previous_like_count': known[comment_id]}
+        for comment_id, like_count in like_counts.items() if like_count != known[comment_id]
+    ]
+
+def get_video_comments(api_key, video_id, max_comments=50, webhook_url=None, chunk_size=None, output_file=None,
+                       include_replies=False, reply_concurrency=None, incremental=False, top_k=None,
+                       print_summary=True):
+    """获取YouTube视频的热门评论
+    
+    跟随分页获取最多max_comments条评论（0或None表示全部评论）。评论数不超过chunk_size时与原来相同：
+    按点赞数排序后一次性发送；超过时按chunk_size分批流式发送到webhook（带batch_info）
+    并逐批写入output_file，内存中只保留当前一批，返回结果中不再包含评论列表。
+    include_replies=True时每条评论附带完整的回复列表（replies）。
+    
+    incremental=True时按视频保存的同步位置增量获取：按发布时间倒序获取评论，到达上次交付的最新评论即停止翻页，
+    只输出新评论。新评论交付后再刷新已知热门评论的点赞数（见refresh_comment_likes），
+    有变化时单独发送到webhook（like_updates），刷新失败不影响新评论的结果。
+    
+    top_k大于0时只保留点赞数最高的top_k条：评论逐页进入大小为top_k的堆（见top_k.TopK），
+    内存只保留top_k条，结果一次性发送，total_comments_scanned为扫描的评论数。
+    
+    print_summary=False时不打印缓存统计（多视频评论模式在全部视频完成后统一打印一次）。
+    """
+    chunk_size = chunk_size or COMMENT_CHUNK_SIZE
+    top_k = COMMENT_TOP_K if top_k is None else top_k
+    max_comments = max_comments or None
+    writer = None
     
     try:
-        # 检查是否在GitHub Actions环境中运行
-        is_github_actions = os.getenv('GITHUB_ACTIONS') == 'true'
-        
-        if is_github_actions:
-            # GitHub Actions环境，直接创建客户端（无需代理）
-            youtube = googleapiclient.discovery.build(
-                api_service_name, api_version, developerKey=api_key
-            )
-            print("🚀 GitHub Actions环境，直接连接YouTube API")
-        else:
-            # 本地环境，检查是否需要使用代理
-            http_proxy = os.getenv('HTTP_PROXY')
-            https_proxy = os.getenv('HTTPS_PROXY')
-            socks_proxy = os.getenv('SOCKS_PROXY')
-            
-            proxy_url = socks_proxy or https_proxy or http_proxy
-            
-            if proxy_url:
-                # 使用代理创建HTTP客户端
-                import httplib2
-                import socks
-                
-                if socks_proxy:
-                    # SOCKS代理
-                    proxy_parts = socks_proxy.replace('socks5://', '').replace('socks4://', '').split(':')
-                    proxy_host = proxy_parts[0]
-                    proxy_port = int(proxy_parts[1]) if len(proxy_parts) > 1 else 1080
-                    proxy_type = socks.PROXY_TYPE_SOCKS5 if 'socks5' in socks_proxy else socks.PROXY_TYPE_SOCKS4
-                    
-                    http = httplib2.Http(proxy_info=httplib2.ProxyInfo(
-                        proxy_type=proxy_type,
-                        proxy_host=proxy_host,
-                        proxy_port=proxy_port
-                    ))
-                else:
-                    # HTTP/HTTPS代理
-                    proxy_parts = proxy_url.replace('http://', '').replace('https://', '').split(':')
-                    proxy_host = proxy_parts[0]
-                    proxy_port = int(proxy_parts[1]) if len(proxy_parts) > 1 else 8080
-                    
-                    http = httplib2.Http(proxy_info=httplib2.ProxyInfo(
-                        proxy_type=httplib2.socks.PROXY_TYPE_HTTP,
-                        proxy_host=proxy_host,
-                        proxy_port=proxy_port
-                    ))
-                
-                youtube = googleapiclient.discovery.build(
-                    api_service_name, api_version, developerKey=api_key, http=http
-                )
-                print(f"🌐 使用代理: {proxy_url}")
-            else:
-                # 创建YouTube API客户端（无代理）
-                youtube = googleapiclient.discovery.build(
-                    api_service_name, api_version, developerKey=api_key
-                )
+        # 获取共享的YouTube客户端（进程内复用，长连接）
+        youtube = get_youtube_client(api_key)
         
         print(f"💬 正在获取视频 {video_id} 的评论...")
         
+        # 已知不存在或评论已关闭的视频直接跳过，不发出请求
+        negative_cache = get_negative_cache()
+        known_reason = negative_cache.get('video', video_id) if negative_cache else None
+        if known_reason == 'videoNotFound':
+            print("⏭️ 视频不存在（本地记录），跳过请求")
+            return None
+        if known_reason == 'commentsDisabled':
+            print("⏭️ 该视频的评论功能已被禁用（本地记录），跳过请求")
+            return {
+                'video_info': {'video_id': video_id, 'error': f'API错误: {known_reason}'},
+                'comments': [],
+                'total_comments_fetched': 0,
+                'fetch_timestamp': datetime.now().isoformat(),
+                'error': f'{known_reason}（本地记录，跳过请求）'
+            }
+        
         # 首先获取视频基本信息
-        video_request = youtube.videos().list(
-            part="snippet,statistics",
-            id=video_id
+        video_response = youtube.list(
+            'videos',
+            id=video_id,
+            **request_params('comments.videos')
         )
-        video_response = video_request.execute()
         
         if not video_response.get('items'):
             print("❌ 视频不存在或无法访问")
+            if negative_cache:
+                negative_cache.put('video', video_id, 'videoNotFound')
             return None
             
         video_info = video_response['items'][0]
         video_snippet = video_info.get('snippet', {})
         video_stats = video_info.get('statistics', {})
         
-        # 获取评论
-        comments_request = youtube.commentThreads().list(
-            part="snippet,replies",
-            videoId=video_id,
-            maxResults=min(max_comments, 100),  # YouTube API最大支持100条
-            order="relevance"  # 按相关性排序（通常包含点赞数）
-        )
+        # 视频信息
+        video_data = {
+            'video_id': video_id,
+            'title': video_snippet.get('title', ''),
+            'channel_title': video_snippet.get('channelTitle', ''),
+            'channel_id': video_snippet.get('channelId', ''),
+            'published_at': video_snippet.get('publishedAt', ''),
+            'description': video_snippet.get('description', '')[:500] + '...' if len(video_snippet.get('description', '')) > 500 else video_snippet.get('description', ''),
+            'view_count': int(video_stats.get('viewCount', 0)),
+            'like_count': int(video_stats.get('likeCount', 0)),
+            'comment_count': int(video_stats.get('commentCount', 0)),
+            'video_url': f'https://www.youtube.com/watch?v={video_id}'
+        }
         
-        comments_response = comments_request.execute()
+        # 增量同步：读取上次同步位置
+        store = get_comment_store() if incremental else None
+        watermark = store.watermark(video_id) if store is not None else None
+        if watermark:
+            print(f"🔖 增量同步，上次同步到评论 {watermark[0]} ({watermark[1]})")
+        newest = None
+        # 已交付的评论只记录点赞数最高的LIKE_REFRESH_TOP条（之后只刷新这些评论的点赞数）
+        delivered = TopK(LIKE_REFRESH_TOP, key=lambda comment: comment[1]) if store is not None else None
         
-        # 处理评论数据
+        # 获取评论：逐页获取，超过chunk_size条时分批流式输出（只保留top_k条时逐条进入堆）
         comments_data = []
-        for item in comments_response.get('items', []):
-            comment = item['snippet']['topLevelComment']['snippet']
-            
-            comment_data = {
-                'author_name': comment.get('authorDisplayName', ''),
-                'author_channel_url': comment.get('authorChannelUrl', ''),
-                'text': comment.get('textDisplay', ''),
-                'like_count': int(comment.get('likeCount', 0)),
-                'published_at': comment.get('publishedAt', ''),
-                'updated_at': comment.get('updatedAt', ''),
-                'reply_count': item['snippet'].get('totalReplyCount', 0)
-            }
-            comments_data.append(comment_data)
+        selector = TopK(top_k, key=lambda comment: comment['like_count']) if top_k else None
+        footer = {}
+        total_fetched = 0
+        batch_count = 0
+        interrupted = False
         
-        # 按点赞数排序
-        comments_data.sort(key=lambda x: x['like_count'], reverse=True)
+        def mark_delivered(comments):
+            """记录已交付（发送成功或写入文件）的评论"""
+            if delivered is not None:
+                delivered.extend((comment['comment_id'], comment['like_count']) for comment in comments)
         
-        # 限制返回数量
-        comments_data = comments_data[:max_comments]
+        def send_batch(batch_number, is_final):
+            """发送/写入当前一批评论"""
+            nonlocal writer, interrupted
+            if output_file:
+                if writer is None:
+                    writer = StreamingJsonWriter(output_file, {'video_info': video_data}, 'comments')
+                writer.write(comments_data)
+            if webhook_url:
+                batch_result = {
+                    'video_info': video_data,
+                    'comments': comments_data,
+                    'batch_info': {
+                        'batch_number': batch_number,
+                        'batch_size': len(comments_data),
+                        'is_final_batch': is_final
+                    },
+                    'total_comments_fetched': total_fetched,
+                    'fetch_timestamp': datetime.now().isoformat()
+                }
+                print(f"📤 发送第 {batch_number} 批评论到webhook ({len(comments_data)} 条)")
+                if not send_to_webhook(batch_result, webhook_url):
+                    print(f"❌ 第 {batch_number} 批评论发送失败")
+                    interrupted = True
+                    return
+            mark_delivered(comments_data)
         
-        # 构建完整结果
-        result = {
-            'video_info': {
-                'video_id': video_id,
-                'title': video_snippet.get('title', ''),
-                'channel_title': video_snippet.get('channelTitle', ''),
-                'channel_id': video_snippet.get('channelId', ''),
-                'published_at': video_snippet.get('publishedAt', ''),
-                'description': video_snippet.get('description', '')[:500] + '...' if len(video_snippet.get('description', '')) > 500 else video_snippet.get('description', ''),
-                'view_count': int(video_stats.get('viewCount', 0)),
-                'like_count': int(video_stats.get('likeCount', 0)),
-                'comment_count': int(video_stats.get('commentCount', 0)),
-                'video_url': f'https://www.youtube.com/watch?v={video_id}'
-            },
-            'comments': comments_data,
-            'total_comments_fetched': len(comments_data),
-            'fetch_timestamp': datetime.now().isoformat()
-        }
+        try:
+            try:
+                if watermark and max_comments is not None:
+                    # 有数量上限时从同步位置之后最早的新评论开始补齐，避免跳过未交付的评论
+                    comments_iter = oldest_new_comments(youtube, video_id, max_comments, watermark,
+                                                        include_replies=include_replies,
+                                                        reply_concurrency=reply_concurrency)
+                else:
+                    comments_iter = iter_video_comments(youtube, video_id, max_comments,
+                                                        order="time" if incremental else "relevance",
+                                                        include_replies=include_replies,
+                                                        reply_concurrency=reply_concurrency,
+                                                        until=watermark)
+                for comment_data in comments_iter:
+                    if newest is None:
+                        newest = (comment_data['comment_id'], comment_data['published_at'])
+                    total_fetched += 1
+                    if selector is not None:
+                        selector.push(comment_data)
+                        if total_fetched % chunk_size == 0:
+                            print(f"📈 已扫描 {total_fetched} 条评论")
+                        continue
+                    comments_data.append(comment_data)
+                    if len(comments_data) >= chunk_size:
+                        batch_count += 1
+                        send_batch(batch_count, False)
+                        comments_data = []
+                        print(f"📈 已获取 {total_fetched} 条评论")
+            except QuotaBudgetExceeded as e:
+                if not total_fetched:
+                    raise
+                print(f"⚠️ {e}，停止获取，保留已获取的评论")
+                interrupted = True
+            
+            if batch_count:
+                # 流式输出：发送剩余的评论（最后一批）
+                if comments_data:
+                    send_batch('final', True)
+                result = {
+                    'video_info': video_data,
+                    'comments': [],
+                    'total_comments_fetched': total_fetched,
+                    'streamed_batches': batch_count + (1 if comments_data else 0),
+                    'fetch_timestamp': datetime.now().isoformat(),
+                    'interrupted': interrupted
+                }
+                print(f"✅ 成功获取 {total_fetched} 条评论（分 {result['streamed_batches']} 批输出）")
+            else:
+                if selector is not None:
+                    # 堆中的评论已按点赞数从高到低排列
+                    comments_data = selector.items()
+                    footer['total_comments_scanned'] = total_fetched
+                else:
+                    # 按点赞数排序
+                    comments_data.sort(key=lambda x: x['like_count'], reverse=True)
+                
+                # 构建完整结果
+                result = {
+                    'video_info': video_data,
+                    'comments': comments_data,
+                    'total_comments_fetched': len(comments_data),
+                    **footer,
+                    'fetch_timestamp': datetime.now().isoformat()
+                }
+                
+                if selector is not None:
+                    print(f"✅ 从 {total_fetched} 条评论中选出点赞数最高的 {len(comments_data)} 条")
+                else:
+                    print(f"✅ 成功获取 {len(comments_data)} 条评论")
+                
+                # 如果提供了webhook URL，发送结果（增量同步没有新评论时不发送）
+                send_success = True
+                if webhook_url and (comments_data or not incremental):
+                    print(f"📤 正在发送结果到webhook...")
+                    send_success = send_to_webhook(result, webhook_url)
+                    if send_success:
+                        print("✅ 评论数据已成功发送到webhook")
+                    else:
+                        print("❌ 评论数据发送到webhook失败")
+                        interrupted = True
+                if output_file:
+                    writer = StreamingJsonWriter(output_file, {'video_info': video_data}, 'comments')
+                    writer.write(comments_data)
+                if send_success:
+                    mark_delivered(comments_data)
+        finally:
+            if writer is not None:
+                writer.close({
+                    'total_comments_fetched': len(comments_data) if selector is not None else total_fetched,
+                    **footer,
+                    'fetch_timestamp': datetime.now().isoformat()
+                })
         
-        print(f"✅ 成功获取 {len(comments_data)} 条评论")
+        if store is not None:
+            # 只有新评论全部交付后才推进同步位置，中断的同步下次从原位置重新获取
+            store.remember(video_id, delivered.items())
+            if newest and not interrupted:
+                store.set_watermark(video_id, *newest)
+                print(f"🔖 同步位置更新为评论 {newest[0]} ({newest[1]})")
+            elif interrupted:
+                print("⚠️ 同步未完成，保留原同步位置")
+            if not interrupted:
+                result['like_updates'] = sync_comment_likes(youtube, video_data, store, webhook_url)
         
-        # 如果提供了webhook URL，发送结果
-        if webhook_url:
-            print(f"📤 正在发送结果到webhook...")
-            send_success = send_to_webhook(result, webhook_url)
-            if send_success:
-                print("✅ 评论数据已成功发送到webhook")
-            else:
-                print("❌ 评论数据发送到webhook失败")
+        if output_file:
+            result['output_file'] = output_file
+        if print_summary:
+            print_cache_summary()
         
         return result
         
@@ -195,6 +482,11 @@ def get_video_comments(api_key, video_id, max_comments=50, webhook_url=None):
         error_details = json.loads(e.content.decode('utf-8'))
         error_reason = error_details.get('error', {}).get('errors', [{}])[0].get('reason', 'unknown')
         
+        # 记录确定会失败的视频，有效期内不再请求
+        negative_cache = get_negative_cache()
+        if negative_cache and negative_reason(e):
+            negative_cache.put('video', video_id, negative_reason(e))
+        
         if error_reason == 'commentsDisabled':
             print("❌ 该视频的评论功能已被禁用")
         elif error_reason == 'videoNotFound':
@@ -202,7 +494,7 @@ def get_video_comments(api_key, video_id, max_comments=50, webhook_url=None):
         else:
             print(f"❌ 获取评论时发生API错误: {e}")
         
-        return {
+        result = {
             'video_info': {'video_id': video_id, 'error': f'API错误: {error_reason}'},
             'comments': [],
             'total_comments_fetched': 0,
@@ -212,116 +504,358 @@ def get_video_comments(api_key, video_id, max_comments=50, webhook_url=None):
         
     except Exception as e:
         print(f"❌ 获取评论时发生错误: {e}")
-        return {
+        result = {
             'video_info': {'video_id': video_id, 'error': str(e)},
             'comments': [],
             'total_comments_fetched': 0,
             'fetch_timestamp': datetime.now().isoformat(),
             'error': str(e)
         }
+    
+    if writer is not None:
+        # 出错前已获取的评论已写入结果文件（文件已正常结尾），调用方不应覆盖
+        result['output_file'] = output_file
+    return result
+
+def sync_comment_likes(youtube, video_data, store, webhook_url=None):
+    """增量同步的低优先级步骤：刷新已知热门评论的点赞数，有变化时发送到webhook，失败时跳过"""
+    try:
+        like_updates = refresh_comment_likes(youtube, video_data['video_id'], store)
+    except (googleapiclient.errors.HttpError, QuotaBudgetExceeded) as e:
+        print(f"⚠️ 刷新评论点赞数失败，跳过: {e}")
+        return []
+    if like_updates and webhook_url:
+        print(f"📤 发送 {len(like_updates)} 条评论的点赞数变化到webhook")
+        if not send_to_webhook({
+            'video_info': video_data,
+            'like_updates': like_updates,
+            'fetch_timestamp': datetime.now().isoformat()
+        }, webhook_url):
+            print("❌ 点赞数变化发送失败")
+    return like_updates
+
+def parse_video_id(value):
+    """从视频ID或视频链接（watch?v=、youtu.be/、shorts/）中提取视频ID"""
+    value = value.strip()
+    if '://' not in value:
+        return value
+    parsed = urlparse(value)
+    if 'v' in parse_qs(parsed.query):
+        return parse_qs(parsed.query)['v'][0]
+    segments = [segment for segment in parsed.path.split('/') if segment]
+    return segments[-1] if segments else value
+
+def search_top_video_ids(youtube, search_query, count, published_after=None, published_before=None):
+    """搜索按观看数排序的前count个视频ID（每页最多50个，每页消耗100单位配额）"""
+    video_ids = []
+    page_token = None
+    while len(video_ids) < count:
+        response = youtube.list('search', **build_search_params(
+            search_query, min(50, count - len(video_ids)), page_token, published_after, published_before
+        ))
+        video_ids.extend(item['id']['videoId'] for item in response.get('items', []) if item.get('id', {}).get('videoId'))
+        page_token = response.get('nextPageToken')
+        if not page_token or not response.get('items'):
+            break
+    return list(dict.fromkeys(video_ids))[:count]
 
-def get_channel_videos(api_key, handle, max_results=50, webhook_url=None, batch_size=100):
-    """获取指定频道的所有视频信息（通过handle）"""
+def summarize_comments_result(video_id, result):
+    """多视频评论模式中单个视频的结果摘要（不包含评论内容）"""
+    if not result:
+        return {'video_id': video_id, 'total_comments_fetched': 0, 'error': '视频不存在或无法访问'}
+    summary = {
+        'video_id': video_id,
+        'title': result.get('video_info', {}).get('title', ''),
+        'total_comments_fetched': result.get('total_comments_fetched', 0)
+    }
+    for key in ('error', 'output_file'):
+        if result.get(key):
+            summary[key] = result[key]
+    if result.get('like_updates'):
+        summary['like_updates'] = len(result['like_updates'])
+    return summary
+
+async def collect_video_comments(api_key, video_ids, max_comments=50, webhook_url=None, concurrency=None,
+                                 include_replies=False, output_dir=None, incremental=False):
+    """并发获取多个视频的评论
     
-    # API配置
-    api_service_name = "youtube"
-    api_version = "v3"
+    最多concurrency个视频同时进行（各自在线程中执行get_video_comments），API请求共用同一个限速器和配额账本。
+    每个视频完成后立即发送到webhook（或写入output_dir下的结果文件），这里只保留每个视频的摘要。
     
-    try:
-        # 检查是否在GitHub Actions环境中运行
-        is_github_actions = os.getenv('GITHUB_ACTIONS') == 'true'
-        
-        if is_github_actions:
-            # GitHub Actions环境，直接创建客户端（无需代理）
-            youtube = googleapiclient.discovery.build(
-                api_service_name, api_version, developerKey=api_key
+    Returns:
+        按完成顺序排列的视频摘要列表
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency or COMMENT_CONCURRENCY))
+    
+    async def run(video_id):
+        async with semaphore:
+            output_file = None
+            if output_dir:
+                output_file = os.path.join(output_dir, f"youtube_comments_{video_id}_{int(time.time())}.json")
+            result = await asyncio.to_thread(
+                get_video_comments, api_key, video_id, max_comments, webhook_url,
+                output_file=output_file, include_replies=include_replies, incremental=incremental,
+                print_summary=False
             )
-            print("🚀 GitHub Actions环境，直接连接YouTube API")
+            return summarize_comments_result(video_id, result)
+    
+    summaries = []
+    for finished in asyncio.as_completed([run(video_id) for video_id in video_ids]):
+        summary = await finished
+        summaries.append(summary)
+        status = f"❌ {summary['error']}" if summary.get('error') else f"✅ {summary['total_comments_fetched']} 条评论"
+        print(f"📦 [{len(summaries)}/{len(video_ids)}] 视频 {summary['video_id']}: {status}")
+    return summaries
+
+def get_comments_for_videos(api_key, video_ids, max_comments=50, webhook_url=None, concurrency=None,
+                            include_replies=False, output_dir=None, incremental=False):
+    """多视频评论模式：collect_video_comments的同步入口
+    
+    Returns:
+        {'videos': 各视频摘要, 'total_videos', 'succeeded', 'failed', 'total_comments_fetched', 'fetch_timestamp'}
+    """
+    video_ids = list(dict.fromkeys(video_ids))
+    print(f"💬 多视频评论: {len(video_ids)} 个视频，并发 {concurrency or COMMENT_CONCURRENCY}")
+    summaries = asyncio.run(collect_video_comments(
+        api_key, video_ids, max_comments, webhook_url, concurrency, include_replies, output_dir, incremental
+    )) if video_ids else []
+    failed = sum(1 for summary in summaries if summary.get('error'))
+    print_cache_summary()
+    return {
+        'videos': summaries,
+        'total_videos': len(summaries),
+        'succeeded': len(summaries) - failed,
+        'failed': failed,
+        'total_comments_fetched': sum(summary['total_comments_fetched'] for summary in summaries),
+        'fetch_timestamp': datetime.now().isoformat()
+    }
+
+def parse_channel_handle(handle):
+    """解析频道标识，支持 @handle、handle、https://www.youtube.com/@handle 和 https://www.youtube.com/channel/<频道ID>
+    
+    Returns:
+        ('forHandle', '@handle') 或 ('id', 频道ID)
+    """
+    value = handle.strip()
+    if '://' in value or value.startswith(('www.youtube.com/', 'youtube.com/', 'm.youtube.com/')):
+        segments = [segment for segment in urlparse(value if '://' in value else 'https://' + value).path.split('/') if segment]
+        if len(segments) >= 2 and segments[0] == 'channel':
+            return 'id', segments[1]
+        if segments and segments[0].startswith('@'):
+            return 'forHandle', segments[0]
+        raise ValueError(f"无法识别的频道链接: {handle}")
+    if value.startswith('@'):
+        return 'forHandle', value
+    # 兼容旧格式：直接添加@前缀
+    return 'forHandle', '@' + value
+
+def resolve_channel(youtube, handle, refresh=False):
+    """把handle或频道链接解析为 (频道ID, 上传播放列表ID)，优先使用本地保存的解析结果
+    
+    本地没有时用channels().list(forHandle/id)查询，查询到的频道信息同时存入频道信息存储；
+    查询不到的handle记入失败结果缓存，有效期内不再请求。
+    refresh=True时忽略本地结果和响应缓存重新查询（本地结果失效时使用）。
+    
+    Returns:
+        (频道ID, 上传播放列表ID)，频道不存在时返回None
+    """
+    kind, value = parse_channel_handle(handle)
+    # handle不区分大小写，频道ID区分
+    key = value.lower() if kind == 'forHandle' else value
+    store = get_channel_store()
+    negative_cache = get_negative_cache()
+    if not refresh:
+        if store is not None:
+            resolved = store.resolve(key)
+            if resolved:
+                print(f"💾 使用本地解析结果: {value} -> {resolved[0]}")
+                return resolved
+        if negative_cache and negative_cache.get('channel', key):
+            print(f"⏭️ 频道 {value} 不存在（本地记录），跳过请求")
+            return None
+    
+    print(f"🔍 解析频道: {handle} -> {value}")
+    params = {kind: value, **request_params('channel.channels')}
+    response = youtube.fetch('channels', **params) if refresh else youtube.list('channels', **params)
+    items = response.get('items', [])
+    if not items:
+        if store is not None:
+            store.forget(key)
+        if negative_cache:
+            negative_cache.put('channel', key, 'channelNotFound')
+        return None
+    
+    channel = items[0]
+    uploads_playlist_id = channel.get('contentDetails', {}).get('relatedPlaylists', {}).get('uploads')
+    if negative_cache:
+        negative_cache.clear('channel', key)
+    if store is not None:
+        store.save(items, part_masks('channel.channels'))
+        if uploads_playlist_id:
+            store.remember(key, channel['id'], uploads_playlist_id)
+    return channel['id'], uploads_playlist_id
+
+def load_channel(youtube, channel_id):
+    """获取频道资源（channel.channels字段配置），优先使用本地频道信息存储，只请求已过期的part
+    
+    Returns:
+        频道资源字典，频道不存在时返回None
+    """
+    store = get_channel_store()
+    groups = part_masks('channel.channels')
+    channel = {'id': channel_id}
+    stale_parts = list(groups)
+    if store is not None:
+        channels, stale = store.lookup([channel_id], groups)
+        channel = channels.get(channel_id, channel)
+        stale_parts = [part for part in groups if part in stale.get(channel_id, ())]
+    
+    if stale_parts:
+        response = youtube.list('channels', id=channel_id, **request_params('channel.channels', parts=stale_parts))
+        items = response.get('items', [])
+        if not items:
+            return None
+        if store is not None:
+            store.save(items, {part: groups[part] for part in stale_parts})
+        channel.update({part: items[0].get(part, {}) for part in stale_parts})
+    return channel
+
+def parse_time_bound(value, end_of_day=False):
+    """把 YYYY-MM-DD 或 YYYY-MM-DDTHH:MM:SSZ 解析为UTC时间，只有日期时取当天开始（end_of_day=True时取当天结束）"""
+    if len(value) == 10:  # YYYY-MM-DD格式
+        value += "T23:59:59Z" if end_of_day else "T00:00:00Z"
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def reached_watermark(item, watermark):
+    """播放列表条目是否已到达上次同步位置（同一视频，或发布时间不晚于同步位置）"""
+    details = item.get('contentDetails', {})
+    video_id, published_at = watermark
+    if details.get('videoId') == video_id:
+        return True
+    item_published_at = details.get('videoPublishedAt', '')
+    return bool(published_at and item_published_at and item_published_at <= published_at)
+
+def in_publish_window(item, after, before):
+    """播放列表条目相对发布时间范围的位置：'newer'（晚于before）、'older'（早于after）或'in'"""
+    published_at = item.get('contentDetails', {}).get('videoPublishedAt', '')
+    published_at_dt = parse_time_bound(published_at) if published_at else None
+    if published_at_dt and before and published_at_dt > before:
+        return 'newer'
+    if published_at_dt and after and published_at_dt < after:
+        return 'older'
+    return 'in'
+
+def scan_new_uploads(youtube, uploads_playlist_id, watermark, max_results, after=None, before=None):
+    """增量同步的预扫描：只翻上传播放列表（每页1单位配额，不获取详情）直到上次同步位置
+    
+    新视频多于max_results时只保留最早上传的max_results个，下次同步从它们之后继续，
+    新视频不会因为数量上限被跳过。
+    
+    Returns:
+        按发布时间倒序的新视频条目列表；未能扫描到同步位置时（配额不足）返回None
+    """
+    new_items = []
+    page_token = None
+    while True:
+        try:
+            response = youtube.list(
+                'playlistItems',
+                playlistId=uploads_playlist_id,
+                maxResults=50,
+                pageToken=page_token,
+                **request_params('channel.playlistItems')
+            )
+        except QuotaBudgetExceeded as e:
+            print(f"⚠️ {e}，无法扫描到上次同步位置")
+            return None
+        for item in response.get('items', []):
+            if not item.get('contentDetails', {}).get('videoId'):
+                continue
+            position = in_publish_window(item, after, before)
+            if reached_watermark(item, watermark) or position == 'older':
+                page_token = None
+                break
+            if position == 'in':
+                new_items.append(item)
         else:
-            # 本地环境，检查是否需要使用代理
-            http_proxy = os.getenv('HTTP_PROXY')
-            https_proxy = os.getenv('HTTPS_PROXY')
-            socks_proxy = os.getenv('SOCKS_PROXY')
-            
-            proxy_url = socks_proxy or https_proxy or http_proxy
-            
-            if proxy_url:
-                # 使用代理创建HTTP客户端
-                import httplib2
-                import socks
-                
-                if socks_proxy:
-                    # SOCKS代理
-                    proxy_parts = socks_proxy.replace('socks5://', '').replace('socks4://', '').split(':')
-                    proxy_host = proxy_parts[0]
-                    proxy_port = int(proxy_parts[1]) if len(proxy_parts) > 1 else 1080
-                    proxy_type = socks.PROXY_TYPE_SOCKS5 if 'socks5' in socks_proxy else socks.PROXY_TYPE_SOCKS4
-                    
-                    http = httplib2.Http(proxy_info=httplib2.ProxyInfo(
-                        proxy_type=proxy_type,
-                        proxy_host=proxy_host,
-                        proxy_port=proxy_port
-                    ))
-                else:
-                    # HTTP/HTTPS代理
-                    proxy_parts = proxy_url.replace('http://', '').replace('https://', '').split(':')
-                    proxy_host = proxy_parts[0]
-                    proxy_port = int(proxy_parts[1]) if len(proxy_parts) > 1 else 8080
-                    
-                    http = httplib2.Http(proxy_info=httplib2.ProxyInfo(
-                        proxy_type=httplib2.socks.PROXY_TYPE_HTTP,
-                        proxy_host=proxy_host,
-                        proxy_port=proxy_port
-                    ))
-                
-                youtube = googleapiclient.discovery.build(
-                    api_service_name, api_version, developerKey=api_key, http=http
-                )
-                print(f"🌐 使用代理: {proxy_url}")
-            else:
-                # 创建YouTube API客户端（无代理）
-                youtube = googleapiclient.discovery.build(
-                    api_service_name, api_version, developerKey=api_key
-                )
+            page_token = response.get('nextPageToken')
+        if not page_token or not response.get('items'):
+            break
+    if len(new_items) > max_results:
+        print(f"🔖 有 {len(new_items)} 个新视频，本次交付最早的 {max_results} 个，其余下次同步")
+        new_items = new_items[-max_results:]
+    return new_items
+
+def get_channel_videos(api_key, handle, max_results=50, webhook_url=None, batch_size=100, incremental=False,
+                       published_after=None, published_before=None):
+    """获取指定频道的所有视频信息（通过handle）
+    
+    published_after/published_before（格式: YYYY-MM-DD 或 YYYY-MM-DDTHH:MM:SSZ）限定发布时间范围，
+    在获取视频详情前按播放列表条目的videoPublishedAt筛选；上传播放列表按发布时间倒序，
+    遇到早于published_after的视频即停止翻页。
+    
+    incremental=True时按频道保存的同步位置增量获取：上传播放列表按发布时间倒序，
+    遇到上次已交付的最新视频即停止翻页，只输出之后新上传的视频。本次完整交付后更新同步位置。
+    新视频多于max_results时先扫描到同步位置（见scan_new_uploads），交付最早的max_results个，
+    同步位置只前进到已交付的视频；没有到达同步位置或播放列表末尾时不更新同步位置。
+    """
+    
+    try:
+        # 获取共享的YouTube客户端（进程内复用，长连接）
+        youtube = get_youtube_client(api_key)
         
         print(f"📺 正在获取频道 {handle} 的视频信息...")
         
-        # 处理handle格式：支持YouTube链接和直接handle
-        if handle.startswith('https://www.youtube.com/@'):
-            # 从YouTube链接中提取handle
-            processed_handle = handle.replace('https://www.youtube.com/', '')
-            print(f"🔗 从链接提取handle: {handle} -> {processed_handle}")
-        elif handle.startswith('@'):
-            # 直接使用@handle格式
-            processed_handle = handle
-            print(f"🔍 使用handle: {processed_handle}")
-        else:
-            # 兼容旧格式：直接添加@前缀
-            processed_handle = '@' + handle
-            print(f"🔧 添加@前缀: {handle} -> {processed_handle}")
-        
-        # 直接通过forHandle参数获取频道信息
-        channel_request = youtube.channels().list(
-            part="snippet,statistics,contentDetails",
-            forHandle=processed_handle
-        )
-        channel_response = channel_request.execute()
+        # 解析频道ID和上传播放列表ID（优先使用本地解析结果，不再每次请求forHandle）
+        resolved = resolve_channel(youtube, handle)
+        channel_info = load_channel(youtube, resolved[0]) if resolved else None
+        if resolved and channel_info is None:
+            # 本地解析结果指向的频道已不存在，重新解析
+            resolved = resolve_channel(youtube, handle, refresh=True)
+            channel_info = load_channel(youtube, resolved[0]) if resolved else None
         
-        if not channel_response.get('items'):
+        if channel_info is None:
             print("❌ 频道不存在或无法访问")
             return None
             
-        channel_info = channel_response['items'][0]
         channel_snippet = channel_info.get('snippet', {})
         channel_stats = channel_info.get('statistics', {})
         
         # 获取频道的上传播放列表ID
-        uploads_playlist_id = channel_info.get('contentDetails', {}).get('relatedPlaylists', {}).get('uploads')
+        uploads_playlist_id = resolved[1]
         
         if not uploads_playlist_id:
             print("❌ 无法获取频道的上传播放列表")
             return None
         
+        # 增量同步：读取上次的同步位置
+        store = get_channel_store()
+        watermark = store.watermark(channel_info['id']) if incremental and store is not None else None
+        if watermark:
+            print(f"🔖 增量同步，上次同步到视频 {watermark[0]} ({watermark[1]})")
+        newest = None  # 本次看到的最新视频 (视频ID, 发布时间)
+        at_watermark = False
+        last_page = False  # 已翻到播放列表末尾
+        
+        # 有同步位置时先扫描新视频，数量超过上限时只取最早的部分，下面按扫描结果分页处理
+        after = parse_time_bound(published_after) if published_after else None
+        before = parse_time_bound(published_before, end_of_day=True) if published_before else None
+        backlog = None
+        if watermark:
+            try:
+                backlog = scan_new_uploads(youtube, uploads_playlist_id, watermark, max_results, after, before)
+            except googleapiclient.errors.HttpError as e:
+                # 上传播放列表不存在时交给下面的分页处理（重新解析频道）
+                if 'playlistNotFound' not in http_error_reasons(e):
+                    raise
+        
+        # 发布时间范围
+        if after or before:
+            print(f"📅 发布时间范围: {published_after or '不限'} ~ {published_before or '不限'}")
+        past_window = False  # 已翻到早于时间范围的视频
+        interrupted = False  # 配额不足或webhook发送失败，本次未完整交付
+        
         # 获取播放列表中的视频
         all_videos = []
         next_page_token = None
@@ -337,34 +871,90 @@ def get_channel_videos(api_key, handle, max_results=50, webhook_url=None, batch_
             
             print(f"📄 正在获取第 {page_count} 页，本页目标: {current_max_results} 条")
             
-            playlist_request = youtube.playlistItems().list(
-                part="snippet,contentDetails",
-                playlistId=uploads_playlist_id,
-                maxResults=current_max_results,
-                pageToken=next_page_token
-            )
-            
-            playlist_response = playlist_request.execute()
+            if backlog is not None:
+                # 预扫描的新视频（已到达同步位置），不再请求播放列表
+                playlist_response = {'items': backlog[:current_max_results]}
+                backlog = backlog[current_max_results:]
+                if backlog:
+                    playlist_response['nextPageToken'] = 'backlog'
+                else:
+                    at_watermark = True
+            else:
+                try:
+                    playlist_response = youtube.list(
+                        'playlistItems',
+                        playlistId=uploads_playlist_id,
+                        maxResults=current_max_results,
+                        pageToken=next_page_token,
+                        **request_params('channel.playlistItems')
+                    )
+                except QuotaBudgetExceeded as e:
+                    print(f"⚠️ {e}，停止获取，保留已获取的视频")
+                    interrupted = True
+                    break
+                except googleapiclient.errors.HttpError as e:
+                    # 上传播放列表不存在：本地解析结果已失效，重新解析后从第一页开始
+                    if page_count != 1 or 'playlistNotFound' not in http_error_reasons(e):
+                        raise
+                    print("⚠️ 上传播放列表不存在，重新解析频道")
+                    resolved = resolve_channel(youtube, handle, refresh=True)
+                    if not resolved or not resolved[1] or resolved[1] == uploads_playlist_id:
+                        raise
+                    channel_info = load_channel(youtube, resolved[0]) or channel_info
+                    channel_snippet = channel_info.get('snippet', {})
+                    channel_stats = channel_info.get('statistics', {})
+                    uploads_playlist_id = resolved[1]
+                    page_count = 0
+                    continue
+            last_page = not playlist_response.get('nextPageToken')
             
-            # 收集视频ID
+            # 收集视频ID（增量同步时到达同步位置即停止），按发布时间范围筛选后再获取详情
             video_ids = []
             for item in playlist_response.get('items', []):
                 video_id = item.get('contentDetails', {}).get('videoId')
-                if video_id:
-                    video_ids.append(video_id)
+                if not video_id:
+                    continue
+                if watermark and reached_watermark(item, watermark):
+                    at_watermark = True
+                    break
+                published_at_str = item['contentDetails'].get('videoPublishedAt', '')
+                published_at_dt = parse_time_bound(published_at_str) if published_at_str else None
+                if published_at_dt and before and published_at_dt > before:
+                    continue
+                if published_at_dt and after and published_at_dt < after:
+                    past_window = True
+                    break
+                if newest is None:
+                    newest = (video_id, published_at_str)
+                video_ids.append(video_id)
             
             if not video_ids:
-                print(f"⚠️ 第 {page_count} 页没有找到视频，停止获取")
+                if at_watermark:
+                    print(f"🔖 第 {page_count} 页已到达上次同步位置，没有新视频")
+                elif past_window:
+                    print(f"📅 第 {page_count} 页已早于 {published_after}，停止获取")
+                elif playlist_response.get('items') and playlist_response.get('nextPageToken'):
+                    # 本页视频都晚于published_before，继续翻页
+                    print(f"📅 第 {page_count} 页的视频都晚于 {published_before}，继续获取")
+                    next_page_token = playlist_response['nextPageToken']
+                    continue
+                else:
+                    print(f"⚠️ 第 {page_count} 页没有找到视频，停止获取")
                 break
             
             print(f"✅ 第 {page_count} 页获取到 {len(video_ids)} 个视频ID")
             
             # 获取视频详细信息
-            videos_request = youtube.videos().list(
-                part="snippet,statistics,contentDetails,status,recordingDetails,topicDetails",
-                id=','.join(video_ids)
-            )
-            videos_response = videos_request.execute()
+            try:
+                videos_response = youtube.list(
+                    'videos',
+                    id=','.join(video_ids),
+                    **request_params('channel.videos')
+                )
+            except QuotaBudgetExceeded as e:
+                print(f"⚠️ {e}，停止获取，保留已获取的视频")
+                interrupted = True
+                break
             
             # 处理视频数据
             for video in videos_response.get('items', []):
@@ -375,14 +965,6 @@ def get_channel_videos(api_key, handle, max_results=50, webhook_url=None, batch_
                 video_recording = video.get('recordingDetails', {})
                 video_topics = video.get('topicDetails', {})
 
-                # 检查发布日期是否晚于2023年12月31日
-                published_at_str = video_snippet.get('publishedAt', '')
-                if published_at_str:
-                    published_at_dt = datetime.fromisoformat(published_at_str.replace('Z', '+00:00'))
-                    if published_at_dt <= datetime(2023, 12, 31, 23, 59, 59, tzinfo=timezone.utc):
-                        print(f"⚠️ 视频 '{video_snippet.get('title', '')}' 发布于 {published_at_str}，早于2024年，跳过。")
-                        continue
-
                 video_data = {
                     'video_id': video.get('id', ''),
                     'title': video_snippet.get('title', ''),
@@ -470,15 +1052,21 @@ def get_channel_videos(api_key, handle, max_results=50, webhook_url=None, batch_
                         print(f"✅ 第 {batch_num + 1} 批webhook发送成功")
                     else:
                         print(f"❌ 第 {batch_num + 1} 批webhook发送失败")
-                    
-                    # 短暂延迟避免webhook服务器压力
-                    time.sleep(1)
+                        interrupted = True
                 
                 # 移除已发送的视频，保留未发送的部分
                 remaining_videos = all_videos[batches_to_send * batch_size:]
                 all_videos = remaining_videos
                 print(f"📊 已发送 {batches_to_send} 批数据，剩余 {len(all_videos)} 个视频待处理")
             
+            if at_watermark:
+                print(f"🔖 已到达上次同步位置，停止获取")
+                break
+            
+            if past_window:
+                print(f"📅 已到达早于 {published_after} 的视频，停止获取")
+                break
+            
             if not next_page_token:
                 print(f"📄 已到达最后一页，总共获取了 {total_fetched} 个视频")
                 break
@@ -527,6 +1115,7 @@ def get_channel_videos(api_key, handle, max_results=50, webhook_url=None, batch_
         }
         
         print(f"✅ 成功获取频道 {channel_snippet.get('title', handle)} 的 {len(all_videos)} 个视频")
+        print_cache_summary()
         
         # 发送剩余的视频到webhook（最后一批）
         if webhook_url and all_videos:
@@ -563,6 +1152,19 @@ def get_channel_videos(api_key, handle, max_results=50, webhook_url=None, batch_
                 print("✅ 最后一批webhook发送成功")
             else:
                 print("❌ 最后一批webhook发送失败")
+                interrupted = True
+        
+        # 增量同步：因数量上限停止、没有到达同步位置时，同步位置不能前进（否则中间的视频会被跳过）
+        if watermark and not (at_watermark or past_window or last_page):
+            print(f"⚠️ 达到数量上限 {max_results} 时未到达上次同步位置")
+            interrupted = True
+        
+        # 增量同步：完整交付后更新同步位置
+        if incremental and store is not None and newest and not interrupted:
+            store.set_watermark(actual_channel_id, *newest)
+            print(f"🔖 同步位置更新为视频 {newest[0]} ({newest[1]})")
+        elif incremental and interrupted:
+            print("⚠️ 本次未完整交付，保留原同步位置")
         
         # 构建完整结果用于返回（不包含batch_info）
         result = {
@@ -582,7 +1184,8 @@ def get_channel_videos(api_key, handle, max_results=50, webhook_url=None, batch_
             },
             'videos': all_videos,
             'total_videos_fetched': len(all_videos),
-            'fetch_timestamp': datetime.now().isoformat()
+            'fetch_timestamp': datetime.now().isoformat(),
+            'interrupted': interrupted  # 配额不足或webhook发送失败，未完整交付
         }
         
         return result
@@ -608,9 +1211,567 @@ def get_channel_videos(api_key, handle, max_results=50, webhook_url=None, batch_
             'error': str(e)
         }
 
-def search_youtube_videos(api_key, search_query, max_results=25, webhook_url=None, published_after=None, published_before=None):
+def parse_watchlist(value):
+    """解析列表参数（关注频道、视频ID等）：逗号或换行分隔，或每行一个的文件路径（#开头的行为注释）"""
+    if value and os.path.isfile(value):
+        with open(value, encoding='utf-8') as f:
+            value = f.read()
+    entries = [entry.strip() for line in (value or '').splitlines() for entry in line.split(',')]
+    return list(dict.fromkeys(entry for entry in entries if entry and not entry.startswith('#')))
+
+def detect_changed_channels(youtube, channel_ids, concurrency=None, use_batch=None):
+    """抓取前的变化检测
+    
+    每50个频道合并为一个channels().list(part=statistics,contentDetails)请求（每个1单位配额），
+    与上次抓取时保存的视频数和上传播放列表比较。
+    
+    Returns:
+        ({有变化或首次检测的频道ID: (视频数, 上传播放列表ID)}, 请求次数)
+    """
+    requests_list = [
+        ('channels', {'id': ','.join(batch_ids), **request_params('watch.channels')})
+        for batch_ids in chunk_list(list(channel_ids))
+    ]
+    current = {}
+    for response in run_requests(youtube, requests_list, concurrency, use_batch):
+        for item in response.get('items', []):
+            current[item['id']] = (
+                int(item.get('statistics', {}).get('videoCount', 0)),
+                item.get('contentDetails', {}).get('relatedPlaylists', {}).get('uploads', '')
+            )
+    
+    missing = [channel_id for channel_id in channel_ids if channel_id not in current]
+    if missing:
+        print(f"⚠️ {len(missing)} 个频道未返回数据，跳过: {', '.join(missing[:5])}")
+    
+    store = get_channel_store()
+    previous = store.snapshots(current) if store is not None else {}
+    changed = {channel_id: state for channel_id, state in current.items() if previous.get(channel_id) != state}
+    return changed, len(requests_list)
+
+def watch_channels(api_key, handles, max_results=50, webhook_url=None, batch_size=100, incremental=False,
+                   published_after=None, published_before=None, concurrency=None, use_batch=None):
+    """关注列表模式：先批量检测频道变化，只对有变化的频道执行get_channel_videos
+    
+    频道完整抓取后保存本次的视频数和上传播放列表，作为下次检测的基准。
+    
+    Returns:
+        {'checked': 检测的频道数, 'changed': 有变化的频道数, 'check_requests': 变化检测请求次数,
+         'results': {handle: get_channel_videos的结果}}
+    """
+    youtube = get_youtube_client(api_key)
+    print(f"👀 关注列表: {len(handles)} 个频道")
+    
+    # handle解析为频道ID（优先使用本地解析结果）
+    handle_by_id = {}
+    for handle in handles:
+        try:
+            resolved = resolve_channel(youtube, handle)
+        except ValueError as e:
+            print(f"⚠️ {e}，跳过")
+            continue
+        if resolved:
+            handle_by_id.setdefault(resolved[0], handle)
+        else:
+            print(f"⚠️ 频道 {handle} 不存在或无法访问，跳过")
+    
+    changed, check_requests = detect_changed_channels(youtube, list(handle_by_id), concurrency, use_batch)
+    print(f"🔎 变化检测: {len(handle_by_id)} 个频道，{check_requests} 个请求，{len(changed)} 个频道有变化")
+    
+    store = get_channel_store()
+    results = {}
+    for index, (channel_id, (video_count, uploads_playlist_id)) in enumerate(changed.items(), 1):
+        handle = handle_by_id[channel_id]
+        print(f"\n📺 [{index}/{len(changed)}] 抓取有变化的频道 {handle}")
+        result = get_channel_videos(
+            api_key, handle, max_results, webhook_url, batch_size,
+            incremental=incremental, published_after=published_after, published_before=published_before
+        )
+        results[handle] = result
+        if store is not None and result and not result.get('error') and not result.get('interrupted'):
+            store.save_snapshot(channel_id, video_count, uploads_playlist_id)
+    
+    return {
+        'checked': len(handle_by_id),
+        'changed': len(changed),
+        'check_requests': check_requests,
+        'results': results,
+        'fetch_timestamp': datetime.now().isoformat()
+    }
+
+def chunk_list(items, size=50):
+    """按固定大小切分列表（YouTube API单次最多50个ID）"""
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+def build_channel_info(channel):
+    """将channels().list返回的频道资源转换为频道信息字典"""
+    channel_id = channel.get('id')
+    channel_snippet = channel.get('snippet', {})
+    channel_stats = channel.get('statistics', {})
+    channel_branding = channel.get('brandingSettings', {})
+    channel_status = channel.get('status', {})
+    channel_topics = channel.get('topicDetails', {})
+    
+    return {
+        'channel_id': channel_id,
+        'title': channel_snippet.get('title', ''),
+        'description': channel_snippet.get('description', ''),
+        'custom_url': channel_snippet.get('customUrl', ''),
+        'published_at': channel_snippet.get('publishedAt', ''),
+        'country': channel_snippet.get('country', ''),
+        'default_language': channel_snippet.get('defaultLanguage', ''),
+        'localized_title': channel_snippet.get('localized', {}).get('title', ''),
+        'localized_description': channel_snippet.get('localized', {}).get('description', ''),
+        'thumbnail_url': channel_snippet.get('thumbnails', {}).get('high', {}).get('url', ''),
+        'subscriber_count': int(channel_stats.get('subscriberCount', 0)),
+        'video_count': int(channel_stats.get('videoCount', 0)),
+        'view_count': int(channel_stats.get('viewCount', 0)),
+        'subscriber_count_hidden': channel_stats.get('hiddenSubscriberCount', False),
+        'privacy_status': channel_status.get('privacyStatus', ''),
+        'is_linked': channel_status.get('isLinked', False),
+        'long_uploads_status': channel_status.get('longUploadsStatus', ''),
+        'made_for_kids': channel_status.get('madeForKids', False),
+        'self_declared_made_for_kids': channel_status.get('selfDeclaredMadeForKids', False),
+        'topic_ids': channel_topics.get('topicIds', []),
+        'topic_categories': channel_topics.get('topicCategories', []),
+        'keywords': channel_branding.get('channel', {}).get('keywords', ''),
+        'channel_url': f"https://www.youtube.com/channel/{channel_id}"
+    }
+
+def video_detail_requests(video_ids):
+    """为每50个视频ID生成一个videos().list请求 (resource, params)"""
+    return [
+        ('videos', {'id': ','.join(batch_ids), **request_params('search.videos')})
+        for batch_ids in chunk_list(video_ids)
+    ]
+
+def channel_detail_requests(channel_ids, parts=None):
+    """为每50个频道ID生成一个channels().list请求 (resource, params)，parts限定只请求部分part"""
+    return [
+        ('channels', {'id': ','.join(batch_ids), **request_params('search.channels', parts=parts)})
+        for batch_ids in chunk_list(list(channel_ids))
+    ]
+
+def collect_channel_info(responses):
+    """将channels().list响应转换为 {频道ID: 频道信息字典}"""
+    channel_info_dict = {}
+    for response in responses:
+        for channel in response.get('items', []):
+            if channel.get('id'):
+                channel_info_dict[channel['id']] = build_channel_info(channel)
+    return channel_info_dict
+
+async def hydrate_channels(youtube, channel_ids, concurrency=None, use_batch=None):
+    """获取频道信息，优先使用本地频道信息存储
+    
+    只有本地没有或已过期的字段组才请求channels().list，按需要刷新的part分组，
+    每组每50个ID一个请求，所有请求并发发出（或合并为一个批量请求）。
+    
+    Returns:
+        ({频道ID: 频道信息字典}, 请求次数)
+    """
+    store = get_channel_store()
+    if store is None:
+        requests_list = channel_detail_requests(channel_ids)
+        return collect_channel_info(
+            await execute_requests(youtube, requests_list, concurrency, use_batch)
+        ), len(requests_list)
+    
+    groups = part_masks('search.channels')
+    channels, stale = store.lookup(channel_ids, groups)
+    
+    # 按需要刷新的part分组，相同组合的频道合并请求
+    ids_by_parts = {}
+    for channel_id, parts in stale.items():
+        ids_by_parts.setdefault(tuple(part for part in groups if part in parts), []).append(channel_id)
+    requests_list = []
+    for parts, ids in ids_by_parts.items():
+        requests_list.extend(channel_detail_requests(ids, parts))
+    
+    print(f"📺 频道信息: 本地 {len(channel_ids) - len(stale)} 个，需请求 {len(stale)} 个 ({len(requests_list)} 个请求)")
+    responses = await execute_requests(youtube, requests_list, concurrency, use_batch)
+    for (_, params), response in zip(requests_list, responses):
+        parts = params['part'].split(',')
+        items = response.get('items', [])
+        store.save(items, {part: groups[part] for part in parts})
+        for item in items:
+            channel = channels.setdefault(item['id'], {'id': item['id']})
+            channel.update({part: item.get(part, {}) for part in parts})
+    
+    return {channel_id: build_channel_info(channel) for channel_id, channel in channels.items()}, len(requests_list)
+
+def build_search_params(search_query, max_results, page_token=None, published_after=None, published_before=None):
+    """构建search().list请求参数"""
+    search_params = {
+        "q": search_query,
+        "maxResults": max_results,
+        "order": "viewCount",
+        "type": "video",  # 只搜索视频
+        "pageToken": page_token,
+        **request_params('search.search')
+    }
+    
+    # 添加时间筛选参数
+    if published_after:
+        # 如果只有日期，添加时间部分
+        if len(published_after) == 10:  # YYYY-MM-DD格式
+            published_after_formatted = published_after + "T00:00:00Z"
+        else:
+            published_after_formatted = published_after
+        search_params["publishedAfter"] = published_after_formatted
+        
+    if published_before:
+        # 如果只有日期，添加时间部分
+        if len(published_before) == 10:  # YYYY-MM-DD格式
+            published_before_formatted = published_before + "T23:59:59Z"
+        else:
+            published_before_formatted = published_before
+        search_params["publishedBefore"] = published_before_formatted
+    
+    return search_params
+
+def build_search_video_data(video, channel_info, search_item, search_query, result_index, page_total):
+    """构建搜索模式发送到webhook的视频数据结构
+    
+    Args:
+        video: videos().list返回的视频资源
+        channel_info: build_channel_info生成的频道信息（可能为空字典）
+        search_item: search().list返回的对应搜索结果
+        search_query: 搜索关键词
+        result_index: 结果序号（从1开始）
+        page_total: 该搜索结果所在页的结果数
+    """
+    video_id = video.get('id')
+    snippet = video.get('snippet', {})
+    video_snippet = video.get('snippet', {})
+    stats = video.get('statistics', {})
+    content_details = video.get('contentDetails', {})
+    status = video.get('status', {})
+    recording_details = video.get('recordingDetails', {})
+    topic_details = video.get('topicDetails', {})
+    
+    # 获取频道信息
+    channel_id = snippet.get('channelId', 'N/A')
+    
+    # 构建完整的视频数据结构
+    video_data = {
+        "basic_info": {
+            "kind": search_item.get('kind', 'N/A'),
+            "etag": search_item.get('etag', 'N/A'),
+            "video_id": video_id,
+            "video_url": f"https://www.youtube.com/watch?v={video_id}" if video_id != 'N/A' else 'N/A'
+        },
+        "snippet": {
+            "published_at": snippet.get('publishedAt', 'N/A'),
+            "channel_id": snippet.get('channelId', 'N/A'),
+            "title": snippet.get('title', 'N/A'),
+            "description": snippet.get('description', ''),
+            "channel_title": snippet.get('channelTitle', 'N/A'),
+            "tags": snippet.get('tags', []),
+            "category_id": snippet.get('categoryId', 'N/A'),
+            "live_broadcast_content": snippet.get('liveBroadcastContent', 'N/A'),
+            "default_language": snippet.get('defaultLanguage', 'N/A'),
+            "default_audio_language": snippet.get('defaultAudioLanguage', 'N/A'),
+            "localized": snippet.get('localized', {}),
+            # 合并搜索snippet和详细snippet的信息
+            "publish_time": video_snippet.get('publishTime', snippet.get('publishTime', 'N/A'))
+        },
+        "channel_info": {
+            "channel_id": channel_info.get('channel_id', channel_id),
+            "title": channel_info.get('title', snippet.get('channelTitle', 'N/A')),
+            "description": channel_info.get('description', ''),
+            "custom_url": channel_info.get('custom_url', ''),
+            "published_at": channel_info.get('published_at', ''),
+            "country": channel_info.get('country', ''),
+            "default_language": channel_info.get('default_language', ''),
+            "localized_title": channel_info.get('localized_title', ''),
+            "localized_description": channel_info.get('localized_description', ''),
+            "thumbnail_url": channel_info.get('thumbnail_url', ''),
+            "subscriber_count": channel_info.get('subscriber_count', 0),
+            "video_count": channel_info.get('video_count', 0),
+            "view_count": channel_info.get('view_count', 0),
+            "subscriber_count_hidden": channel_info.get('subscriber_count_hidden', False),
+            "privacy_status": channel_info.get('privacy_status', ''),
+            "is_linked": channel_info.get('is_linked', False),
+            "long_uploads_status": channel_info.get('long_uploads_status', ''),
+            "made_for_kids": channel_info.get('made_for_kids', False),
+            "self_declared_made_for_kids": channel_info.get('self_declared_made_for_kids', False),
+            "topic_ids": channel_info.get('topic_ids', []),
+            "topic_categories": channel_info.get('topic_categories', []),
+            "keywords": channel_info.get('keywords', ''),
+            "channel_url": channel_info.get('channel_url', f"https://www.youtube.com/channel/{channel_id}" if channel_id != 'N/A' else '')
+        },
+        "statistics": {
+            "view_count": int(stats.get('viewCount', 0)) if stats.get('viewCount', '0').isdigit() else 0,
+            "like_count": int(stats.get('likeCount', 0)) if stats.get('likeCount', '0').isdigit() else 0,
+            "dislike_count": int(stats.get('dislikeCount', 0)) if stats.get('dislikeCount', '0').isdigit() else 0,
+            "comment_count": int(stats.get('commentCount', 0)) if stats.get('commentCount', '0').isdigit() else 0,
+            "favorite_count": int(stats.get('favoriteCount', 0)) if stats.get('favoriteCount', '0').isdigit() else 0
+        },
+        "content_details": {
+            "duration": content_details.get('duration', 'N/A'),
+            "dimension": content_details.get('dimension', 'N/A'),
+            "definition": content_details.get('definition', 'N/A'),
+            "caption": content_details.get('caption', 'N/A'),
+            "licensed_content": content_details.get('licensedContent', 'N/A'),
+            "region_restriction": content_details.get('regionRestriction', {}),
+            "content_rating": content_details.get('contentRating', {}),
+            "projection": content_details.get('projection', 'N/A'),
+            "has_custom_thumbnail": content_details.get('hasCustomThumbnail', 'N/A')
+        },
+        "status": {
+            "upload_status": status.get('uploadStatus', 'N/A'),
+            "failure_reason": status.get('failureReason', 'N/A'),
+            "rejection_reason": status.get('rejectionReason', 'N/A'),
+            "privacy_status": status.get('privacyStatus', 'N/A'),
+            "publish_at": status.get('publishAt', 'N/A'),
+            "license": status.get('license', 'N/A'),
+            "embeddable": status.get('embeddable', 'N/A'),
+            "public_stats_viewable": status.get('publicStatsViewable', 'N/A'),
+            "made_for_kids": status.get('madeForKids', 'N/A'),
+            "self_declared_made_for_kids": status.get('selfDeclaredMadeForKids', 'N/A')
+        },
+        "thumbnails": {
+            "default": snippet.get('thumbnails', {}).get('default', {}),
+            "medium": snippet.get('thumbnails', {}).get('medium', {}),
+            "high": snippet.get('thumbnails', {}).get('high', {}),
+            "standard": snippet.get('thumbnails', {}).get('standard', {}),
+            "maxres": snippet.get('thumbnails', {}).get('maxres', {})
+        },
+        "recording_details": {
+            "location_description": recording_details.get('locationDescription', 'N/A'),
+            "location": recording_details.get('location', {}),
+            "recording_date": recording_details.get('recordingDate', 'N/A')
+        },
+        "topic_details": {
+            "topic_ids": topic_details.get('topicIds', []),
+            "relevant_topic_ids": topic_details.get('relevantTopicIds', []),
+            "topic_categories": topic_details.get('topicCategories', [])
+        },
+        "search_metadata": {
+            "search_query": search_query,
+            "result_index": result_index,
+            "timestamp": datetime.now().isoformat(),
+            "total_results": page_total,
+            "search_kind": search_item.get('id', {}).get('kind', 'N/A')
+        }
+    }
+    
+    return video_data
+
+def print_search_video(video_data, result_index):
+    """打印搜索结果中单个视频的详细信息"""
+    print(f"\n{'='*60}")
+    print(f"{result_index}. 【{video_data['snippet']['title']}】")
+    print(f"   视频ID: {video_data['basic_info']['video_id']}")
+    print(f"   频道: {video_data['snippet']['channel_title']}")
+    print(f"   发布时间: {video_data['snippet']['published_at']}")
+    print(f"   分类ID: {video_data['snippet']['category_id']}")
+    print(f"   标签: {', '.join(video_data['snippet']['tags'][:5]) if video_data['snippet']['tags'] else '无'}")
+    print(f"   默认语言: {video_data['snippet']['default_language']}")
+    print(f"   \n📺 频道信息:")
+    print(f"   频道名称: {video_data['channel_info']['title']}")
+    print(f"   订阅者数: {video_data['channel_info']['subscriber_count']:,}")
+    print(f"   频道国家: {video_data['channel_info']['country'] or '未知'}")
+    print(f"   频道视频总数: {video_data['channel_info']['video_count']:,}")
+    print(f"   频道总观看数: {video_data['channel_info']['view_count']:,}")
+    print(f"   频道创建时间: {video_data['channel_info']['published_at'] or '未知'}")
+    if video_data['channel_info']['custom_url']:
+        print(f"   频道自定义URL: {video_data['channel_info']['custom_url']}")
+    if video_data['channel_info']['topic_categories']:
+        print(f"   频道主题: {', '.join(video_data['channel_info']['topic_categories'][:3])}")
+    print(f"   \n📊 统计数据:")
+    print(f"   观看次数: {video_data['statistics']['view_count']:,}")
+    print(f"   点赞数: {video_data['statistics']['like_count']:,}")
+    print(f"   评论数: {video_data['statistics']['comment_count']:,}")
+    print(f"   \n🎬 内容详情:")
+    print(f"   时长: {video_data['content_details']['duration']}")
+    print(f"   清晰度: {video_data['content_details']['definition']}")
+    print(f"   字幕: {video_data['content_details']['caption']}")
+    print(f"   许可内容: {video_data['content_details']['licensed_content']}")
+    print(f"   \n🔒 状态信息:")
+    print(f"   上传状态: {video_data['status']['upload_status']}")
+    print(f"   隐私状态: {video_data['status']['privacy_status']}")
+    print(f"   许可证: {video_data['status']['license']}")
+    print(f"   可嵌入: {video_data['status']['embeddable']}")
+    print(f"   儿童内容: {video_data['status']['made_for_kids']}")
+    if video_data['topic_details']['topic_categories']:
+        print(f"   \n🏷️ 主题分类: {', '.join(video_data['topic_details']['topic_categories'][:3])}")
+
+async def run_search_pipeline(youtube, search_query, max_results, webhook_url=None,
+                              published_after=None, published_before=None, concurrency=None, use_batch=None,
+                              batch_size=None):
+    """流水线式搜索：生产者逐页获取搜索结果，消费者同时对已到达的页面获取视频和频道详情
+    
+    第N页的详情获取、webhook发送与第N+1页的搜索请求同时进行。
+    batch_size大于1时视频经WebhookBatcher分批发送（每批最多batch_size个，带batch_info），
+    否则每个视频单独发送。
+    
+    Returns:
+        (处理后的视频列表, 请求统计字典)
+    """
+    pages = asyncio.Queue(maxsize=2)
+    stats = {'search_requests': 0, 'video_requests': 0, 'channel_requests': 0, 'video_ids': 0,
+             'quota_exhausted': False}
+    processed_videos = []
+    channel_info_dict = {}
+    batch_size = SEARCH_BATCH_SIZE if batch_size is None else batch_size
+    batcher = None
+    if webhook_url and batch_size > 1:
+        batcher = WebhookBatcher(send_to_webhook, webhook_url, 'videos',
+                                 envelope={'search_query': search_query}, max_items=batch_size)
+    
+    async def produce():
+        next_page_token = None
+        try:
+            while stats['video_ids'] < max_results and not stats['quota_exhausted']:
+                # 计算本次请求需要获取的结果数
+                remaining_results = max_results - stats['video_ids']
+                current_max_results = min(50, remaining_results)  # YouTube API单次最大50条
+                
+                search_params = build_search_params(
+                    search_query, current_max_results, next_page_token, published_after, published_before
+                )
+                try:
+                    search_response = await asyncio.to_thread(youtube.list, 'search', **search_params)
+                except QuotaBudgetExceeded as e:
+                    print(f"⚠️ {e}，停止分页，保留已获取的结果")
+                    stats['quota_exhausted'] = True
+                    break
+                stats['search_requests'] += 1
+                page_items = search_response.get('items', [])
+                print(f"✅ 第{stats['search_requests']}次搜索请求成功！获取到 {len(page_items)} 条结果")
+                
+                # 收集视频ID，交给消费者获取详情
+                video_items = [item for item in page_items if item.get('id', {}).get('videoId')]
+                video_items = video_items[:remaining_results]
+                stats['video_ids'] += len(video_items)
+                if video_items:
+                    await pages.put((video_items, len(page_items)))
+                
+                # 检查是否有下一页
+                next_page_token = search_response.get('nextPageToken')
+                if not next_page_token:
+                    print("📄 已到达搜索结果末页")
+                    break
+        except asyncio.CancelledError:
+            # 消费者出错后取消了生产者，队列可能已满且不再有人取出，不放入结束标记
+            raise
+        except Exception:
+            await pages.put(None)
+            raise
+        await pages.put(None)
+    
+    async def consume():
+        result_index = 0
+        while True:
+            page = await pages.get()
+            if page is None:
+                break
+            if stats['quota_exhausted']:
+                # 配额用尽后只取出剩余页面，避免生产者阻塞
+                continue
+            video_items, page_total = page
+            video_ids = [item['id']['videoId'] for item in video_items]
+            
+            try:
+                # 获取本页视频详情
+                video_requests = video_detail_requests(video_ids)
+                stats['video_requests'] += len(video_requests)
+                videos = {}
+                for response in await execute_requests(youtube, video_requests, concurrency, use_batch):
+                    for video in response.get('items', []):
+                        videos[video.get('id')] = video
+                
+                # 只获取尚未获取过的频道信息
+                new_channel_ids = []
+                for video in videos.values():
+                    channel_id = video.get('snippet', {}).get('channelId')
+                    if channel_id and channel_id not in channel_info_dict and channel_id not in new_channel_ids:
+                        new_channel_ids.append(channel_id)
+                if new_channel_ids:
+                    print(f"📺 正在获取 {len(new_channel_ids)} 个频道的详细信息...")
+                    channel_infos, channel_requests = await hydrate_channels(
+                        youtube, new_channel_ids, concurrency, use_batch
+                    )
+                    stats['channel_requests'] += channel_requests
+                    channel_info_dict.update(channel_infos)
+            except QuotaBudgetExceeded as e:
+                print(f"⚠️ {e}，停止处理，保留已获取的结果")
+                stats['quota_exhausted'] = True
+                continue
+            
+            for item in video_items:
+                result_index += 1
+                video_id = item['id']['videoId']
+                if video_id not in videos:
+                    continue
+                
+                video = videos[video_id]
+                channel_id = video.get('snippet', {}).get('channelId', 'N/A')
+                video_data = build_search_video_data(
+                    video, channel_info_dict.get(channel_id, {}), item, search_query, result_index, page_total
+                )
+                processed_videos.append(video_data)
+                print_search_video(video_data, result_index)
+                
+                # 发送到webhook（如果提供了URL），分批发送时先放入当前批次
+                if batcher is not None:
+                    await asyncio.to_thread(batcher.add, video_data)
+                elif webhook_url:
+                    print(f"   \n📤 发送到webhook...")
+                    send_success = await asyncio.to_thread(send_to_webhook, video_data, webhook_url)
+                    if send_success:
+                        print(f"   ✅ 发送成功")
+                    else:
+                        print(f"   ❌ 发送失败")
+    
+    producer = asyncio.create_task(produce())
+    try:
+        await consume()
+    except BaseException:
+        # 消费者出错时取消生产者（否则生产者阻塞在已满的队列上，事件循环无法结束）
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+        raise
+    await producer
+    if batcher is not None:
+        await asyncio.to_thread(batcher.close)
+        stats['webhook_batches'] = batcher.batches_sent
+        stats['webhook_failed_batches'] = batcher.failed_batches
+    return processed_videos, stats
+
+def plan_search_budget(api_key, max_results):
+    """根据配额账本的剩余预算调整目标结果数
+    
+    每页最多50条结果，消耗 搜索100 + 视频详情1 + 频道详情最多1 单位。
+    剩余预算不足以完成全部分页时，将目标结果数降到预算能覆盖的页数；一页都不够时直接拒绝。
+    配置多个密钥时按所有可用密钥的剩余预算之和计算。
+    """
+    if not QUOTA_LEDGER_ENABLED:
+        return max_results
+    
+    ledger = get_quota_ledger()
+    api_keys = split_api_keys(api_key)
+    remaining = KeyPool(api_keys, ledger).remaining()
+    page_cost = QUOTA_COSTS['search'] + QUOTA_COSTS['videos'] + QUOTA_COSTS['channels']
+    affordable_results = remaining // page_cost * 50
+    print(f"📒 今日剩余配额预算: {remaining} / {ledger.budget * len(api_keys)} 单位")
+    
+    if affordable_results <= 0:
+        kid = key_id(api_keys[0]) if len(api_keys) == 1 else '所有密钥'
+        raise QuotaBudgetExceeded(kid, page_cost, remaining, quota_day())
+    if affordable_results < max_results:
+        print(f"⚠️ 剩余配额不足以获取 {max_results} 条结果，目标结果数降为 {affordable_results}")
+        return affordable_results
+    return max_results
+
+def search_youtube_videos(api_key, search_query, max_results=25, webhook_url=None, published_after=None, published_before=None, concurrency=None, use_batch=None, batch_size=None):
     """搜索YouTube视频并返回结果，支持分页获取更多结果和时间筛选
     
+    搜索分页与详情获取以流水线方式执行：每页搜索结果到达后立即获取详情并发送webhook，
+    同时继续请求下一页。
+    
     Args:
         api_key: YouTube API密钥
         search_query: 搜索关键词
@@ -618,423 +1779,48 @@ def search_youtube_videos(api_key, search_query, max_results=25, webhook_url=Non
         webhook_url: Webhook回调地址
         published_after: 筛选此时间之后发布的视频 (格式: YYYY-MM-DD 或 YYYY-MM-DDTHH:MM:SSZ)
         published_before: 筛选此时间之前发布的视频 (格式: YYYY-MM-DD 或 YYYY-MM-DDTHH:MM:SSZ)
+        concurrency: 视频/频道详情请求的最大并发数（默认读取环境变量 YOUTUBE_CONCURRENCY）
+        use_batch: 是否将详情请求合并为multipart批量请求（默认读取环境变量 YOUTUBE_BATCH_REQUESTS）
+        batch_size: 每个webhook请求包含的视频数（默认读取环境变量 SEARCH_BATCH_SIZE，1表示每个视频单独发送）
     """
     
-    # API配置
-    api_service_name = "youtube"
-    api_version = "v3"
-    
     try:
-        # 检查是否在GitHub Actions环境中运行
-        is_github_actions = os.getenv('GITHUB_ACTIONS') == 'true'
-        
-        if is_github_actions:
-            # GitHub Actions环境，直接创建客户端（无需代理）
-            youtube = googleapiclient.discovery.build(
-                api_service_name, api_version, developerKey=api_key
-            )
-            print("🚀 GitHub Actions环境，直接连接YouTube API")
-        else:
-            # 本地环境，检查是否需要使用代理
-            http_proxy = os.getenv('HTTP_PROXY')
-            https_proxy = os.getenv('HTTPS_PROXY')
-            socks_proxy = os.getenv('SOCKS_PROXY')
-            
-            proxy_url = socks_proxy or https_proxy or http_proxy
-            
-            if proxy_url:
-                # 使用代理创建HTTP客户端
-                import httplib2
-                import socks
-                
-                if socks_proxy:
-                    # SOCKS代理
-                    proxy_parts = socks_proxy.replace('socks5://', '').replace('socks4://', '').split(':')
-                    proxy_host = proxy_parts[0]
-                    proxy_port = int(proxy_parts[1]) if len(proxy_parts) > 1 else 1080
-                    proxy_type = socks.PROXY_TYPE_SOCKS5 if 'socks5' in socks_proxy else socks.PROXY_TYPE_SOCKS4
-                    
-                    http = httplib2.Http(proxy_info=httplib2.ProxyInfo(
-                        proxy_type=proxy_type,
-                        proxy_host=proxy_host,
-                        proxy_port=proxy_port
-                    ))
-                else:
-                    # HTTP/HTTPS代理
-                    proxy_parts = proxy_url.replace('http://', '').replace('https://', '').split(':')
-                    proxy_host = proxy_parts[0]
-                    proxy_port = int(proxy_parts[1]) if len(proxy_parts) > 1 else 8080
-                    
-                    http = httplib2.Http(proxy_info=httplib2.ProxyInfo(
-                        proxy_type=httplib2.socks.PROXY_TYPE_HTTP,
-                        proxy_host=proxy_host,
-                        proxy_port=proxy_port
-                    ))
-                
-                youtube = googleapiclient.discovery.build(
-                    api_service_name, api_version, developerKey=api_key, http=http
-                )
-                print(f"🌐 使用代理: {proxy_url}")
-            else:
-                # 创建YouTube API客户端（无代理）
-                youtube = googleapiclient.discovery.build(
-                    api_service_name, api_version, developerKey=api_key
-                )
-
-        # 分页获取搜索结果
-        all_video_ids = []
-        next_page_token = None
-        search_requests_count = 0
+        # 获取共享的YouTube客户端（进程内复用，长连接）
+        youtube = get_youtube_client(api_key)
         
         print(f"🔍 正在搜索: {search_query}")
+        max_results = plan_search_budget(api_key, max_results)
         print(f"📊 目标结果数: {max_results}")
         if published_after:
             print(f"📅 筛选时间范围: {published_after} 之后")
         if published_before:
             print(f"📅 筛选时间范围: {published_before} 之前")
         
-        while len(all_video_ids) < max_results:
-            # 计算本次请求需要获取的结果数
-            remaining_results = max_results - len(all_video_ids)
-            current_max_results = min(50, remaining_results)  # YouTube API单次最大50条
-            
-            # 构建搜索请求参数
-            search_params = {
-                "part": "snippet",
-                "q": search_query,
-                "maxResults": current_max_results,
-                "order": "viewCount",
-                "type": "video",  # 只搜索视频
-                "pageToken": next_page_token
-            }
-            
-            # 添加时间筛选参数
-            if published_after:
-                # 如果只有日期，添加时间部分
-                if len(published_after) == 10:  # YYYY-MM-DD格式
-                    published_after_formatted = published_after + "T00:00:00Z"
-                else:
-                    published_after_formatted = published_after
-                search_params["publishedAfter"] = published_after_formatted
-                
-            if published_before:
-                # 如果只有日期，添加时间部分
-                if len(published_before) == 10:  # YYYY-MM-DD格式
-                    published_before_formatted = published_before + "T23:59:59Z"
-                else:
-                    published_before_formatted = published_before
-                search_params["publishedBefore"] = published_before_formatted
-            
-            # 构建搜索请求
-            search_request = youtube.search().list(**search_params)
-        
-            # 执行搜索请求
-            search_response = search_request.execute()
-            search_requests_count += 1
-            print(f"✅ 第{search_requests_count}次搜索请求成功！获取到 {len(search_response.get('items', []))} 条结果")
-            
-            # 收集视频ID
-            for item in search_response.get('items', []):
-                video_id = item.get('id', {}).get('videoId')
-                if video_id:
-                    all_video_ids.append(video_id)
-            
-            # 检查是否有下一页
-            next_page_token = search_response.get('nextPageToken')
-            if not next_page_token:
-                print("📄 已到达搜索结果末页")
-                break
-                
-            # 如果已经获取足够的结果，退出循环
-            if len(all_video_ids) >= max_results:
-                break
-        
-        # 限制结果数量
-        all_video_ids = all_video_ids[:max_results]
+        processed_videos, stats = asyncio.run(run_search_pipeline(
+            youtube, search_query, max_results, webhook_url,
+            published_after, published_before, concurrency, use_batch, batch_size
+        ))
         
-        if not all_video_ids:
+        if not stats['video_ids']:
             print("❌ 未找到任何视频")
             return []
-            
-        print(f"📋 总共收集到 {len(all_video_ids)} 个视频ID")
-        print(f"💰 搜索配额消耗: {search_requests_count * 100} 单位")
-        
-        # 分批获取视频详细信息（YouTube API限制单次最多50个ID）
-        all_video_details = []
-        batch_size = 50
-        videos_requests_count = 0
-        
-        for i in range(0, len(all_video_ids), batch_size):
-            batch_ids = all_video_ids[i:i + batch_size]
-            print(f"📋 处理第 {i//batch_size + 1} 批视频 ({len(batch_ids)} 个)")
-            
-            videos_request = youtube.videos().list(
-                part="snippet,statistics,contentDetails,status,recordingDetails,topicDetails",
-                id=','.join(batch_ids)
-            )
-            videos_response = videos_request.execute()
-            videos_requests_count += 1
-            all_video_details.extend(videos_response.get('items', []))
-        
-        print(f"💰 视频详情配额消耗: {videos_requests_count * 1} 单位")
-        print(f"💰 总配额消耗: {search_requests_count * 100 + videos_requests_count * 1} 单位")
-        
-        # 构建视频详细信息字典
-        video_details = {}
-        for video in all_video_details:
-            video_id = video.get('id')
-            if video_id:
-                video_details[video_id] = {
-                    'snippet': video.get('snippet', {}),
-                    'statistics': video.get('statistics', {}),
-                    'contentDetails': video.get('contentDetails', {}),
-                    'status': video.get('status', {}),
-                    'recordingDetails': video.get('recordingDetails', {}),
-                    'topicDetails': video.get('topicDetails', {})
-                }
-        
-        # 收集所有唯一的频道ID
-        unique_channel_ids = set()
-        for video in all_video_details:
-            channel_id = video.get('snippet', {}).get('channelId')
-            if channel_id:
-                unique_channel_ids.add(channel_id)
         
-        # 批量获取频道信息
-        channel_info_dict = {}
-        if unique_channel_ids:
-            print(f"📺 正在获取 {len(unique_channel_ids)} 个频道的详细信息...")
-            
-            # 分批获取频道信息（YouTube API限制单次最多50个ID）
-            channel_batch_size = 50
-            channel_ids_list = list(unique_channel_ids)
-            
-            for i in range(0, len(channel_ids_list), channel_batch_size):
-                batch_channel_ids = channel_ids_list[i:i + channel_batch_size]
-                print(f"📋 处理第 {i//channel_batch_size + 1} 批频道 ({len(batch_channel_ids)} 个)")
-                
-                channels_request = youtube.channels().list(
-                    part="snippet,statistics,brandingSettings,status,topicDetails,localizations",
-                    id=','.join(batch_channel_ids)
-                )
-                channels_response = channels_request.execute()
-                
-                # 处理频道信息
-                for channel in channels_response.get('items', []):
-                    channel_id = channel.get('id')
-                    if channel_id:
-                        channel_snippet = channel.get('snippet', {})
-                        channel_stats = channel.get('statistics', {})
-                        channel_branding = channel.get('brandingSettings', {})
-                        channel_status = channel.get('status', {})
-                        channel_topics = channel.get('topicDetails', {})
-                        
-                        channel_info_dict[channel_id] = {
-                            'channel_id': channel_id,
-                            'title': channel_snippet.get('title', ''),
-                            'description': channel_snippet.get('description', ''),
-                            'custom_url': channel_snippet.get('customUrl', ''),
-                            'published_at': channel_snippet.get('publishedAt', ''),
-                            'country': channel_snippet.get('country', ''),
-                            'default_language': channel_snippet.get('defaultLanguage', ''),
-                            'localized_title': channel_snippet.get('localized', {}).get('title', ''),
-                            'localized_description': channel_snippet.get('localized', {}).get('description', ''),
-                            'thumbnail_url': channel_snippet.get('thumbnails', {}).get('high', {}).get('url', ''),
-                            'subscriber_count': int(channel_stats.get('subscriberCount', 0)),
-                            'video_count': int(channel_stats.get('videoCount', 0)),
-                            'view_count': int(channel_stats.get('viewCount', 0)),
-                            'subscriber_count_hidden': channel_stats.get('hiddenSubscriberCount', False),
-                            'privacy_status': channel_status.get('privacyStatus', ''),
-                            'is_linked': channel_status.get('isLinked', False),
-                            'long_uploads_status': channel_status.get('longUploadsStatus', ''),
-                            'made_for_kids': channel_status.get('madeForKids', False),
-                            'self_declared_made_for_kids': channel_status.get('selfDeclaredMadeForKids', False),
-                            'topic_ids': channel_topics.get('topicIds', []),
-                            'topic_categories': channel_topics.get('topicCategories', []),
-                            'keywords': channel_branding.get('channel', {}).get('keywords', ''),
-                            'channel_url': f"https://www.youtube.com/channel/{channel_id}"
-                        }
-            
-            print(f"✅ 成功获取 {len(channel_info_dict)} 个频道的详细信息")
-        
-        # 处理搜索结果
-        processed_videos = []
-        
-        for i, video_id in enumerate(all_video_ids, 1):
-            if video_id not in video_details:
-                continue
-                
-            # 获取视频详细信息
-            video = video_details[video_id]
-            snippet = video.get('snippet', {})
-            
-            # 获取所有详细信息
-            video_snippet = video.get('snippet', {})
-            stats = video.get('statistics', {})
-            content_details = video.get('contentDetails', {})
-            status = video.get('status', {})
-            recording_details = video.get('recordingDetails', {})
-            topic_details = video.get('topicDetails', {})
-            
-            # 获取频道信息
-            channel_id = snippet.get('channelId', 'N/A')
-            channel_info = channel_info_dict.get(channel_id, {})
-            
-            # 构建完整的视频数据结构
-            video_data = {
-                "basic_info": {
-                    "kind": item.get('kind', 'N/A'),
-                    "etag": item.get('etag', 'N/A'),
-                    "video_id": video_id,
-                    "video_url": f"https://www.youtube.com/watch?v={video_id}" if video_id != 'N/A' else 'N/A'
-                },
-                "snippet": {
-                    "published_at": snippet.get('publishedAt', 'N/A'),
-                    "channel_id": snippet.get('channelId', 'N/A'),
-                    "title": snippet.get('title', 'N/A'),
-                    "description": snippet.get('description', ''),
-                    "channel_title": snippet.get('channelTitle', 'N/A'),
-                    "tags": snippet.get('tags', []),
-                    "category_id": snippet.get('categoryId', 'N/A'),
-                    "live_broadcast_content": snippet.get('liveBroadcastContent', 'N/A'),
-                    "default_language": snippet.get('defaultLanguage', 'N/A'),
-                    "default_audio_language": snippet.get('defaultAudioLanguage', 'N/A'),
-                    "localized": snippet.get('localized', {}),
-                    # 合并搜索snippet和详细snippet的信息
-                    "publish_time": video_snippet.get('publishTime', snippet.get('publishTime', 'N/A'))
-                },
-                "channel_info": {
-                    "channel_id": channel_info.get('channel_id', channel_id),
-                    "title": channel_info.get('title', snippet.get('channelTitle', 'N/A')),
-                    "description": channel_info.get('description', ''),
-                    "custom_url": channel_info.get('custom_url', ''),
-                    "published_at": channel_info.get('published_at', ''),
-                    "country": channel_info.get('country', ''),
-                    "default_language": channel_info.get('default_language', ''),
-                    "localized_title": channel_info.get('localized_title', ''),
-                    "localized_description": channel_info.get('localized_description', ''),
-                    "thumbnail_url": channel_info.get('thumbnail_url', ''),
-                    "subscriber_count": channel_info.get('subscriber_count', 0),
-                    "video_count": channel_info.get('video_count', 0),
-                    "view_count": channel_info.get('view_count', 0),
-                    "subscriber_count_hidden": channel_info.get('subscriber_count_hidden', False),
-                    "privacy_status": channel_info.get('privacy_status', ''),
-                    "is_linked": channel_info.get('is_linked', False),
-                    "long_uploads_status": channel_info.get('long_uploads_status', ''),
-                    "made_for_kids": channel_info.get('made_for_kids', False),
-                    "self_declared_made_for_kids": channel_info.get('self_declared_made_for_kids', False),
-                    "topic_ids": channel_info.get('topic_ids', []),
-                    "topic_categories": channel_info.get('topic_categories', []),
-                    "keywords": channel_info.get('keywords', ''),
-                    "channel_url": channel_info.get('channel_url', f"https://www.youtube.com/channel/{channel_id}" if channel_id != 'N/A' else '')
-                },
-                "statistics": {
-                    "view_count": int(stats.get('viewCount', 0)) if stats.get('viewCount', '0').isdigit() else 0,
-                    "like_count": int(stats.get('likeCount', 0)) if stats.get('likeCount', '0').isdigit() else 0,
-                    "dislike_count": int(stats.get('dislikeCount', 0)) if stats.get('dislikeCount', '0').isdigit() else 0,
-                    "comment_count": int(stats.get('commentCount', 0)) if stats.get('commentCount', '0').isdigit() else 0,
-                    "favorite_count": int(stats.get('favoriteCount', 0)) if stats.get('favoriteCount', '0').isdigit() else 0
-                },
-                "content_details": {
-                    "duration": content_details.get('duration', 'N/A'),
-                    "dimension": content_details.get('dimension', 'N/A'),
-                    "definition": content_details.get('definition', 'N/A'),
-                    "caption": content_details.get('caption', 'N/A'),
-                    "licensed_content": content_details.get('licensedContent', 'N/A'),
-                    "region_restriction": content_details.get('regionRestriction', {}),
-                    "content_rating": content_details.get('contentRating', {}),
-                    "projection": content_details.get('projection', 'N/A'),
-                    "has_custom_thumbnail": content_details.get('hasCustomThumbnail', 'N/A')
-                },
-                "status": {
-                    "upload_status": status.get('uploadStatus', 'N/A'),
-                    "failure_reason": status.get('failureReason', 'N/A'),
-                    "rejection_reason": status.get('rejectionReason', 'N/A'),
-                    "privacy_status": status.get('privacyStatus', 'N/A'),
-                    "publish_at": status.get('publishAt', 'N/A'),
-                    "license": status.get('license', 'N/A'),
-                    "embeddable": status.get('embeddable', 'N/A'),
-                    "public_stats_viewable": status.get('publicStatsViewable', 'N/A'),
-                    "made_for_kids": status.get('madeForKids', 'N/A'),
-                    "self_declared_made_for_kids": status.get('selfDeclaredMadeForKids', 'N/A')
-                },
-                "thumbnails": {
-                    "default": snippet.get('thumbnails', {}).get('default', {}),
-                    "medium": snippet.get('thumbnails', {}).get('medium', {}),
-                    "high": snippet.get('thumbnails', {}).get('high', {}),
-                    "standard": snippet.get('thumbnails', {}).get('standard', {}),
-                    "maxres": snippet.get('thumbnails', {}).get('maxres', {})
-                },
-                "recording_details": {
-                    "location_description": recording_details.get('locationDescription', 'N/A'),
-                    "location": recording_details.get('location', {}),
-                    "recording_date": recording_details.get('recordingDate', 'N/A')
-                },
-                "topic_details": {
-                    "topic_ids": topic_details.get('topicIds', []),
-                    "relevant_topic_ids": topic_details.get('relevantTopicIds', []),
-                    "topic_categories": topic_details.get('topicCategories', [])
-                },
-                "search_metadata": {
-                    "search_query": search_query,
-                    "result_index": i,
-                    "timestamp": datetime.now().isoformat(),
-                    "total_results": len(search_response['items']),
-                    "search_kind": item.get('id', {}).get('kind', 'N/A')
-                }
-            }
-            
-            processed_videos.append(video_data)
-            
-            # 打印视频详细信息
-            print(f"\n{'='*60}")
-            print(f"{i}. 【{video_data['snippet']['title']}】")
-            print(f"   视频ID: {video_data['basic_info']['video_id']}")
-            print(f"   频道: {video_data['snippet']['channel_title']}")
-            print(f"   发布时间: {video_data['snippet']['published_at']}")
-            print(f"   分类ID: {video_data['snippet']['category_id']}")
-            print(f"   标签: {', '.join(video_data['snippet']['tags'][:5]) if video_data['snippet']['tags'] else '无'}")
-            print(f"   默认语言: {video_data['snippet']['default_language']}")
-            print(f"   \n📺 频道信息:")
-            print(f"   频道名称: {video_data['channel_info']['title']}")
-            print(f"   订阅者数: {video_data['channel_info']['subscriber_count']:,}")
-            print(f"   频道国家: {video_data['channel_info']['country'] or '未知'}")
-            print(f"   频道视频总数: {video_data['channel_info']['video_count']:,}")
-            print(f"   频道总观看数: {video_data['channel_info']['view_count']:,}")
-            print(f"   频道创建时间: {video_data['channel_info']['published_at'] or '未知'}")
-            if video_data['channel_info']['custom_url']:
-                print(f"   频道自定义URL: {video_data['channel_info']['custom_url']}")
-            if video_data['channel_info']['topic_categories']:
-                print(f"   频道主题: {', '.join(video_data['channel_info']['topic_categories'][:3])}")
-            print(f"   \n📊 统计数据:")
-            print(f"   观看次数: {video_data['statistics']['view_count']:,}")
-            print(f"   点赞数: {video_data['statistics']['like_count']:,}")
-            print(f"   评论数: {video_data['statistics']['comment_count']:,}")
-            print(f"   \n🎬 内容详情:")
-            print(f"   时长: {video_data['content_details']['duration']}")
-            print(f"   清晰度: {video_data['content_details']['definition']}")
-            print(f"   字幕: {video_data['content_details']['caption']}")
-            print(f"   许可内容: {video_data['content_details']['licensed_content']}")
-            print(f"   \n🔒 状态信息:")
-            print(f"   上传状态: {video_data['status']['upload_status']}")
-            print(f"   隐私状态: {video_data['status']['privacy_status']}")
-            print(f"   许可证: {video_data['status']['license']}")
-            print(f"   可嵌入: {video_data['status']['embeddable']}")
-            print(f"   儿童内容: {video_data['status']['made_for_kids']}")
-            if video_data['topic_details']['topic_categories']:
-                print(f"   \n🏷️ 主题分类: {', '.join(video_data['topic_details']['topic_categories'][:3])}")
-            
-            # 发送到webhook（如果提供了URL）
-            if webhook_url:
-                print(f"   \n📤 发送到webhook...")
-                send_success = send_to_webhook(video_data, webhook_url)
-                if send_success:
-                    print(f"   ✅ 发送成功")
-                else:
-                    print(f"   ❌ 发送失败")
-                
-                # 添加延迟避免请求过于频繁
-                time.sleep(0.5)
+        print(f"\n📋 总共收集到 {stats['video_ids']} 个视频ID")
+        print(f"💰 搜索配额消耗: {stats['search_requests'] * 100} 单位")
+        print(f"💰 视频详情配额消耗: {stats['video_requests'] * 1} 单位")
+        print(f"💰 频道详情配额消耗: {stats['channel_requests'] * 1} 单位")
+        print(f"💰 总配额消耗: {stats['search_requests'] * 100 + stats['video_requests'] + stats['channel_requests']} 单位")
+        print("ℹ️ 以上按请求数估算，命中响应缓存的请求不消耗配额")
+        if QUOTA_LEDGER_ENABLED:
+            ledger = get_quota_ledger()
+            api_keys = split_api_keys(api_key)
+            used = sum(ledger.used(key) for key in api_keys)
+            print(f"📒 今日配额账本: 已用 {used} / {ledger.budget * len(api_keys)} 单位")
+        if stats['quota_exhausted']:
+            print("⚠️ 配额预算已用尽，结果不完整")
+        if 'webhook_batches' in stats:
+            print(f"📤 Webhook: 分 {stats['webhook_batches']} 批发送，失败 {stats['webhook_failed_batches']} 批")
+        print_cache_summary()
         
         print(f"\n🎉 处理完成！共处理 {len(processed_videos)} 个视频")
         return processed_videos
@@ -1052,7 +1838,7 @@ def main():
     """主函数 - 支持命令行参数和环境变量，支持搜索、评论获取和频道视频获取三种模式"""
     
     # 从环境变量获取配置
-    api_key = os.getenv('YOUTUBE_API_KEY')
+    api_key = os.getenv('YOUTUBE_API_KEYS') or os.getenv('YOUTUBE_API_KEY')  # 多个密钥用逗号分隔
     mode = os.getenv('MODE', 'search')  # 默认为搜索模式
     
     # 搜索模式参数
@@ -1060,18 +1846,30 @@ def main():
     max_results = int(os.getenv('MAX_RESULTS', '25'))
     published_after = os.getenv('PUBLISHED_AFTER')  # 时间筛选：之后
     published_before = os.getenv('PUBLISHED_BEFORE')  # 时间筛选：之前
+    concurrency = int(os.getenv('YOUTUBE_CONCURRENCY', '8'))  # 详情请求并发数
+    use_batch = os.getenv('YOUTUBE_BATCH_REQUESTS', 'false').lower() == 'true'  # 合并为批量请求
     
     # 评论模式参数
     video_id = os.getenv('VIDEO_ID')
-    max_comments = int(os.getenv('MAX_COMMENTS', '50'))
+    max_comments = int(os.getenv('MAX_COMMENTS', '50'))  # 0表示获取全部评论
+    include_replies = os.getenv('COMMENT_REPLIES', 'false').lower() == 'true'  # 获取评论的完整回复
+    comment_incremental = os.getenv('COMMENT_INCREMENTAL', 'false').lower() == 'true'  # 按同步位置增量获取评论
+    
+    # 多视频评论模式参数：逗号分隔的视频ID/链接、列表文件路径，或 "search:关键词"（取搜索结果前MAX_RESULTS个视频）
+    video_ids_arg = os.getenv('VIDEO_IDS')
+    comment_concurrency = int(os.getenv('COMMENT_CONCURRENCY', str(COMMENT_CONCURRENCY)))
     
     # 频道模式参数
     channel_handle = os.getenv('CHANNEL_HANDLE')
     max_videos = int(os.getenv('MAX_VIDEOS', '50'))
     batch_size = int(os.getenv('BATCH_SIZE', '100'))  # 分批大小，默认100
+    incremental = os.getenv('CHANNEL_INCREMENTAL', 'false').lower() == 'true'  # 按同步位置增量获取
+    # 频道模式未指定PUBLISHED_AFTER时的默认下限（设为空字符串表示不限）
+    channel_published_after = os.getenv('CHANNEL_PUBLISHED_AFTER', '2024-01-01')
     
     # 通用参数
     webhook_url = os.getenv('WEBHOOK_URL')
+    fields_profile = DEFAULT_PROFILE  # 字段配置（full/lite），环境变量 YOUTUBE_FIELDS_PROFILE
     
     # 命令行参数优先级更高
     if len(sys.argv) > 1:
@@ -1081,28 +1879,36 @@ def main():
             search_query = sys.argv[2]
         elif mode == 'comments':
             video_id = sys.argv[2]
-        elif mode == 'channel':
-            channel_handle = sys.argv[2]
+        elif mode == 'multi-comments':
+            video_ids_arg = sys.argv[2]
+        elif mode in ('channel', 'watchlist'):
+            channel_handle = sys.argv[2]  # 关注列表模式：逗号分隔的多个handle或列表文件路径
     if len(sys.argv) > 3:
         if mode == 'search':
             max_results = int(sys.argv[3])
-        elif mode == 'comments':
+        elif mode in ('comments', 'multi-comments'):
             max_comments = int(sys.argv[3])
-        elif mode == 'channel':
+        elif mode in ('channel', 'watchlist'):
             max_videos = int(sys.argv[3])
     if len(sys.argv) > 4:
-        api_key = sys.argv[4]  # API密钥作为第4个参数
+        api_key = sys.argv[4]  # API密钥作为第4个参数（多个密钥用逗号分隔）
     if len(sys.argv) > 5:
         webhook_url = sys.argv[5]  # webhook_url作为第5个参数
-    if len(sys.argv) > 6 and mode == 'search':
-        published_after = sys.argv[6]  # 搜索模式的时间筛选：之后
-    if len(sys.argv) > 7 and mode == 'search':
-        published_before = sys.argv[7]  # 搜索模式的时间筛选：之前
+    if len(sys.argv) > 6 and mode in ('search', 'channel', 'watchlist', 'multi-comments'):
+        published_after = sys.argv[6]  # 搜索/频道模式的时间筛选：之后
+    if len(sys.argv) > 7 and mode in ('search', 'channel', 'watchlist', 'multi-comments'):
+        published_before = sys.argv[7]  # 搜索/频道模式的时间筛选：之前
+    if mode in ('channel', 'watchlist') and not published_after:
+        published_after = channel_published_after
     
     # 验证必需参数
-    if not api_key:
+    if not split_api_keys(api_key):
         print("❌ 错误: 未提供YouTube API密钥")
-        print("请设置环境变量 YOUTUBE_API_KEY 或作为命令行参数传入")
+        print("请设置环境变量 YOUTUBE_API_KEY（或 YOUTUBE_API_KEYS）或作为命令行参数传入")
+        sys.exit(1)
+    
+    if fields_profile not in FIELD_PROFILES:
+        print(f"❌ 错误: 不支持的字段配置 {fields_profile}，请使用 {'/'.join(FIELD_PROFILES)}")
         sys.exit(1)
     
     # 根据模式验证参数
@@ -1121,36 +1927,84 @@ def main():
             print("❌ 错误: 频道模式下未提供频道Handle")
             print("请设置环境变量 CHANNEL_HANDLE 或作为命令行参数传入")
             sys.exit(1)
+    elif mode == 'multi-comments':
+        video_ids_arg = video_ids_arg or video_id
+        if not video_ids_arg:
+            print("❌ 错误: 多视频评论模式下未提供视频列表")
+            print("请设置环境变量 VIDEO_IDS（逗号分隔、列表文件路径或 search:关键词）或作为命令行参数传入")
+            sys.exit(1)
+    elif mode == 'watchlist':
+        channel_handles = parse_watchlist(os.getenv('CHANNEL_HANDLES') or channel_handle)
+        if not channel_handles:
+            print("❌ 错误: 关注列表模式下未提供频道列表")
+            print("请设置环境变量 CHANNEL_HANDLES（逗号分隔或列表文件路径）或作为命令行参数传入")
+            sys.exit(1)
     else:
-        print("❌ 错误: 不支持的模式，请使用 'search'、'comments' 或 'channel'")
+        print("❌ 错误: 不支持的模式，请使用 'search'、'comments'、'multi-comments'、'channel' 或 'watchlist'")
         sys.exit(1)
     
     print("=" * 60)
     if mode == 'search':
         print("🚀 YouTube搜索API - GitHub Webhook版本")
         print("=" * 60)
-        print(f"🔑 API密钥: {'已设置' if api_key else '未设置'}")
+        print(f"🔑 API密钥: {len(split_api_keys(api_key))} 个")
         print(f"🔍 搜索关键词: {search_query}")
         print(f"📊 最大结果数: {max_results}")
         if published_after:
             print(f"📅 筛选时间范围: {published_after} 之后")
         if published_before:
             print(f"📅 筛选时间范围: {published_before} 之前")
+        print(f"⚡ 详情请求并发数: {concurrency}")
+        print(f"📦 批量请求模式: {'开启' if use_batch else '关闭'}")
+        print(f"📤 每个webhook请求视频数: {SEARCH_BATCH_SIZE}")
     elif mode == 'comments':
         print("💬 YouTube评论获取API - GitHub Webhook版本")
         print("=" * 60)
-        print(f"🔑 API密钥: {'已设置' if api_key else '未设置'}")
+        print(f"🔑 API密钥: {len(split_api_keys(api_key))} 个")
         print(f"🎥 视频ID: {video_id}")
-        print(f"💬 最大评论数: {max_comments}")
+        print(f"💬 最大评论数: {max_comments or '全部'}")
+        print(f"🧵 获取回复: {'开启' if include_replies else '关闭'}")
+        print(f"🔖 增量同步: {'开启' if comment_incremental else '关闭'}")
+        print(f"🔥 只保留点赞数最高: {f'{COMMENT_TOP_K} 条' if COMMENT_TOP_K else '关闭'}")
+    elif mode == 'multi-comments':
+        print("💬 YouTube多视频评论获取API - GitHub Webhook版本")
+        print("=" * 60)
+        print(f"🔑 API密钥: {len(split_api_keys(api_key))} 个")
+        print(f"🎥 视频列表: {video_ids_arg}")
+        print(f"💬 每个视频最大评论数: {max_comments or '全部'}")
+        print(f"⚡ 同时处理视频数: {comment_concurrency}")
+        print(f"🧵 获取回复: {'开启' if include_replies else '关闭'}")
+        print(f"🔖 增量同步: {'开启' if comment_incremental else '关闭'}")
+        print(f"🔥 只保留点赞数最高: {f'{COMMENT_TOP_K} 条' if COMMENT_TOP_K else '关闭'}")
     elif mode == 'channel':
         print("📺 YouTube频道视频获取API - GitHub Webhook版本")
         print("=" * 60)
-        print(f"🔑 API密钥: {'已设置' if api_key else '未设置'}")
+        print(f"🔑 API密钥: {len(split_api_keys(api_key))} 个")
         print(f"📺 频道Handle: {channel_handle}")
         print(f"🎬 最大视频数: {max_videos}")
         print(f"📦 分批大小: {batch_size} (每批触发一次webhook)")
+        print(f"🔖 增量同步: {'开启' if incremental else '关闭'}")
+        if published_after:
+            print(f"📅 筛选时间范围: {published_after} 之后")
+        if published_before:
+            print(f"📅 筛选时间范围: {published_before} 之前")
+    elif mode == 'watchlist':
+        print("👀 YouTube频道关注列表 - GitHub Webhook版本")
+        print("=" * 60)
+        print(f"🔑 API密钥: {len(split_api_keys(api_key))} 个")
+        print(f"📺 关注频道数: {len(channel_handles)}")
+        print(f"🎬 每个频道最大视频数: {max_videos}")
+        print(f"📦 分批大小: {batch_size} (每批触发一次webhook)")
+        print(f"🔖 增量同步: {'开启' if incremental else '关闭'}")
+        if published_after:
+            print(f"📅 筛选时间范围: {published_after} 之后")
+        if published_before:
+            print(f"📅 筛选时间范围: {published_before} 之前")
     
     print(f"📤 Webhook URL: {'已设置' if webhook_url else '未设置'}")
+    print(f"🧾 字段配置: {fields_profile}")
+    if QUOTA_LEDGER_ENABLED:
+        print(f"📒 配额账本: 开启 (每日预算 {get_quota_ledger().budget} 单位/密钥)")
     print("=" * 60)
     
     try:
@@ -1162,7 +2016,9 @@ def main():
                 max_results=max_results,
                 webhook_url=webhook_url,
                 published_after=published_after,
-                published_before=published_before
+                published_before=published_before,
+                concurrency=concurrency,
+                use_batch=use_batch
             )
             
             # 输出结果摘要
@@ -1185,12 +2041,16 @@ def main():
                 print(f"💾 结果已保存到: {output_file}")
         
         elif mode == 'comments':
-            # 执行评论获取
+            # 执行评论获取（没有webhook时评论边获取边写入结果文件）
+            output_file = None if webhook_url else f"youtube_comments_{video_id}_{int(time.time())}.json"
             results = get_video_comments(
                 api_key=api_key,
                 video_id=video_id,
                 max_comments=max_comments,
-                webhook_url=webhook_url
+                webhook_url=webhook_url,
+                output_file=output_file,
+                include_replies=include_replies,
+                incremental=comment_incremental
             )
             
             # 输出结果摘要
@@ -1209,16 +2069,24 @@ def main():
                         print(f"   💬 {comment['text'][:100]}...")
                         print(f"   👍 {comment['like_count']:,} 赞 | 📅 {comment['published_at']}")
                         print()
+            elif results and results.get('streamed_batches'):
+                print(f"\n📋 评论获取结果摘要:")
+                print(f"💬 获取到 {results['total_comments_fetched']} 条评论，分 {results['streamed_batches']} 批输出")
             elif results and 'error' in results:
                 print(f"\n❌ 获取评论失败: {results.get('error', '未知错误')}")
+            elif results and comment_incremental:
+                print(f"\n📋 评论获取结果摘要:")
+                print("💬 没有新评论")
             else:
                 print(f"\n❌ 未能获取到评论数据")
+            if results and results.get('like_updates'):
+                print(f"👍 {len(results['like_updates'])} 条已知评论的点赞数有变化")
             
-            # 如果没有webhook，将结果保存到文件
+            # 如果没有webhook，将结果保存到文件（评论已流式写入时文件已生成）
             if not webhook_url:
-                output_file = f"youtube_comments_{video_id}_{int(time.time())}.json"
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    json.dump(results, f, ensure_ascii=False, indent=2)
+                if not (results and results.get('output_file')):
+                    with open(output_file, 'w', encoding='utf-8') as f:
+                        json.dump(results, f, ensure_ascii=False, indent=2)
                 print(f"💾 结果已保存到: {output_file}")
         
         elif mode == 'channel':
@@ -1228,7 +2096,10 @@ def main():
                 handle=channel_handle,
                 max_results=max_videos,
                 webhook_url=webhook_url,
-                batch_size=batch_size
+                batch_size=batch_size,
+                incremental=incremental,
+                published_after=published_after,
+                published_before=published_before
             )
             
             # 输出结果摘要
@@ -1260,6 +2131,72 @@ def main():
                     json.dump(results, f, ensure_ascii=False, indent=2)
                 print(f"💾 结果已保存到: {output_file}")
         
+        elif mode == 'multi-comments':
+            # 解析视频列表（或取搜索结果的前MAX_RESULTS个视频）
+            if video_ids_arg.startswith('search:'):
+                query = video_ids_arg[len('search:'):].strip()
+                print(f"🔍 搜索 {query}，取前 {max_results} 个视频")
+                video_ids = search_top_video_ids(
+                    get_youtube_client(api_key), query, max_results, published_after, published_before
+                )
+            else:
+                video_ids = [parse_video_id(entry) for entry in parse_watchlist(video_ids_arg)]
+            
+            # 并发获取各视频评论，每个视频完成后立即发送/写入文件
+            results = get_comments_for_videos(
+                api_key=api_key,
+                video_ids=video_ids,
+                max_comments=max_comments,
+                webhook_url=webhook_url,
+                concurrency=comment_concurrency,
+                include_replies=include_replies,
+                output_dir=None if webhook_url else '.',
+                incremental=comment_incremental
+            )
+            
+            # 输出结果摘要
+            print(f"\n📋 多视频评论结果摘要:")
+            print(f"🎥 {results['total_videos']} 个视频，成功 {results['succeeded']} 个，失败 {results['failed']} 个")
+            print(f"💬 共获取 {results['total_comments_fetched']} 条评论")
+            
+            # 如果没有webhook，保存汇总文件（各视频评论已写入各自的结果文件）
+            if not webhook_url:
+                output_file = f"youtube_multi_comments_{int(time.time())}.json"
+                with open(output_file, 'w', encoding='utf-8') as f:
+                    json.dump(results, f, ensure_ascii=False, indent=2)
+                print(f"💾 汇总已保存到: {output_file}")
+        
+        elif mode == 'watchlist':
+            # 先检测变化，只抓取有变化的频道
+            results = watch_channels(
+                api_key=api_key,
+                handles=channel_handles,
+                max_results=max_videos,
+                webhook_url=webhook_url,
+                batch_size=batch_size,
+                incremental=incremental,
+                published_after=published_after,
+                published_before=published_before,
+                concurrency=concurrency,
+                use_batch=use_batch
+            )
+            
+            # 输出结果摘要
+            print(f"\n📋 关注列表结果摘要:")
+            print(f"🔎 检测 {results['checked']} 个频道 ({results['check_requests']} 个请求)，{results['changed']} 个有变化")
+            for handle, result in results['results'].items():
+                if result and result.get('error'):
+                    print(f"   ❌ {handle}: {result['error']}")
+                elif result:
+                    print(f"   ✅ {handle}: {result['total_videos_fetched']} 个视频")
+            
+            # 如果没有webhook，将结果保存到文件
+            if not webhook_url:
+                output_file = f"youtube_watchlist_{int(time.time())}.json"
+                with open(output_file, 'w', encoding='utf-8') as f:
+                    json.dump(results, f, ensure_ascii=False, indent=2)
+                print(f"💾 结果已保存到: {output_file}")
+        
         print("\n🎉 任务完成！")
         
     except Exception as e: